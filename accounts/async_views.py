@@ -0,0 +1,132 @@
+"""Async variants of the dashboard views, served by ``hospital.asgi_urls``.
+
+They build the same context as their counterparts in ``accounts.views``,
+but read through Django's async ORM, so a request waiting on the database
+does not hold a worker thread. The async ORM runs every query on the one
+thread-sensitive executor thread and its connection, so a request's queries
+still run one after another; they are awaited in turn rather than gathered.
+Querysets are materialized before rendering so the templates never query
+from the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render, redirect
+
+from appointments.models import Appointment
+from billing.models import Bill
+from doctors.models import Doctor
+from patients.models import Patient
+from stats.models import HospitalStats
+
+from .conditional import conditional_dashboard, doctor_dashboard_validators, patient_dashboard_validators
+from .dashboard_cache import DOCTORS_SCOPE, GLOBAL_SCOPE, PATIENTS_SCOPE, cache_dashboard
+from .roles import resolve_role
+from .views import admin_dashboard_context, doctor_roster_today, hospital_dashboard_context
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _auser(request):
+    user = await request.auser()
+    # Context processors read request.user while rendering in a worker
+    # thread; hand them the loaded user instead of a second lookup.
+    request.user = user
+    return user
+
+
+async def arender(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@login_required(login_url='patient_login')
+@conditional_dashboard(patient_dashboard_validators)
+@cache_dashboard('patient_dashboard', scopes=[DOCTORS_SCOPE])
+async def patient_dashboard_view(request):
+    """Display patient dashboard with appointments and billing."""
+    user = await _auser(request)
+    patient = await Patient.objects.filter(user=user).afirst()
+
+    if patient:
+        stats = await HospitalStats.acurrent()
+        my_appointments = await alist(Appointment.objects.filter(patient=patient).listing()
+                                      .order_by('-appointment_date')[:10])
+        my_bills = await alist(Bill.objects.filter(patient=patient).order_by('-issue_date')[:10])
+        pending_bills = await alist(Bill.objects.filter(patient=patient, status='pending'))
+    else:
+        stats, my_appointments, my_bills, pending_bills = await HospitalStats.acurrent(), [], [], []
+
+    context = {
+        'user': user,
+        'patient': patient,
+        'total_doctors': stats.doctors,
+        'my_appointments': my_appointments,
+        'my_bills': my_bills,
+        'pending_bills': pending_bills,
+        'user_type': 'patient',
+    }
+    return await arender(request, "patient_dashboard.html", context)
+
+
+@login_required(login_url='doctor_login')
+@conditional_dashboard(doctor_dashboard_validators)
+@cache_dashboard('doctor_dashboard', scopes=[PATIENTS_SCOPE])
+async def doctor_dashboard_view(request):
+    """Display doctor dashboard with appointments and patient information."""
+    user = await _auser(request)
+    doctor = await Doctor.objects.filter(user=user).afirst()
+
+    if doctor:
+        stats = await HospitalStats.acurrent()
+        appointment_counts = await Appointment.objects.astatus_counts(doctor=doctor)
+        my_appointments = await alist(Appointment.objects.filter(doctor=doctor).select_related('patient')
+                                      .listing().order_by('-appointment_date')[:10])
+    else:
+        stats, appointment_counts, my_appointments = await HospitalStats.acurrent(), {}, []
+
+    context = {
+        'user': user,
+        'doctor': doctor,
+        'total_patients': stats.patients,
+        'my_appointments': my_appointments,
+        'scheduled_appointments': appointment_counts.get('scheduled', 0),
+        'completed_appointments': appointment_counts.get('completed', 0),
+        'user_type': 'doctor',
+    }
+    return await arender(request, "doctor_dashboard.html", context)
+
+
+@login_required(login_url='login')
+@cache_dashboard('dashboard', scopes=[GLOBAL_SCOPE])
+async def dashboard_view(request):
+    """Display hospital management dashboard with statistics and quick info."""
+    user = await _auser(request)
+
+    stats = await HospitalStats.acurrent()
+    doctors = await alist(Doctor.objects.listing()[:5])
+    recent_patients = await alist(Patient.objects.listing()[:5])
+    recent_appointments = await alist(Appointment.objects.select_related('patient').listing()[:5])
+    role = await sync_to_async(resolve_role)(user)
+
+    context = hospital_dashboard_context(
+        user, stats, doctors, recent_patients, recent_appointments, is_doctor=role == 'doctor',
+    )
+    return await arender(request, "dashboard.html", context)
+
+
+@login_required(login_url='admin_login')
+@cache_dashboard('admin_dashboard', scopes=[GLOBAL_SCOPE])
+async def admin_dashboard_view(request):
+    """Display admin/chairman dashboard with hospital overview and free doctors."""
+    user = await _auser(request)
+    if not user.is_staff:
+        return redirect('home')
+
+    stats = await HospitalStats.acurrent()
+    all_doctors = await alist(doctor_roster_today())
+    latest_appointments = await alist(Appointment.objects.select_related('patient').listing()
+                                      .order_by('-appointment_date')[:20])
+
+    context = admin_dashboard_context(user, stats, all_doctors, latest_appointments)
+    return await arender(request, "admin_dashboard.html", context)
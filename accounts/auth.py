@@ -0,0 +1,75 @@
+"""Login helpers that keep password hashing off the request thread.
+
+Verifying a password is deliberately slow and CPU bound. Under ASGI the
+async login views hand it to a small, bounded thread pool, so the event
+loop and request threads stay free while hashes are computed. The
+database lookups stay on Django's async ORM.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import _clean_credentials, aauthenticate, get_user_model
+from django.contrib.auth.hashers import make_password, verify_password
+from django.contrib.auth.signals import user_login_failed
+
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+_executor = None
+
+
+def get_hash_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'AUTH_HASH_WORKERS', 4),
+            thread_name_prefix='password-hash',
+        )
+    return _executor
+
+
+async def run_hasher(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(get_hash_executor(), func, *args)
+
+
+async def aauthenticate_offloaded(request, username, password):
+    """Return the active user matching the credentials, or None.
+
+    Mirrors ModelBackend.authenticate(), including re-hashing the stored
+    password when the preferred hasher or its parameters have changed, and
+    sends ``user_login_failed`` on failure like ``authenticate()`` does.
+    With any other AUTHENTICATION_BACKENDS it hands over to Django's own
+    ``aauthenticate()``, which hashes on the request path.
+    """
+    if list(settings.AUTHENTICATION_BACKENDS) != [MODEL_BACKEND]:
+        return await aauthenticate(request, username=username, password=password)
+
+    user = await _verify(username, password)
+    if user is None:
+        await user_login_failed.asend(
+            sender=__name__,
+            credentials=_clean_credentials({'username': username, 'password': password}),
+            request=request,
+        )
+        return None
+    user.backend = MODEL_BACKEND
+    return user
+
+
+async def _verify(username, password):
+    UserModel = get_user_model()
+    try:
+        user = await UserModel._default_manager.aget_by_natural_key(username)
+    except UserModel.DoesNotExist:
+        # Run the default hasher once to reduce the timing difference
+        # between an existing and a nonexistent user.
+        await run_hasher(make_password, password)
+        return None
+
+    is_correct, must_update = await run_hasher(verify_password, password, user.password)
+    if not is_correct or not user.is_active:
+        return None
+    if must_update:
+        user.password = await run_hasher(make_password, password)
+        await user.asave(update_fields=['password'])
+    return user
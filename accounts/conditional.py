@@ -0,0 +1,126 @@
+"""Conditional GET (ETag) for the patient and doctor dashboards.
+
+Both dashboards are polled. Each poll first computes an ETag from the data
+the page shows: the ``updated_at`` and row count of the user's appointments
+and bills (counts catch deletions), the profile, the patients in a doctor's
+appointment table, the user's own name and email, and the hospital total
+the page displays. All of that comes from two small queries. A request
+whose ``If-None-Match`` still matches gets a 304 before the view builds its
+context, and before the dashboard cache is consulted.
+
+No Last-Modified is sent. A timestamp could not cover deletions, renames,
+the hospital totals or two edits within one second, so ``If-Modified-Since``
+would be answered with stale 304s.
+
+The validator also covers the template source and the fingerprinted
+static URLs it links to, so a deploy that changes the page's HTML, CSS or
+JS invalidates every ETag.
+"""
+import hashlib
+import re
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.template.loader import get_template
+from django.templatetags.static import static
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from appointments.models import Appointment
+from billing.models import Bill
+from doctors.models import Doctor
+from patients.models import Patient
+from stats.models import HospitalStats
+
+STATIC_TAG = re.compile(r"""{%\s*static\s+['"]([^'"]+)['"]\s*%}""")
+
+
+@lru_cache(maxsize=None)
+def page_version(template_name):
+    """Hash of a template's source and the static URLs it links to."""
+    source = get_template(template_name).template.source
+    urls = [static(path) for path in STATIC_TAG.findall(source)]
+    return hashlib.md5('\n'.join([source, *urls]).encode()).hexdigest()
+
+
+def _latest(queryset, owner_field):
+    """Subqueries for the newest ``updated_at`` and row count per owner."""
+    rows = queryset.filter(**{owner_field: OuterRef('pk')}).order_by().values(owner_field)
+    return (
+        Subquery(rows.annotate(latest=Max('updated_at')).values('latest')),
+        Subquery(rows.annotate(rows=Count('pk')).values('rows'), output_field=IntegerField()),
+    )
+
+
+def _etag(template_name, user, parts):
+    """Return the ETag of a page built from ``parts``."""
+    parts = [page_version(template_name), user.pk, user.username, user.first_name,
+             user.last_name, user.email, *parts]
+    return '"{}"'.format(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def patient_dashboard_validators(user):
+    appointments_changed, appointment_count = _latest(Appointment.objects.all(), 'patient')
+    bills_changed, bill_count = _latest(Bill.objects.all(), 'patient')
+    patient = (Patient.objects.filter(user=user)
+               .annotate(appointments_changed=appointments_changed, appointment_count=appointment_count,
+                         bills_changed=bills_changed, bill_count=bill_count)
+               .values('pk', 'updated_at', 'appointments_changed', 'appointment_count',
+                       'bills_changed', 'bill_count')
+               .first()) or {}
+    return _etag('patient_dashboard.html', user, [sorted(patient.items()), HospitalStats.current().doctors])
+
+
+def doctor_dashboard_validators(user):
+    appointments_changed, appointment_count = _latest(Appointment.objects.all(), 'doctor')
+    # The appointment table shows patients' names and phones.
+    patients_changed = Subquery(
+        Appointment.objects.filter(doctor=OuterRef('pk')).order_by().values('doctor')
+        .annotate(latest=Max('patient__updated_at')).values('latest')
+    )
+    # Doctor has no updated_at; its few profile fields go into the ETag as is.
+    doctor = (Doctor.objects.filter(user=user)
+              .annotate(appointments_changed=appointments_changed, appointment_count=appointment_count,
+                        patients_changed=patients_changed)
+              .values('pk', 'specialization', 'experience', 'phone',
+                      'appointments_changed', 'appointment_count', 'patients_changed')
+              .first()) or {}
+    return _etag('doctor_dashboard.html', user, [sorted(doctor.items()), HospitalStats.current().patients])
+
+
+def _finish(request, response, etag):
+    if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        # Per-user page: keep it out of shared caches, and have browsers
+        # revalidate on every poll.
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_dashboard(validators):
+    """Answer conditional GETs for a dashboard view with a 304 when possible.
+
+    ``validators(user)`` returns the page's ETag. Works on both sync and
+    async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapped(request, *args, **kwargs):
+                user = await request.auser()
+                etag = await sync_to_async(validators)(user)
+                response = get_conditional_response(request, etag=etag)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(request, response, etag)
+            return async_wrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            etag = validators(request.user)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _finish(request, response, etag)
+        return wrapped
+    return decorator
@@ -0,0 +1,7 @@
+from .roles import resolve_role
+
+
+def role(request):
+    """Add ``user_role`` (see accounts.roles.resolve_role) to template contexts."""
+    user = getattr(request, 'user', None)
+    return {'user_role': resolve_role(user) if user is not None else None}
@@ -0,0 +1,148 @@
+"""Per-user cache for rendered dashboard pages.
+
+Each cached page is keyed by view, user and the current token of every
+scope the page depends on. Writing to a model replaces the tokens of the
+scopes it affects (see ``accounts.signals``), so stale pages are simply
+never looked up again and expire through their TTL.
+"""
+import threading
+import uuid
+from collections import Counter
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+CACHE_ALIAS = 'dashboards'
+
+# Scope included in every key; bumping it drops every cached dashboard.
+EPOCH_SCOPE = 'epoch'
+# Hospital-wide numbers shown on the admin and hospital dashboards.
+GLOBAL_SCOPE = 'global'
+# Roster counts shown on the patient and doctor dashboards.
+DOCTORS_SCOPE = 'doctors'
+PATIENTS_SCOPE = 'patients'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def _scope_key(scope):
+    return f'dashboard:scope:{scope}'
+
+
+def _scope_tokens(scopes):
+    cache = get_cache()
+    keys = [_scope_key(scope) for scope in scopes]
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            # A missing token (never set, or evicted) gets a fresh one so
+            # that pages cached under an older token can't be served.
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            tokens[key] = cache.get(key)
+    return [str(tokens[key]) for key in keys]
+
+
+async def _ascope_tokens(scopes):
+    cache = get_cache()
+    keys = [_scope_key(scope) for scope in scopes]
+    tokens = await cache.aget_many(keys)
+    for key in keys:
+        if key not in tokens:
+            await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+            tokens[key] = await cache.aget(key)
+    return [str(tokens[key]) for key in keys]
+
+
+def invalidate(*scopes):
+    """Drop every cached dashboard that depends on any of ``scopes``."""
+    if scopes:
+        get_cache().set_many({_scope_key(scope): uuid.uuid4().hex for scope in scopes}, timeout=None)
+
+
+def invalidate_all():
+    invalidate(EPOCH_SCOPE)
+
+
+def _record(view_name, outcome):
+    with _stats_lock:
+        _stats[(view_name, outcome)] += 1
+
+
+def cache_stats():
+    """Return per-view hit/miss counters for this process."""
+    with _stats_lock:
+        items = list(_stats.items())
+    stats = {}
+    for (view_name, outcome), count in items:
+        stats.setdefault(view_name, {'hits': 0, 'misses': 0})[outcome] = count
+    return stats
+
+
+def _page_key(view_name, user_id, tokens):
+    return 'dashboard:page:{}:{}:{}'.format(view_name, user_id, ':'.join(tokens))
+
+
+def cache_dashboard(view_name, scopes=()):
+    """Cache a dashboard view's rendered HTML per user.
+
+    ``scopes`` lists the shared data the page shows besides the user's own
+    records. Only successful, non-streaming responses are stored. Works on
+    both sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapped(request, *args, **kwargs):
+                timeout = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+                if timeout <= 0:
+                    return await view(request, *args, **kwargs)
+
+                user = await request.auser()
+                all_scopes = [EPOCH_SCOPE, *scopes, user_scope(user.pk)]
+                key = _page_key(view_name, user.pk, await _ascope_tokens(all_scopes))
+                cache = get_cache()
+                content = await cache.aget(key)
+                if content is not None:
+                    _record(view_name, 'hits')
+                    return HttpResponse(content)
+
+                _record(view_name, 'misses')
+                response = await view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    await cache.aset(key, response.content, timeout)
+                return response
+            return async_wrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            timeout = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+            if timeout <= 0:
+                return view(request, *args, **kwargs)
+
+            all_scopes = [EPOCH_SCOPE, *scopes, user_scope(request.user.pk)]
+            key = _page_key(view_name, request.user.pk, _scope_tokens(all_scopes))
+            cache = get_cache()
+            content = cache.get(key)
+            if content is not None:
+                _record(view_name, 'hits')
+                return HttpResponse(content)
+
+            _record(view_name, 'misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, response.content, timeout)
+            return response
+        return wrapped
+    return decorator
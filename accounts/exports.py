@@ -0,0 +1,150 @@
+"""Streaming CSV exports of bill and appointment history.
+
+Rows are read with ``QuerySet.iterator()``, which uses a server-side cursor
+on PostgreSQL and ``fetchmany()`` elsewhere. The CSV is written in blocks
+of rows and can be gzipped on the fly. Memory use stays flat however many
+rows match. ``export_history_view`` and the ``export_history`` command
+both build on ``export_chunks()``.
+"""
+import csv
+import io
+import zlib
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.utils import timezone
+
+from appointments.models import Appointment
+from billing.models import Bill
+
+# Rows fetched per round-trip from the database.
+CHUNK_SIZE = 5000
+# Rows written per CSV block handed to the caller.
+ROWS_PER_BLOCK = 1000
+
+
+class ExportError(ValueError):
+    """Raised for an unknown dataset, status or an empty date range."""
+
+
+def _bills():
+    return Bill.objects.all(), 'issue_date', [
+        ('Bill ID', 'id'),
+        ('Issued', 'issue_date'),
+        ('Due', 'due_date'),
+        ('Paid', 'paid_date'),
+        ('Status', 'status'),
+        ('Amount', 'amount'),
+        ('Patient ID', 'patient_id'),
+        ('Patient first name', 'patient__first_name'),
+        ('Patient last name', 'patient__last_name'),
+        ('Appointment ID', 'appointment_id'),
+        ('Description', 'description'),
+    ], [status for status, _ in Bill.STATUS_CHOICES]
+
+
+def _appointments():
+    return Appointment.objects.all(), 'appointment_date', [
+        ('Appointment ID', 'id'),
+        ('Date', 'appointment_date'),
+        ('Status', 'status'),
+        ('Patient ID', 'patient_id'),
+        ('Patient first name', 'patient__first_name'),
+        ('Patient last name', 'patient__last_name'),
+        ('Doctor ID', 'doctor_id'),
+        ('Doctor first name', 'doctor__user__first_name'),
+        ('Doctor last name', 'doctor__user__last_name'),
+        ('Specialization', 'doctor__specialization'),
+        ('Reason', 'reason'),
+    ], [status for status, _ in Appointment.STATUS_CHOICES]
+
+
+DATASETS = {'bills': _bills, 'appointments': _appointments}
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(dataset, start=None, end=None, statuses=None, chunk_size=CHUNK_SIZE):
+    """Return ``(header, rows)`` for ``dataset``, oldest row first.
+
+    ``start`` and ``end`` are inclusive dates on the dataset's date column;
+    ``statuses`` limits the rows to those statuses. ``rows`` is a lazy
+    iterator of tuples.
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset {dataset!r}; choose from {', '.join(sorted(DATASETS))}.")
+    queryset, date_field, columns, known_statuses = DATASETS[dataset]()
+    if start and end and start > end:
+        raise ExportError('The start date is after the end date.')
+    unknown = set(statuses or ()) - set(known_statuses)
+    if unknown:
+        raise ExportError(f"Unknown status {', '.join(sorted(unknown))}; choose from {', '.join(known_statuses)}.")
+
+    is_datetime = queryset.model._meta.get_field(date_field).get_internal_type() == 'DateTimeField'
+    if start:
+        queryset = queryset.filter(**{f'{date_field}__gte': _day_start(start) if is_datetime else start})
+    if end:
+        if is_datetime:
+            queryset = queryset.filter(**{f'{date_field}__lt': _day_start(end + timedelta(days=1))})
+        else:
+            queryset = queryset.filter(**{f'{date_field}__lte': end})
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+
+    rows = (queryset.order_by('id')
+            .values_list(*(field for _, field in columns))
+            .iterator(chunk_size=chunk_size))
+    return [header for header, _ in columns], rows
+
+
+def csv_blocks(header, rows, rows_per_block=ROWS_PER_BLOCK):
+    """Yield the CSV for ``header`` and ``rows`` as UTF-8 blocks of bytes."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    rows = iter(rows)
+    while True:
+        block = list(islice(rows, rows_per_block))
+        writer.writerows(block)
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if len(block) < rows_per_block:
+            return
+
+
+def gzip_blocks(blocks, level=6):
+    """Gzip a stream of byte blocks without collecting it first."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class RowCounter:
+    """Iterator wrapper that counts the rows passed through it."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+def export_chunks(dataset, start=None, end=None, statuses=None, compress=False, chunk_size=CHUNK_SIZE):
+    """Return ``(blocks, counter)``: the export as bytes blocks and its row counter.
+
+    Validation errors are raised here, before the first block is produced.
+    """
+    header, rows = export_rows(dataset, start, end, statuses, chunk_size)
+    counter = RowCounter(rows)
+    blocks = csv_blocks(header, counter)
+    return (gzip_blocks(blocks) if compress else blocks), counter
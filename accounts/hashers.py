@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2 hasher whose cost parameters come from settings.
+
+    The algorithm name is unchanged, so existing argon2 hashes still verify.
+    When ARGON2_TIME_COST, ARGON2_MEMORY_COST or ARGON2_PARALLELISM change,
+    must_update() reports stored hashes as outdated and they are re-hashed
+    with the new parameters on the user's next successful login.
+    """
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
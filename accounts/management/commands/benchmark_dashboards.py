@@ -0,0 +1,124 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import statistics
+import time
+
+from doctors.models import Doctor
+from patients.models import Patient
+
+User = get_user_model()
+
+DASHBOARDS = ['admin_dashboard', 'dashboard', 'doctor_dashboard', 'patient_dashboard']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare dashboard latency (p50/p99) and throughput through the WSGI '
+        'handler with the sync views and the ASGI handler with the async views, '
+        'under concurrent load. Uses the data already in the database; run '
+        'populate_data first (the first patient gets a benchmark login).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400,
+                            help='Requests per dashboard and handler (default: 400).')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Simultaneous clients: threads for WSGI, tasks for ASGI.')
+        parser.add_argument('--views', nargs='+', choices=DASHBOARDS, default=DASHBOARDS)
+        parser.add_argument('--with-cache', action='store_true',
+                            help='Leave the dashboard cache on (it is disabled by default).')
+
+    def handle(self, *args, **options):
+        self.options = options
+        users = self.dashboard_users()
+
+        overrides = {'ALLOWED_HOSTS': ['*']}
+        if not options['with_cache']:
+            overrides['DASHBOARD_CACHE_TIMEOUT'] = 0
+
+        self.stdout.write(
+            f"{options['requests']} requests per run, concurrency {options['concurrency']}\n"
+            f"{'view':<20} {'handler':<6} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9}"
+        )
+        with override_settings(**overrides):
+            for name in options['views']:
+                with override_settings(ROOT_URLCONF='hospital.urls'):
+                    wsgi = self.run_wsgi(users[name], reverse(name))
+                with override_settings(ROOT_URLCONF='hospital.asgi_urls'):
+                    asgi = asyncio.run(self.run_asgi(users[name], reverse(name)))
+                self.report(name, 'wsgi', *wsgi)
+                self.report(name, 'asgi', *asgi)
+
+    def dashboard_users(self):
+        doctor = Doctor.objects.select_related('user').order_by('id').first()
+        patient = Patient.objects.order_by('id').first()
+        if doctor is None or patient is None:
+            raise CommandError("Needs at least one doctor and one patient; run populate_data first.")
+
+        admin, _ = User.objects.get_or_create(
+            username='bench_admin', defaults={'is_staff': True, 'role': 'admin', 'password': '!'}
+        )
+        if patient.user_id is None:
+            # Seeded patients have no login; give the first one a benchmark user.
+            patient.user, _ = User.objects.get_or_create(
+                username='bench_patient', defaults={'role': 'patient', 'password': '!'}
+            )
+            patient.save(update_fields=['user'])
+        return {
+            'admin_dashboard': admin,
+            'dashboard': admin,
+            'doctor_dashboard': doctor.user,
+            'patient_dashboard': patient.user,
+        }
+
+    def shares(self):
+        total, concurrency = self.options['requests'], self.options['concurrency']
+        return [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+
+    def run_wsgi(self, user, url):
+        def worker(count):
+            client = Client()
+            client.force_login(user)
+            timings = []
+            for _ in range(count):
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {url} returned {response.status_code}")
+            connections.close_all()
+            return timings
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.options['concurrency']) as pool:
+            timings = [t for batch in pool.map(worker, self.shares()) for t in batch]
+        return timings, time.perf_counter() - started
+
+    async def run_asgi(self, user, url):
+        async def worker(count):
+            client = AsyncClient()
+            await client.aforce_login(user)
+            timings = []
+            for _ in range(count):
+                started = time.perf_counter()
+                response = await client.get(url)
+                timings.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {url} returned {response.status_code}")
+            return timings
+
+        started = time.perf_counter()
+        batches = await asyncio.gather(*(worker(count) for count in self.shares()))
+        return [t for batch in batches for t in batch], time.perf_counter() - started
+
+    def report(self, name, handler, timings, elapsed):
+        cuts = statistics.quantiles(timings, n=100, method='inclusive')
+        self.stdout.write(
+            f"{name:<20} {handler:<6} {cuts[49] * 1000:>9.2f} {cuts[98] * 1000:>9.2f} "
+            f"{len(timings) / elapsed:>9.1f}"
+        )
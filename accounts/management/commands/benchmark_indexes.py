@@ -0,0 +1,232 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+import statistics
+import time
+
+from doctors.models import Doctor
+from patients.models import Patient
+from patients.search import get_search_backend
+from appointments.models import Appointment
+from billing.models import Bill
+from billing.services import billing_summary
+from accounts.dashboard_cache import invalidate_all
+from stats.models import HospitalStats
+
+User = get_user_model()
+
+INDEXED_MODELS = [Appointment, Bill, Patient]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large synthetic dataset and report EXPLAIN output and timings '
+        'for the dashboard queries with and without the model indexes. '
+        'Works on SQLite and PostgreSQL; run it against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=1_000_000,
+                            help='Number of appointments to seed (default: 1,000,000).')
+        parser.add_argument('--doctors', type=int, default=1_000)
+        parser.add_argument('--patients', type=int, default=200_000)
+        parser.add_argument('--bills', type=int, default=500_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per query; the median is reported.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--skip-seed', action='store_true',
+                            help='Benchmark the data that is already in the database.')
+        parser.add_argument('--no-explain', action='store_true')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.stdout.write(f"Database vendor: {connection.vendor}")
+
+        if not options['skip_seed']:
+            self.seed(random.Random(options['seed']))
+
+        self.stdout.write(
+            f"Rows: {Doctor.objects.count():,} doctors, {Patient.objects.count():,} patients, "
+            f"{Appointment.objects.count():,} appointments, {Bill.objects.count():,} bills"
+        )
+
+        queries = self.build_queries()
+
+        self.stdout.write("\n== Without indexes")
+        self.drop_indexes()
+        try:
+            before = self.run_queries(queries)
+        finally:
+            self.stdout.write("\n== With indexes")
+            self.create_indexes()
+        after = self.run_queries(queries)
+
+        self.stdout.write("\n== Summary (median ms)")
+        for name in queries:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            self.stdout.write(
+                f"  {name:<36} {before[name]:>10.2f} -> {after[name]:>10.2f}  ({speedup:.1f}x)"
+            )
+
+    # --- seeding ---------------------------------------------------------------
+
+    def seed(self, rng):
+        opts = self.options
+        batch_size = opts['batch_size']
+        now = timezone.now()
+
+        missing = opts['doctors'] - Doctor.objects.count()
+        if missing > 0:
+            self.stdout.write(f"Seeding {missing:,} doctors...")
+            offset = User.objects.filter(username__startswith='bench_doctor_').count()
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    [
+                        User(username=f'bench_doctor_{offset + i}', first_name='Bench',
+                             last_name=f'Doctor {offset + i}', role='doctor', password='!')
+                        for i in range(missing)
+                    ],
+                    batch_size=batch_size,
+                )
+                Doctor.objects.bulk_create(
+                    [
+                        Doctor(user=user, specialization=rng.choice(['Cardiology', 'Neurology', 'ENT']),
+                               experience=rng.randint(1, 30), phone='555-0100')
+                        for user in users
+                    ],
+                    batch_size=batch_size,
+                )
+
+        missing = opts['patients'] - Patient.objects.count()
+        if missing > 0:
+            self.stdout.write(f"Seeding {missing:,} patients...")
+            self.bulk_insert(Patient, missing, lambda i: Patient(
+                first_name=f'Bench{i}', last_name='Patient', email=f'bench{i}@example.com',
+                phone='555-0101', date_of_birth=date(1950, 1, 1) + timedelta(days=rng.randint(0, 20000)),
+                gender=rng.choice('MFO'), address='', city='Benchville',
+            ), on_insert=lambda created: get_search_backend().reindex([patient.pk for patient in created]))
+
+        doctor_ids = list(Doctor.objects.values_list('id', flat=True))
+        patient_ids = list(Patient.objects.values_list('id', flat=True))
+
+        missing = opts['appointments'] - Appointment.objects.count()
+        if missing > 0:
+            self.stdout.write(f"Seeding {missing:,} appointments...")
+            statuses = ['scheduled', 'completed', 'cancelled']
+            before = Appointment.objects.count()
+            # Random appointment times can land on a doctor's booked slot;
+            # skip those rather than fail the insert.
+            self.bulk_insert(Appointment, missing, lambda i: Appointment(
+                patient_id=rng.choice(patient_ids), doctor_id=rng.choice(doctor_ids),
+                appointment_date=now + timedelta(minutes=rng.randint(-90 * 1440, 30 * 1440)),
+                reason='Benchmark visit', status=rng.choice(statuses),
+            ), ignore_conflicts=True)
+            skipped = missing - (Appointment.objects.count() - before)
+            if skipped:
+                self.stdout.write(f"  Skipped {skipped:,} appointments that landed on a booked slot.")
+
+        missing = opts['bills'] - Bill.objects.count()
+        if missing > 0:
+            self.stdout.write(f"Seeding {missing:,} bills...")
+            statuses = ['pending', 'paid', 'overdue']
+            self.bulk_insert(Bill, missing, lambda i: Bill(
+                patient_id=rng.choice(patient_ids), amount=Decimal(rng.randint(10000, 500000)) / 100,
+                description='Benchmark bill', status=rng.choice(statuses),
+                due_date=now.date() + timedelta(days=rng.randint(-60, 30)),
+            ))
+
+        # bulk_create bypasses the model signals that keep the stats row and
+        # cached dashboards fresh.
+        HospitalStats.rebuild()
+        invalidate_all()
+
+    def bulk_insert(self, model, count, factory, ignore_conflicts=False, on_insert=None):
+        batch_size = self.options['batch_size']
+        for start in range(0, count, batch_size):
+            with transaction.atomic():
+                created = model.objects.bulk_create(
+                    [factory(i) for i in range(start, min(start + batch_size, count))],
+                    batch_size=batch_size,
+                    ignore_conflicts=ignore_conflicts,
+                )
+                if on_insert:
+                    on_insert(created)
+
+    # --- indexes ---------------------------------------------------------------
+
+    def drop_indexes(self):
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+        self.analyze()
+
+    def create_indexes(self):
+        started = time.perf_counter()
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    editor.add_index(model, index)
+        self.analyze()
+        self.stdout.write(f"  (index build took {time.perf_counter() - started:.2f}s)")
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    # --- queries ---------------------------------------------------------------
+
+    def build_queries(self):
+        from django.db.models import Count, Q
+
+        doctor = Doctor.objects.order_by('?').first()
+        patient = Patient.objects.order_by('?').first()
+        today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        tomorrow_start = today_start + timedelta(days=1)
+
+        return {
+            'admin: scheduled today per doctor': lambda: Doctor.objects.annotate(
+                scheduled_today=Count('appointments', filter=Q(
+                    appointments__status='scheduled',
+                    appointments__appointment_date__gte=today_start,
+                    appointments__appointment_date__lt=tomorrow_start,
+                ))
+            ).order_by('id'),
+            'appointment status counts': lambda: Appointment.objects.status_counts(),
+            'doctor: status counts': lambda: Appointment.objects.status_counts(doctor=doctor),
+            'doctor: latest appointments': lambda: Appointment.objects.filter(
+                doctor=doctor).order_by('-appointment_date')[:10],
+            'patient: latest appointments': lambda: Appointment.objects.filter(
+                patient=patient).order_by('-appointment_date')[:10],
+            'patient: latest bills': lambda: Bill.objects.filter(
+                patient=patient).order_by('-issue_date')[:10],
+            'patient: pending bills': lambda: Bill.objects.filter(patient=patient, status='pending'),
+            'billing summary': billing_summary,
+            'pending bills, newest first': lambda: Bill.objects.filter(
+                status='pending').order_by('-issue_date')[:20],
+            'patients, newest first': lambda: Patient.objects.order_by('-created_at', '-id')[:50],
+        }
+
+    def run_queries(self, queries):
+        results = {}
+        for name, build in queries.items():
+            samples = []
+            for _ in range(self.options['repeat']):
+                started = time.perf_counter()
+                result = build()
+                if hasattr(result, 'explain'):
+                    list(result)
+                samples.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(samples)
+
+            self.stdout.write(f"\n-- {name}: {results[name]:.2f} ms")
+            result = build()
+            if not self.options['no_explain'] and hasattr(result, 'explain'):
+                for line in result.explain().splitlines():
+                    self.stdout.write(f"     {line}")
+        return results
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from concurrent.futures import ThreadPoolExecutor
+import statistics
+import time
+
+from accounts.hashers import TunableArgon2PasswordHasher
+
+
+class Command(BaseCommand):
+    help = (
+        'Time argon2 password hashing for the configured ARGON2_* settings and a '
+        'grid of alternatives, single-threaded and under concurrent load.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--time-cost', type=int, nargs='+', default=[1, 2, 3])
+        parser.add_argument('--memory-cost', type=int, nargs='+', default=[19456, 65536, 102400],
+                            help='Memory cost candidates in KiB.')
+        parser.add_argument('--parallelism', type=int, nargs='+', default=[1, 8])
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Hashes per candidate; the median is reported.')
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'AUTH_HASH_WORKERS', 4),
+                            help='Simultaneous logins to simulate for the throughput column.')
+        parser.add_argument('--target-ms', type=float, default=250,
+                            help='Flag candidates whose median exceeds this latency.')
+
+    def handle(self, *args, **options):
+        current = (settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM)
+        candidates = [current] + [
+            (t, m, p)
+            for t in options['time_cost']
+            for m in options['memory_cost']
+            for p in options['parallelism']
+            if (t, m, p) != current
+        ]
+
+        self.stdout.write(
+            f"{'time':>5} {'memory KiB':>11} {'par':>4} {'median ms':>10} "
+            f"{'logins/s @' + str(options['concurrency']):>14}"
+        )
+        for params in candidates:
+            median_ms, throughput = self.measure(*params, options['repeat'], options['concurrency'])
+            marker = ' (current)' if params == current else ''
+            if median_ms > options['target_ms']:
+                marker += ' over target'
+            self.stdout.write(
+                f"{params[0]:>5} {params[1]:>11,} {params[2]:>4} {median_ms:>10.1f} {throughput:>14.1f}{marker}"
+            )
+
+    def measure(self, time_cost, memory_cost, parallelism, repeat, concurrency):
+        hasher = TunableArgon2PasswordHasher()
+        argon2 = hasher._load_library()
+        params = dict(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+        def hash_once(_):
+            started = time.perf_counter()
+            argon2.PasswordHasher(**params).hash('benchmark-password')
+            return time.perf_counter() - started
+
+        timings = [hash_once(i) for i in range(repeat)]
+
+        logins = concurrency * repeat
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(hash_once, range(logins)))
+        throughput = logins / (time.perf_counter() - started)
+
+        return statistics.median(timings) * 1000, throughput
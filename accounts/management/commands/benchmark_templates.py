@@ -0,0 +1,135 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import gzip
+import logging
+import os
+import re
+import statistics
+import time
+
+from doctors.models import Doctor
+from hospital.middleware import metrics_snapshot
+from patients.models import Patient
+
+User = get_user_model()
+
+# URL name -> who views it.
+PAGES = {
+    'home': None,
+    'patient_login': None,
+    'doctor_login': None,
+    'admin_login': None,
+    'patient_register': None,
+    'doctor_register': None,
+    'patient_dashboard': 'patient',
+    'doctor_dashboard': 'doctor',
+    'dashboard': 'admin',
+    'admin_dashboard': 'admin',
+    'admin_doctors_list': 'admin',
+    'admin_patients_list': 'admin',
+}
+STATIC_LINK = re.compile(r'(?:href|src)="/static/([^"?#]+)"')
+
+
+class Command(BaseCommand):
+    help = (
+        'Render every HTML page through the full request stack and report '
+        'template render time, latency and response size (raw and gzipped), '
+        'the bytes of column data the database returns for the page, and the '
+        'size of the local static assets each page links to, which browsers '
+        'fetch once and then cache. Uses the data already in the '
+        'database; run populate_data first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per page (default: 200).')
+        parser.add_argument('--pages', nargs='+', choices=list(PAGES), default=list(PAGES))
+
+    def handle(self, *args, **options):
+        users = self.page_users()
+        # Budget warnings would drown the table; this run is about rendering.
+        logging.getLogger('hospital.performance').setLevel(logging.ERROR)
+        self.stdout.write(
+            f"{options['requests']} requests per page\n"
+            f"{'page':<20} {'tpl ms':>8} {'p50 ms':>8} {'html B':>9} {'gzip B':>8} {'db B':>9} {'assets B':>9}"
+        )
+        totals = [0, 0, 0]
+        with override_settings(ALLOWED_HOSTS=['*'], DASHBOARD_CACHE_TIMEOUT=0):
+            for name in options['pages']:
+                client = Client()
+                if PAGES[name]:
+                    client.force_login(users[PAGES[name]])
+                url = reverse(name)
+                timings = []
+                for _ in range(options['requests']):
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    timings.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        raise CommandError(f"GET {url} returned {response.status_code}")
+                html = response.content
+                compressed = len(gzip.compress(html))
+                fetched = self.fetched_bytes(client, url)
+                totals[0] += len(html)
+                totals[1] += compressed
+                totals[2] += fetched
+                template_ms = metrics_snapshot()[name]['template_ms_mean']
+                self.stdout.write(
+                    f"{name:<20} {template_ms:>8.2f} {statistics.median(timings) * 1000:>8.2f} "
+                    f"{len(html):>9,} {compressed:>8,} {fetched:>9,} {self.asset_bytes(html):>9,}"
+                )
+        self.stdout.write(f"{'total':<20} {'':>8} {'':>8} {totals[0]:>9,} {totals[1]:>8,} {totals[2]:>9,}")
+
+    def fetched_bytes(self, client, url):
+        """Bytes of column data in the rows the database returns for ``url``.
+
+        Runs the page's SELECTs again and sums the size of every value as
+        text; NULLs count as nothing.
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(url)
+        total = 0
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(query['sql'])
+                total += sum(len(value if isinstance(value, bytes) else str(value).encode())
+                             for row in cursor.fetchall() for value in row if value is not None)
+        return total
+
+    def asset_bytes(self, html):
+        """Total size of the local static files ``html`` links to."""
+        total = 0
+        for path in set(STATIC_LINK.findall(html.decode())):
+            source = finders.find(path)
+            if source:
+                total += os.path.getsize(source)
+            elif staticfiles_storage.exists(path):
+                # A fingerprinted name, only present after collectstatic.
+                total += staticfiles_storage.size(path)
+        return total
+
+    def page_users(self):
+        doctor = Doctor.objects.select_related('user').order_by('id').first()
+        patient = Patient.objects.order_by('id').first()
+        if doctor is None or patient is None:
+            raise CommandError("Needs at least one doctor and one patient; run populate_data first.")
+
+        admin, _ = User.objects.get_or_create(
+            username='bench_admin', defaults={'is_staff': True, 'role': 'admin', 'password': '!'}
+        )
+        if patient.user_id is None:
+            # Seeded patients have no login; give the first one a benchmark user.
+            patient.user, _ = User.objects.get_or_create(
+                username='bench_patient', defaults={'role': 'patient', 'password': '!'}
+            )
+            patient.save(update_fields=['user'])
+        return {'admin': admin, 'doctor': doctor.user, 'patient': patient.user}
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import date
+import sys
+import time
+
+from accounts.exports import CHUNK_SIZE, DATASETS, ExportError, export_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream bill or appointment history as CSV (optionally gzipped) to a '
+        'file or stdout, reporting rows/s on stderr. Memory use does not grow '
+        'with the number of rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--from', dest='start', type=date.fromisoformat,
+                            help='First date to include (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat,
+                            help='Last date to include (YYYY-MM-DD).')
+        parser.add_argument('--status', action='append', dest='statuses',
+                            help='Only rows with this status; repeat for several.')
+        parser.add_argument('--output', '-o', default='-',
+                            help='File to write, or - for stdout (default). A .gz name implies --gzip.')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the CSV.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help=f'Rows fetched per database round-trip (default: {CHUNK_SIZE}).')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        compress = options['gzip'] or output.endswith('.gz')
+        try:
+            blocks, counter = export_chunks(
+                options['dataset'], options['start'], options['end'], options['statuses'],
+                compress=compress, chunk_size=options['chunk_size'],
+            )
+        except ExportError as error:
+            raise CommandError(error)
+
+        started = time.perf_counter()
+        written = 0
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for block in blocks:
+                stream.write(block)
+                written += len(block)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+            else:
+                stream.flush()
+
+        elapsed = time.perf_counter() - started
+        rate = counter.count / elapsed if elapsed else 0
+        self.stderr.write(self.style.SUCCESS(
+            f"✓ Exported {counter.count:,} {options['dataset']} ({written / 1e6:,.1f} MB) "
+            f"in {elapsed:.2f}s ({rate:,.0f} rows/s)."
+        ))
@@ -1,23 +1,150 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
 from django.utils import timezone
-from datetime import timedelta
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 import random
+import time as clock
 from faker import Faker
 
 from doctors.models import Doctor
 from patients.models import Patient
+from patients.search import get_search_backend
 from appointments.models import Appointment
 from billing.models import Bill
+from accounts.dashboard_cache import invalidate_all
+from stats.models import HospitalStats
 
 User = get_user_model()
 
+# Rows per INSERT statement; keeps PostgreSQL under its bind-parameter limit.
+INSERT_BATCH_SIZE = 1000
+
+# Rows per generation chunk. Fixed, rather than following --batch-size, so the
+# chunk boundaries (and therefore the data) depend on --seed alone.
+GENERATE_CHUNK_SIZE = 1000
+
+SPECIALIZATIONS = ['Cardiology', 'Neurology', 'Orthopedics', 'Pediatrics', 'General Surgery',
+                   'Gynecology', 'Dermatology', 'ENT', 'Psychiatry', 'Oncology']
+
+
+# Row generators run in worker processes, so they only build plain tuples and
+# never touch the database. Each chunk gets its own RNG derived from the seed
+# and chunk number, which keeps the output identical for a given --seed no
+# matter what --batch-size or --workers are used.
+
+def _chunk_rng(seed, kind, chunk):
+    rng = random.Random(f"{seed}:{kind}:{chunk}")
+    fake = Faker()
+    fake.seed_instance(rng.getrandbits(32))
+    return rng, fake
+
+
+def _generate_patients(args):
+    seed, chunk, start, stop = args
+    rng, fake = _chunk_rng(seed, 'patients', chunk)
+    rows = []
+    for _ in range(start, stop):
+        rows.append((
+            fake.first_name(),
+            fake.last_name(),
+            fake.email(),
+            fake.phone_number()[:15],
+            fake.date_of_birth(minimum_age=18, maximum_age=80),
+            rng.choice(['M', 'F', 'O']),
+            fake.address(),
+            fake.city(),
+            fake.sentence(nb_words=10) if rng.random() < 0.5 else None,
+            fake.word() if rng.random() < 0.5 else None,
+        ))
+    return rows
+
+
+# Appointments fall on 30-minute slots from 60 days back to 30 days ahead.
+APPOINTMENT_SLOTS = 90 * 48
+
+
+def _generate_appointments(args):
+    seed, chunk, start, stop, patient_count, doctor_count, anchor, offset = args
+    rng, fake = _chunk_rng(seed, 'appointments', chunk)
+    # Faker sentences dominate generation time, so draw from a per-chunk pool.
+    reasons = [fake.sentence(nb_words=8) for _ in range(64)]
+    notes = [fake.sentence(nb_words=12) for _ in range(64)]
+    rows = []
+    for i in range(offset + start, offset + stop):
+        # Doctors take turns and each visit gets its own slot (7919 is coprime
+        # with APPOINTMENT_SLOTS), so no doctor is double-booked. Once a
+        # doctor's slots run out, further visits are recorded as cancelled.
+        visit = i // doctor_count
+        slot = (visit * 7919) % APPOINTMENT_SLOTS - 60 * 48
+        rows.append((
+            rng.randrange(patient_count),
+            i % doctor_count,
+            anchor + timedelta(minutes=30 * slot),
+            rng.choice(reasons),
+            rng.choice(['scheduled', 'completed', 'cancelled']) if visit < APPOINTMENT_SLOTS else 'cancelled',
+            rng.choice(notes) if rng.random() < 0.5 else None,
+        ))
+    return rows
+
+
+def _generate_bills(args):
+    seed, chunk, start, stop, appointment_count, patient_count, today = args
+    rng, fake = _chunk_rng(seed, 'bills', chunk)
+    descriptions = [fake.sentence(nb_words=10) for _ in range(64)]
+    rows = []
+    for i in range(start, stop):
+        issue_date = today - timedelta(days=rng.randint(0, 90))
+        rows.append((
+            # An appointment is billed at most once, so bills beyond the
+            # number of appointments are issued without one.
+            i if i < appointment_count else None,
+            rng.randrange(patient_count),
+            Decimal(rng.randint(10000, 500000)) / 100,
+            rng.choice(descriptions),
+            rng.choice(['pending', 'paid', 'overdue']),
+            issue_date + timedelta(days=30),
+            issue_date + timedelta(days=rng.randint(1, 30)) if rng.random() < 0.5 else None,
+        ))
+    return rows
+
 
 class Command(BaseCommand):
     help = 'Populate the database with sample data for testing'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=15)
+        parser.add_argument('--patients', type=int, default=50)
+        parser.add_argument('--appointments', type=int, default=60)
+        parser.add_argument('--bills', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows generated and committed per transaction (default: 5000).')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed; the same --seed always produces the same data.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes used to generate rows (inserts stay in this process).')
+
     def handle(self, *args, **options):
-        fake = Faker()
+        for name in ('doctors', 'patients', 'appointments', 'bills', 'batch_size', 'workers'):
+            if options[name] < 0 or (name in ('batch_size', 'workers') and options[name] == 0):
+                raise CommandError(f"--{name.replace('_', '-')} must be a positive number.")
+
+        self.options = options
+        self.seed = options['seed']
+        self.batch_size = options['batch_size']
+        self.executor = ProcessPoolExecutor(options['workers']) if options['workers'] > 1 else None
+        try:
+            self.populate()
+        finally:
+            if self.executor:
+                self.executor.shutdown()
+
+    def populate(self):
+        options = self.options
         self.stdout.write("Starting data population...")
 
         # Create Admin User
@@ -30,7 +157,7 @@ class Command(BaseCommand):
                 'last_name': 'Administrator',
                 'is_staff': True,
                 'is_superuser': True,
-                'password': 'admin123'
+                'role': 'admin',
             }
         )
         if created:
@@ -38,117 +165,171 @@ class Command(BaseCommand):
             admin_user.save()
             self.stdout.write(f"  ✓ Created admin user: admin / admin123")
 
-        # Create Doctors
-        self.stdout.write("Creating 15 sample doctors...")
-        specializations = ['Cardiology', 'Neurology', 'Orthopedics', 'Pediatrics', 'General Surgery',
-                          'Gynecology', 'Dermatology', 'ENT', 'Psychiatry', 'Oncology']
-        
-        doctors = []
-        for i in range(15):
-            # Create user for doctor
-            username = f"doctor{i+1}"
-            user, created = User.objects.get_or_create(
-                username=username,
-                defaults={
-                    'email': fake.email(),
-                    'first_name': fake.first_name(),
-                    'last_name': fake.last_name(),
-                    'password': 'password123'
-                }
-            )
-            if created:
-                user.set_password('password123')
-                user.save()
-
-            # Create doctor profile
-            doctor, created = Doctor.objects.get_or_create(
-                user=user,
-                defaults={
-                    'specialization': random.choice(specializations),
-                    'experience': random.randint(2, 25),
-                    'phone': fake.phone_number()
-                }
-            )
-            doctors.append(doctor)  # Add to list regardless of creation
-            if created:
-                self.stdout.write(f"  ✓ Created doctor: {user.first_name} {user.last_name}")
-
-        # Create 50 Patients
-        self.stdout.write("Creating 50 sample patients...")
-        patients = []
-        for i in range(50):
-            patient = Patient.objects.create(
-                first_name=fake.first_name(),
-                last_name=fake.last_name(),
-                email=fake.email(),
-                phone=fake.phone_number(),
-                date_of_birth=fake.date_of_birth(minimum_age=18, maximum_age=80),
-                gender=random.choice(['M', 'F', 'O']),
-                address=fake.address(),
-                city=fake.city(),
-                medical_history=fake.sentence(nb_words=10) if random.choice([True, False]) else None,
-                allergies=fake.word() if random.choice([True, False]) else None
-            )
-            patients.append(patient)
-            if (i + 1) % 10 == 0:
-                self.stdout.write(f"  ✓ Created {i + 1} patients")
-
-        # Create Appointments
-        self.stdout.write("Creating sample appointments...")
-        appointment_count = 0
-        for patient in patients[:30]:  # Create appointments for 30 patients
-            num_appointments = random.randint(1, 3)
-            for _ in range(num_appointments):
-                doctor = random.choice(doctors)
-                appointment_date = timezone.now() + timedelta(days=random.randint(-60, 30))
-                
-                appointment = Appointment.objects.create(
-                    patient=patient,
-                    doctor=doctor,
-                    appointment_date=appointment_date,
-                    reason=fake.sentence(nb_words=8),
-                    status=random.choice(['scheduled', 'completed', 'cancelled']),
-                    notes=fake.sentence(nb_words=12) if random.choice([True, False]) else None
-                )
-                appointment_count += 1
-
-        self.stdout.write(f"  ✓ Created {appointment_count} appointments")
-
-        # Create Bills
-        self.stdout.write("Creating sample bills...")
-        bill_count = 0
-        for patient in patients[:40]:  # Create bills for 40 patients
-            num_bills = random.randint(1, 5)
-            for _ in range(num_bills):
-                issue_date = timezone.now() - timedelta(days=random.randint(0, 90))
-                
-                bill = Bill.objects.create(
-                    patient=patient,
-                    appointment=random.choice(
-                        Appointment.objects.filter(patient=patient)
-                    ) if Appointment.objects.filter(patient=patient).exists() else None,
-                    amount=round(random.uniform(100, 5000), 2),
-                    description=fake.sentence(nb_words=10),
-                    status=random.choice(['pending', 'paid', 'overdue']),
-                    due_date=issue_date + timedelta(days=30),
-                    paid_date=issue_date + timedelta(days=random.randint(1, 30)) 
-                              if random.choice([True, False]) else None
-                )
-                bill_count += 1
-
-        self.stdout.write(f"  ✓ Created {bill_count} bills")
+        doctors = self.create_doctors(options['doctors'])
+        patient_ids = self.create_patients(options['patients'])
+        appointments = self.create_appointments(options['appointments'], patient_ids, doctors)
+        bill_count = self.create_bills(options['bills'], appointments, patient_ids)
+        # bulk_create bypasses the model signals that keep the stats row and
+        # cached dashboards fresh.
+        HospitalStats.rebuild()
+        invalidate_all()
 
         self.stdout.write(self.style.SUCCESS(
             f'\n✓ Successfully populated database!\n'
-            f'  • Doctors: 15\n'
-            f'  • Patients: 50\n'
-            f'  • Appointments: {appointment_count}\n'
+            f'  • Doctors: {len(doctors)}\n'
+            f'  • Patients: {len(patient_ids)}\n'
+            f'  • Appointments: {len(appointments)}\n'
             f'  • Bills: {bill_count}\n'
             f'\nLogin Credentials:\n'
             f'  ADMIN:\n'
             f'    Username: admin\n'
             f'    Password: admin123\n'
-            f'\n  DOCTOR (Any from 1-15):\n'
-            f'    Username: doctor1 (or doctor2, doctor3... doctor15)\n'
+            f'\n  DOCTOR (Any from 1-{len(doctors)}):\n'
+            f'    Username: doctor1 (or doctor2, doctor3... doctor{len(doctors)})\n'
             f'    Password: password123\n'
         ))
+
+    def generate(self, func, total, *extra):
+        """Yield generated rows in batches of --batch-size, in order.
+
+        Rows are generated in fixed-size chunks (using worker processes if
+        enabled) and regrouped into batches, so --batch-size only decides how
+        many rows go into each transaction.
+        """
+        batch = []
+        for rows in self.generate_chunks(func, total, *extra):
+            batch.extend(rows)
+            while len(batch) >= self.batch_size:
+                yield batch[:self.batch_size]
+                del batch[:self.batch_size]
+        if batch:
+            yield batch
+
+    def generate_chunks(self, func, total, *extra):
+        """Yield generated row chunks in order.
+
+        At most two chunks per worker are in flight, so memory stays bounded
+        while the main process is busy inserting.
+        """
+        tasks = (
+            (self.seed, chunk, start, min(start + GENERATE_CHUNK_SIZE, total), *extra)
+            for chunk, start in enumerate(range(0, total, GENERATE_CHUNK_SIZE))
+        )
+        if not self.executor:
+            yield from map(func, tasks)
+            return
+
+        pending = deque()
+        for task in tasks:
+            pending.append(self.executor.submit(func, task))
+            if len(pending) >= 2 * self.options['workers']:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def report(self, label, count, started):
+        elapsed = clock.perf_counter() - started
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(f"  ✓ Created {count:,} {label} in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+
+    def create_doctors(self, count):
+        """Create doctor1..doctorN, reusing any that already exist; return Doctor ids."""
+        self.stdout.write(f"Creating {count:,} sample doctors...")
+        started = clock.perf_counter()
+        rng, fake = _chunk_rng(self.seed, 'doctors', 0)
+        # Every sample doctor shares one password, so hash it once rather
+        # than paying the full hasher cost per synthetic account.
+        password = make_password('password123')
+
+        usernames = [f"doctor{i + 1}" for i in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        with transaction.atomic():
+            User.objects.bulk_create(
+                [
+                    User(username=username, email=f'{username}@hospital.com', first_name=fake.first_name(),
+                         last_name=fake.last_name(), password=password, role='doctor')
+                    for username in usernames if username not in existing
+                ],
+                batch_size=INSERT_BATCH_SIZE,
+            )
+            user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+            with_profile = set(Doctor.objects.filter(user_id__in=user_ids.values()).values_list('user_id', flat=True))
+            Doctor.objects.bulk_create(
+                [
+                    Doctor(user_id=user_ids[username], specialization=rng.choice(SPECIALIZATIONS),
+                           experience=rng.randint(2, 25), phone=fake.phone_number()[:15])
+                    for username in usernames if user_ids[username] not in with_profile
+                ],
+                batch_size=INSERT_BATCH_SIZE,
+            )
+        doctor_ids = list(
+            Doctor.objects.filter(user_id__in=user_ids.values()).order_by('id').values_list('id', flat=True)
+        )
+        self.report('doctors', len(doctor_ids), started)
+        return doctor_ids
+
+    def create_patients(self, count):
+        self.stdout.write(f"Creating {count:,} sample patients...")
+        started = clock.perf_counter()
+        patient_ids = []
+        for rows in self.generate(_generate_patients, count):
+            with transaction.atomic():
+                created = Patient.objects.bulk_create([
+                    Patient(first_name=row[0], last_name=row[1], email=row[2], phone=row[3],
+                            date_of_birth=row[4], gender=row[5], address=row[6], city=row[7],
+                            medical_history=row[8], allergies=row[9])
+                    for row in rows
+                ], batch_size=INSERT_BATCH_SIZE)
+                # bulk_create skips the signal that keeps the search index in sync.
+                get_search_backend().reindex([patient.pk for patient in created])
+            patient_ids.extend(patient.pk for patient in created)
+        self.report('patients', len(patient_ids), started)
+        return patient_ids
+
+    def create_appointments(self, count, patient_ids, doctor_ids):
+        """Create appointments; return ``(id, patient_id)`` pairs for billing."""
+        if not patient_ids or not doctor_ids:
+            return []
+        self.stdout.write(f"Creating {count:,} sample appointments...")
+        started = clock.perf_counter()
+        anchor = timezone.make_aware(datetime.combine(timezone.localdate(), time(9, 0)))
+        # Continue the slot sequence after earlier runs so reruns don't collide.
+        offset = Appointment.objects.count()
+        appointments = []
+        for rows in self.generate(_generate_appointments, count,
+                                  len(patient_ids), len(doctor_ids), anchor, offset):
+            with transaction.atomic():
+                created = Appointment.objects.bulk_create([
+                    Appointment(patient_id=patient_ids[row[0]], doctor_id=doctor_ids[row[1]],
+                                appointment_date=row[2], reason=row[3], status=row[4], notes=row[5])
+                    for row in rows
+                ], batch_size=INSERT_BATCH_SIZE)
+            appointments.extend((appointment.pk, appointment.patient_id) for appointment in created)
+        self.report('appointments', len(appointments), started)
+        return appointments
+
+    def create_bills(self, count, appointments, patient_ids):
+        if not patient_ids:
+            return 0
+        self.stdout.write(f"Creating {count:,} sample bills...")
+        started = clock.perf_counter()
+        created = 0
+        # Bill i goes to the i-th appointment of a seeded shuffle.
+        order = list(range(len(appointments)))
+        random.Random(f"{self.seed}:bill-appointments").shuffle(order)
+        for rows in self.generate(_generate_bills, count,
+                                  len(appointments), len(patient_ids), timezone.localdate()):
+            bills = []
+            for appointment_index, patient_index, amount, description, status, due_date, paid_date in rows:
+                if appointment_index is None:
+                    appointment_id, patient_id = None, patient_ids[patient_index]
+                else:
+                    appointment_id, patient_id = appointments[order[appointment_index]]
+                bills.append(Bill(patient_id=patient_id, appointment_id=appointment_id, amount=amount,
+                                  description=description, status=status, due_date=due_date,
+                                  paid_date=paid_date))
+            with transaction.atomic():
+                Bill.objects.bulk_create(bills, batch_size=INSERT_BATCH_SIZE)
+            created += len(bills)
+        self.report('bills', created, started)
+        return created
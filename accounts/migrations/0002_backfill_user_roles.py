@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:00
+
+from django.db import migrations
+
+
+def backfill_user_roles(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Doctor = apps.get_model('doctors', 'Doctor')
+
+    unassigned = User.objects.filter(role='')
+    doctor_user_ids = Doctor.objects.values('user_id')
+    unassigned.filter(pk__in=doctor_user_ids).update(role='doctor')
+    unassigned.filter(is_staff=True).update(role='admin')
+    unassigned.update(role='patient')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('doctors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_roles, migrations.RunPython.noop),
+    ]
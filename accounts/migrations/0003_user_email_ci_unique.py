@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:00
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import Lower
+
+
+def dedupe_user_emails(apps, schema_editor):
+    """Keep each email on one account and clear it on the others.
+
+    The account kept is the one used most recently (then the oldest). The
+    others keep working, and their patient or doctor profile keeps its own
+    copy of the email.
+    """
+    User = apps.get_model('accounts', 'User')
+    duplicated = (User.objects.exclude(email='').annotate(email_lower=Lower('email'))
+                  .values('email_lower').annotate(accounts=Count('id')).filter(accounts__gt=1)
+                  .values_list('email_lower', flat=True))
+    for email in list(duplicated):
+        ids = list(User.objects.annotate(email_lower=Lower('email')).filter(email_lower=email)
+                   .order_by(F('last_login').desc(nulls_last=True), 'id').values_list('id', flat=True))
+        User.objects.filter(pk__in=ids[1:]).update(email='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_backfill_user_roles'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_user_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='user_email_ci_unique'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 
 
 class User(AbstractUser):
@@ -10,4 +11,13 @@ class User(AbstractUser):
         ('patient', 'Patient'),
     )
 
-    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
\ No newline at end of file
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # One account per email, whatever its case. Accounts created
+            # without an email (e.g. createsuperuser) are left out.
+            models.UniqueConstraint(
+                Lower('email'), name='user_email_ci_unique', condition=~models.Q(email=''),
+            ),
+        ]
@@ -0,0 +1,103 @@
+import base64
+import csv
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+
+
+def get_page_size(request):
+    """Read ``?page_size=`` from the request, clamped to the configured maximum."""
+    default = getattr(settings, 'LIST_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'LIST_MAX_PAGE_SIZE', 500)
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except ValueError:
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the key values stored in ``cursor``, or None if it is malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def cursor_values(model, fields, values):
+    """Convert decoded cursor ``values`` to the types of ``fields``.
+
+    Returns None when they don't fit, e.g. a tampered cursor holding text
+    where an id belongs.
+    """
+    if values is None or len(values) != len(fields):
+        return None
+    try:
+        converted = [model._meta.get_field(field).to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+    return None if None in converted else converted
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=50):
+    """Return ``(rows, next_cursor)`` for one page of ``queryset``.
+
+    ``ordering`` is a tuple of field names (``-`` for descending) that must
+    end in a unique column, e.g. ``('-created_at', '-id')``. Rather than
+    using OFFSET, the page starts strictly after the row the cursor points
+    at, so every page costs the same no matter how deep it is.
+    """
+    fields = [name.lstrip('-') for name in ordering]
+    queryset = queryset.order_by(*ordering)
+
+    values = cursor_values(queryset.model, fields, decode_cursor(cursor))
+    if values is not None:
+        after = Q()
+        for i, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            step = Q(**{f'{fields[i]}__{lookup}': values[i]})
+            for field, value in zip(fields[:i], values[:i]):
+                step &= Q(**{field: value})
+            after |= step
+        queryset = queryset.filter(after)
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, field) for field in fields])
+    return rows, next_cursor
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, header, rows):
+    """Stream ``rows`` (an iterable of sequences) as a CSV download."""
+    writer = csv.writer(Echo())
+
+    def generate():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,43 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from doctors.models import Doctor
+
+
+def resolve_role(user):
+    """Return the role of ``user`` ('admin', 'doctor' or 'patient'), or None.
+
+    The role is read from ``User.role``, which is loaded with the user, so
+    this costs no queries. Accounts created before roles were recorded are
+    resolved once and the result is saved.
+    """
+    if not user.is_authenticated:
+        return None
+    if not user.role:
+        if Doctor.objects.filter(user=user).exists():
+            user.role = 'doctor'
+        elif user.is_staff:
+            user.role = 'admin'
+        else:
+            user.role = 'patient'
+        user.save(update_fields=['role'])
+    return user.role
+
+
+class RoleMiddleware:
+    """Expose the current user's role as ``request.role``.
+
+    The role is resolved lazily; async views should call
+    ``resolve_role(await request.auser())`` instead.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.role = SimpleLazyObject(lambda: resolve_role(request.user))
+        return self.get_response(request)
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from appointments.models import Appointment
+from billing.models import Bill
+from doctors.models import Doctor
+from patients.models import Patient
+
+from .dashboard_cache import (
+    DOCTORS_SCOPE, GLOBAL_SCOPE, PATIENTS_SCOPE, invalidate, user_scope,
+)
+
+User = get_user_model()
+
+
+def _invalidate_on_commit(scopes):
+    # Wait for the commit so a concurrent request can't re-cache the old data.
+    transaction.on_commit(lambda: invalidate(*scopes))
+
+
+def _patient_user_scopes(patient_id):
+    user_ids = Patient.objects.filter(pk=patient_id).values_list('user_id', flat=True)
+    return [user_scope(user_id) for user_id in user_ids if user_id]
+
+
+def _doctor_user_scopes(doctor_id):
+    user_ids = Doctor.objects.filter(pk=doctor_id).values_list('user_id', flat=True)
+    return [user_scope(user_id) for user_id in user_ids]
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def invalidate_appointment_dashboards(sender, instance, **kwargs):
+    _invalidate_on_commit([
+        GLOBAL_SCOPE,
+        *_patient_user_scopes(instance.patient_id),
+        *_doctor_user_scopes(instance.doctor_id),
+    ])
+
+
+@receiver([post_save, post_delete], sender=Bill)
+def invalidate_bill_dashboards(sender, instance, **kwargs):
+    _invalidate_on_commit([GLOBAL_SCOPE, *_patient_user_scopes(instance.patient_id)])
+
+
+@receiver([post_save, post_delete], sender=Patient)
+def invalidate_patient_dashboards(sender, instance, **kwargs):
+    scopes = [GLOBAL_SCOPE, PATIENTS_SCOPE]
+    if instance.user_id:
+        scopes.append(user_scope(instance.user_id))
+    _invalidate_on_commit(scopes)
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def invalidate_doctor_dashboards(sender, instance, **kwargs):
+    _invalidate_on_commit([GLOBAL_SCOPE, DOCTORS_SCOPE, user_scope(instance.user_id)])
+
+
+@receiver(post_save, sender=Doctor)
+def mark_user_as_doctor(sender, instance, created, **kwargs):
+    # Keep User.role in step with doctor profiles created outside registration.
+    if created:
+        User.objects.filter(pk=instance.user_id).exclude(role='doctor').update(role='doctor')
@@ -1,3 +1,615 @@
-from django.test import TestCase
+import csv
+import gzip
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from appointments.models import Appointment
+from billing.models import Bill
+from doctors.models import Doctor
+from patients.models import Patient
+
+from . import dashboard_cache
+from .exports import csv_blocks
+from .pagination import encode_cursor
+
+User = get_user_model()
+
+
+@override_settings(DASHBOARD_CACHE_TIMEOUT=0)
+class AdminDashboardQueryCountTests(TestCase):
+    """The admin dashboard must not issue a query per doctor."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='chairman', password='secret123', is_staff=True, role='admin'
+        )
+        self.patient = Patient.objects.create(
+            first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+            address='', city='',
+        )
+        self.client.force_login(self.admin)
+
+    def add_doctors(self, count):
+        now = timezone.now().replace(hour=9, minute=0)
+        for _ in range(count):
+            n = Doctor.objects.count() + 1
+            user = User.objects.create_user(
+                username=f'doc{n}', first_name=f'Doc{n}', password='secret123'
+            )
+            doctor = Doctor.objects.create(
+                user=user, specialization='ENT', experience=5, phone='555'
+            )
+            for slot, status in enumerate(('scheduled', 'scheduled', 'completed')):
+                Appointment.objects.create(
+                    patient=self.patient, doctor=doctor,
+                    appointment_date=now + timedelta(minutes=n, seconds=slot),
+                    reason='Checkup', status=status,
+                )
+
+    def dashboard_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_independent_of_roster_size(self):
+        self.add_doctors(2)
+        small = self.dashboard_queries()
+        self.add_doctors(10)
+        large = self.dashboard_queries()
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 15)
+
+    def test_scheduled_today_counts(self):
+        self.add_doctors(1)
+        response = self.client.get(reverse('admin_dashboard'))
+        [row] = response.context['doctors_with_appointments']
+        self.assertEqual(row['scheduled_today'], 2)
+        self.assertTrue(row['is_free'])
+
+
+class AdminListPaginationTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='chairman', password='secret123', is_staff=True, role='admin'
+        )
+        self.client.force_login(self.admin)
+        for i in range(7):
+            Patient.objects.create(
+                first_name=f'Pat{i}', last_name='Ient', email=f'pat{i}@example.com',
+                phone='555', date_of_birth=date(1990, 1, 1), gender='F' if i % 2 else 'M',
+                address='', city='Springfield' if i < 5 else 'Shelbyville',
+            )
+
+    def test_cursor_walks_every_patient_once_newest_first(self):
+        seen = []
+        params = {'page_size': 3}
+        while True:
+            response = self.client.get(reverse('admin_patients_list'), params)
+            seen.extend(p.pk for p in response.context['patients'])
+            cursor = response.context['next_cursor']
+            if not cursor:
+                break
+            params['cursor'] = cursor
+        expected = list(Patient.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_tampered_cursor_is_ignored(self):
+        for name, values in (('admin_patients_list', ['abc', 'x']), ('admin_patients_list', [None, 1]),
+                             ('admin_doctors_list', ['abc']), ('admin_doctors_list', [[1]])):
+            response = self.client.get(reverse(name), {'cursor': encode_cursor(values)})
+            self.assertEqual(response.status_code, 200, (name, values))
+        response = self.client.get(reverse('admin_patients_list'), {'cursor': encode_cursor(['abc', 'x'])})
+        self.assertEqual(len(response.context['patients']), 7)
+
+    def test_filters(self):
+        response = self.client.get(reverse('admin_patients_list'), {'city': 'shelbyville'})
+        self.assertEqual(len(response.context['patients']), 2)
+        response = self.client.get(reverse('admin_patients_list'), {'q': 'pat3@'})
+        self.assertEqual([p.first_name for p in response.context['patients']], ['Pat3'])
+
+    def test_csv_export_streams_all_matching_rows(self):
+        response = self.client.get(reverse('admin_patients_list'), {'export': 'csv', 'gender': 'M'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'First name')
+        self.assertEqual(len(lines), 1 + 4)
+
+    def test_doctor_list_query_count_is_fixed(self):
+        def list_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(reverse('admin_doctors_list'))
+            return len(ctx.captured_queries)
+
+        Doctor.objects.create(user=User.objects.create_user(username='doc1'),
+                              specialization='ENT', experience=1, phone='555')
+        one = list_queries()
+        for i in range(2, 6):
+            Doctor.objects.create(user=User.objects.create_user(username=f'doc{i}'),
+                                  specialization='ENT', experience=1, phone='555')
+        self.assertEqual(list_queries(), one)
+
+
+class DashboardCacheTests(TestCase):
+
+    def setUp(self):
+        dashboard_cache.get_cache().clear()
+        self.patient_user = User.objects.create_user(username='pat', password='secret123')
+        self.patient = Patient.objects.create(
+            user=self.patient_user, first_name='Pat', last_name='Ient',
+            email='pat@example.com', phone='555', date_of_birth=date(1990, 1, 1),
+            gender='F', address='', city='',
+        )
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create_user(username='doc', password='secret123'),
+            specialization='ENT', experience=5, phone='555',
+        )
+        self.other_user = User.objects.create_user(username='other', password='secret123')
+        Patient.objects.create(
+            user=self.other_user, first_name='Oth', last_name='Er',
+            email='other@example.com', phone='555', date_of_birth=date(1990, 1, 1),
+            gender='M', address='', city='',
+        )
+
+    def get_dashboard(self, user):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('patient_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        # The conditional-GET validator runs on every request; only the view
+        # itself selects appointment rows.
+        touched = [q['sql'] for q in ctx.captured_queries
+                   if q['sql'].startswith('SELECT "appointments_appointment"')]
+        return response, bool(touched)
+
+    def test_second_request_is_served_from_cache(self):
+        _, first_hit_db = self.get_dashboard(self.patient_user)
+        response, second_hit_db = self.get_dashboard(self.patient_user)
+        self.assertTrue(first_hit_db)
+        self.assertFalse(second_hit_db)
+        self.assertContains(response, 'Pat')
+        self.assertGreaterEqual(dashboard_cache.cache_stats()['patient_dashboard']['hits'], 1)
+
+    def test_writes_invalidate_only_affected_users(self):
+        self.get_dashboard(self.patient_user)
+        self.get_dashboard(self.other_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Bill.objects.create(patient=self.patient, amount='10.00', description='Visit',
+                                due_date=date(2030, 1, 1))
+        _, patient_refreshed = self.get_dashboard(self.patient_user)
+        _, other_refreshed = self.get_dashboard(self.other_user)
+        self.assertTrue(patient_refreshed)
+        self.assertFalse(other_refreshed)
+
+    def test_new_doctor_invalidates_patient_dashboards(self):
+        self.get_dashboard(self.other_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Doctor.objects.create(
+                user=User.objects.create_user(username='doc2'),
+                specialization='ENT', experience=1, phone='555',
+            )
+        response, refreshed = self.get_dashboard(self.other_user)
+        self.assertTrue(refreshed)
+        self.assertEqual(response.context['total_doctors'], 2)
+
+
+class ConditionalDashboardTests(TestCase):
+
+    def setUp(self):
+        dashboard_cache.get_cache().clear()
+        self.patient_user = User.objects.create_user(username='pat', role='patient')
+        self.patient = Patient.objects.create(
+            user=self.patient_user, first_name='Pat', last_name='Ient',
+            email='pat@example.com', phone='555', date_of_birth=date(1990, 1, 1),
+            gender='F', address='', city='',
+        )
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create_user(username='doc', role='doctor'),
+            specialization='ENT', experience=5, phone='555',
+        )
+        self.appointment = Appointment.objects.create(patient=self.patient, doctor=self.doctor,
+                                                      appointment_date=timezone.now(), reason='Checkup')
+
+    def get(self, user, name, **headers):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(name), headers=headers)
+        return response, len(ctx.captured_queries)
+
+    def test_matching_etag_gets_304_without_building_the_page(self):
+        first, full_queries = self.get(self.patient_user, 'patient_dashboard')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('private', first['Cache-Control'])
+        self.assertIn('no-cache', first['Cache-Control'])
+        self.assertFalse(first.has_header('Last-Modified'))
+
+        cache_before = dashboard_cache.cache_stats()['patient_dashboard']
+        again, queries = self.get(self.patient_user, 'patient_dashboard', if_none_match=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertEqual(again.content, b'')
+        self.assertLess(queries, full_queries)
+        self.assertEqual(dashboard_cache.cache_stats()['patient_dashboard'], cache_before)
+
+        # Without Last-Modified, If-Modified-Since alone never earns a 304.
+        since, _ = self.get(self.patient_user, 'patient_dashboard',
+                            if_modified_since='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(since.status_code, 200)
+
+    def test_patient_etag_follows_their_bills_and_appointments(self):
+        etags = [self.get(self.patient_user, 'patient_dashboard')[0]['ETag']]
+        bill = Bill.objects.create(patient=self.patient, amount='10.00', description='Visit',
+                                   due_date=date(2030, 1, 1))
+        etags.append(self.get(self.patient_user, 'patient_dashboard')[0]['ETag'])
+        bill.delete()
+        etags.append(self.get(self.patient_user, 'patient_dashboard')[0]['ETag'])
+        self.appointment.status = 'cancelled'
+        self.appointment.save()
+        response, _ = self.get(self.patient_user, 'patient_dashboard', if_none_match=etags[-1])
+        self.assertEqual(response.status_code, 200)
+        etags.append(response['ETag'])
+        # Deleting the bill restores the original page, and its ETag.
+        self.assertEqual(etags[0], etags[2])
+        self.assertEqual(len(set(etags)), 3)
+
+    def test_doctor_etag_follows_their_appointments(self):
+        first, _ = self.get(self.doctor.user, 'doctor_dashboard')
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor,
+                                   appointment_date=timezone.now() + timedelta(hours=1), reason='Follow-up')
+        response, _ = self.get(self.doctor.user, 'doctor_dashboard', if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_doctor_etag_follows_their_patients(self):
+        first, _ = self.get(self.doctor.user, 'doctor_dashboard')
+        self.patient.last_name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.save()
+        response, _ = self.get(self.doctor.user, 'doctor_dashboard', if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Renamed')
+
+    @override_settings(ROOT_URLCONF='hospital.asgi_urls')
+    async def test_async_view(self):
+        await self.async_client.aforce_login(self.patient_user)
+        first = await self.async_client.get(reverse('patient_dashboard'))
+        again = await self.async_client.get(reverse('patient_dashboard'), headers={'if-none-match': first['ETag']})
+        self.assertEqual((first.status_code, again.status_code), (200, 304))
+
+
+class InstrumentationMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='chairman', password='secret123', is_staff=True, role='admin'
+        )
+        self.client.force_login(self.admin)
+
+    @override_settings(DEBUG=True)
+    def test_debug_headers(self):
+        response = self.client.get(reverse('admin_patients_list'))
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+    @override_settings(DEBUG=True, ROOT_URLCONF='hospital.asgi_urls')
+    async def test_debug_headers_count_async_view_queries(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertNotIn('db;dur=0.0,', response['Server-Timing'])
+
+    def test_headers_hidden_outside_debug(self):
+        response = self.client.get(reverse('admin_patients_list'))
+        self.assertNotIn('X-Query-Count', response)
+
+    def test_metrics_endpoint_reports_views(self):
+        self.client.get(reverse('admin_patients_list'))
+        metrics = self.client.get(reverse('admin_metrics')).json()['views']
+        self.assertGreaterEqual(metrics['admin_patients_list']['samples'], 1)
+        self.assertIn('p99', metrics['admin_patients_list']['latency_ms'])
+
+    @override_settings(VIEW_BUDGETS={'admin_patients_list': {'queries': 0}})
+    def test_budget_overrun_is_logged(self):
+        with self.assertLogs('hospital.performance', level='WARNING') as logs:
+            self.client.get(reverse('admin_patients_list'))
+        self.assertIn('admin_patients_list exceeded its budget', logs.output[0])
+
+
+class RoleResolutionTests(TestCase):
+
+    def test_registration_records_role(self):
+        self.client.post(reverse('doctor_register'), {
+            'first_name': 'Gregory', 'last_name': 'House', 'email': 'house@example.com',
+            'username': 'house', 'password': 'secret123', 'confirm_password': 'secret123',
+            'phone': '555', 'specialization': 'Diagnostics', 'experience': '20',
+        })
+        self.assertEqual(User.objects.get(username='house').role, 'doctor')
+
+    def test_login_role_check_does_not_query_doctors(self):
+        User.objects.create_user(username='pat', password='secret123', role='patient')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('patient_login'),
+                                        {'username': 'pat', 'password': 'secret123'})
+        self.assertRedirects(response, '/patient-dashboard/', fetch_redirect_response=False)
+        self.assertFalse([q for q in ctx.captured_queries if 'doctors_doctor' in q['sql']])
+
+    def test_doctor_cannot_use_patient_login(self):
+        user = User.objects.create_user(username='doc', password='secret123')
+        Doctor.objects.create(user=user, specialization='ENT', experience=1, phone='555')
+        response = self.client.post(reverse('patient_login'),
+                                    {'username': 'doc', 'password': 'secret123'})
+        self.assertContains(response, 'registered as a doctor')
+
+    def test_legacy_user_role_is_resolved_once(self):
+        user = User.objects.create_user(username='old', password='secret123', is_staff=True)
+        self.client.force_login(user)
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['user_role'], 'admin')
+        user.refresh_from_db()
+        self.assertEqual(user.role, 'admin')
+
+
+class StaticAssetTests(TestCase):
+
+    def test_pages_link_their_stylesheet_instead_of_inlining_it(self):
+        for name in ('home', 'patient_login', 'doctor_register'):
+            response = self.client.get(reverse(name))
+            self.assertNotContains(response, '<style')
+            self.assertContains(response, f'<link rel="stylesheet" href="/static/css/{name}.css">')
+            self.assertTrue(finders.find(f'css/{name}.css'))
+
+
+class RegistrationTests(TestCase):
+    FORM = {
+        'first_name': 'Ann', 'last_name': 'Lee', 'email': 'ann@example.com', 'username': 'ann',
+        'password': 'secret123', 'confirm_password': 'secret123', 'phone': '555',
+        'date_of_birth': '1990-01-01', 'gender': 'F',
+    }
+
+    def register(self, **changes):
+        return self.client.post(reverse('patient_register'), {**self.FORM, **changes})
+
+    def test_creates_user_and_patient(self):
+        response = self.register()
+        self.assertContains(response, 'Account created successfully')
+        patient = Patient.objects.get(user__username='ann')
+        self.assertEqual((patient.user.role, patient.email), ('patient', 'ann@example.com'))
+        self.assertTrue(patient.user.check_password('secret123'))
+
+    def test_duplicates_are_reported_by_the_database(self):
+        self.register()
+        self.assertContains(self.register(email='other@example.com'), 'Username already exists')
+        self.assertContains(self.register(username='ann2', email='ANN@Example.com'), 'Email already registered')
+        response = self.client.post(reverse('doctor_register'), {
+            **self.FORM, 'username': 'drann', 'email': 'Ann@example.com',
+            'specialization': 'ENT', 'experience': '3',
+        })
+        self.assertContains(response, 'Email already registered')
+        self.assertEqual((User.objects.count(), Patient.objects.count(), Doctor.objects.count()), (1, 1, 0))
+
+    def test_email_is_unique_ignoring_case_but_may_be_blank(self):
+        User.objects.create_user(username='one')
+        User.objects.create_user(username='two')
+        User.objects.create_user(username='three', email='Ann@example.com')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='four', email='ann@EXAMPLE.com')
+
+    def test_failed_profile_rolls_back_the_user(self):
+        with mock.patch.object(Patient.objects, 'create', side_effect=IntegrityError('profile')):
+            response = self.register()
+        self.assertContains(response, 'Error creating account')
+        self.assertFalse(User.objects.exists())
+
+
+class PasswordlessBackend(ModelBackend):
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        return await User.objects.filter(username=username).afirst()
+
+
+@override_settings(ARGON2_TIME_COST=1, ARGON2_MEMORY_COST=1024, ARGON2_PARALLELISM=1)
+class PasswordHashingTests(TestCase):
+
+    def test_login_accepts_valid_credentials(self):
+        User.objects.create_user(username='pat', password='secret123', role='patient')
+        response = self.client.post(reverse('patient_login'),
+                                    {'username': 'pat', 'password': 'secret123'})
+        self.assertRedirects(response, '/patient-dashboard/', fetch_redirect_response=False)
+        self.assertEqual(self.client.session['_auth_user_id'],
+                         str(User.objects.get(username='pat').pk))
+
+    def test_login_rejects_invalid_credentials(self):
+        User.objects.create_user(username='pat', password='secret123', role='patient')
+        for username, password in [('pat', 'wrong'), ('nobody', 'secret123')]:
+            response = self.client.post(reverse('patient_login'),
+                                        {'username': username, 'password': password})
+            self.assertContains(response, 'Invalid username or password')
+            self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_failed_login_sends_user_login_failed(self):
+        User.objects.create_user(username='pat', password='secret123', role='patient')
+        received = []
+        handler = lambda **kwargs: received.append(kwargs)
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+        self.client.post(reverse('patient_login'), {'username': 'pat', 'password': 'wrong'})
+        [signal] = received
+        self.assertEqual(signal['credentials']['username'], 'pat')
+        self.assertNotEqual(signal['credentials']['password'], 'wrong')
+        self.assertEqual(signal['request'].path, reverse('patient_login'))
+
+    @override_settings(AUTHENTICATION_BACKENDS=['accounts.tests.PasswordlessBackend'])
+    def test_login_uses_configured_backends(self):
+        User.objects.create_user(username='pat', password='secret123', role='patient')
+        response = self.client.post(reverse('patient_login'), {'username': 'pat', 'password': 'anything'})
+        self.assertRedirects(response, '/patient-dashboard/', fetch_redirect_response=False)
+
+    def test_legacy_hash_is_upgraded_on_login(self):
+        user = User.objects.create_user(username='pat', role='patient')
+        user.password = make_password('secret123', hasher='pbkdf2_sha256')
+        user.save()
+        self.client.post(reverse('patient_login'), {'username': 'pat', 'password': 'secret123'})
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertIn('t=1', user.password)
+
+    def test_hash_is_upgraded_when_cost_changes(self):
+        user = User.objects.create_user(username='admin', password='secret123',
+                                        is_staff=True, role='admin')
+        with self.settings(ARGON2_TIME_COST=2):
+            self.client.post(reverse('admin_login'), {'username': 'admin', 'password': 'secret123'})
+        user.refresh_from_db()
+        self.assertIn('t=2', user.password)
+        self.assertTrue(user.check_password('secret123'))
+
+
+@override_settings(ROOT_URLCONF='hospital.asgi_urls', DASHBOARD_CACHE_TIMEOUT=0)
+class AsyncDashboardTests(TestCase):
+
+    def setUp(self):
+        dashboard_cache.get_cache().clear()
+        self.admin = User.objects.create_user(username='chairman', is_staff=True, role='admin')
+        self.patient_user = User.objects.create_user(username='pat', role='patient')
+        self.patient = Patient.objects.create(
+            user=self.patient_user, first_name='Pat', last_name='Ient',
+            email='pat@example.com', phone='555', date_of_birth=date(1990, 1, 1),
+            gender='F', address='', city='',
+        )
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create_user(username='doc', first_name='Greg'),
+            specialization='ENT', experience=5, phone='555',
+        )
+        now = timezone.now().replace(hour=9, minute=0)
+        for slot, status in enumerate(('scheduled', 'scheduled', 'completed')):
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor,
+                                       appointment_date=now + timedelta(minutes=30 * slot),
+                                       reason='Checkup', status=status)
+        Bill.objects.create(patient=self.patient, amount='50.00', description='Visit',
+                            status='pending', due_date=date(2030, 1, 1))
+
+    async def get(self, user, name):
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    async def test_admin_dashboard_matches_sync_view(self):
+        response = await self.get(self.admin, 'admin_dashboard')
+        [row] = response.context['doctors_with_appointments']
+        self.assertEqual(row['scheduled_today'], 2)
+        self.assertEqual(response.context['total_appointments'], 3)
+        self.assertEqual(len(response.context['all_appointments']), 3)
+        self.assertContains(response, 'Dr. Greg')
+
+    async def test_patient_dashboard(self):
+        response = await self.get(self.patient_user, 'patient_dashboard')
+        self.assertEqual(len(response.context['my_appointments']), 3)
+        self.assertEqual(len(response.context['pending_bills']), 1)
+        self.assertEqual(response.context['total_doctors'], 1)
+
+    async def test_doctor_dashboard(self):
+        doctor_user = await User.objects.aget(username='doc')
+        response = await self.get(doctor_user, 'doctor_dashboard')
+        self.assertEqual(response.context['scheduled_appointments'], 2)
+        self.assertEqual(response.context['completed_appointments'], 1)
+        self.assertContains(response, 'Pat Ient')
+
+    async def test_hospital_dashboard(self):
+        doctor_user = await User.objects.aget(username='doc')
+        response = await self.get(doctor_user, 'dashboard')
+        self.assertTrue(response.context['is_doctor'])
+        self.assertEqual(response.context['pending_bills'], 1)
+
+    async def test_non_staff_is_redirected_from_admin_dashboard(self):
+        await self.async_client.aforce_login(self.patient_user)
+        response = await self.async_client.get(reverse('admin_dashboard'))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+    @override_settings(DASHBOARD_CACHE_TIMEOUT=300)
+    async def test_async_dashboard_is_cached(self):
+        hits = dashboard_cache.cache_stats().get('patient_dashboard', {}).get('hits', 0)
+        first = await self.get(self.patient_user, 'patient_dashboard')
+        second = await self.async_client.get(reverse('patient_dashboard'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(dashboard_cache.cache_stats()['patient_dashboard']['hits'], hits + 1)
+
+
+class HistoryExportTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='chairman', is_staff=True, role='admin')
+        self.patient = Patient.objects.create(
+            first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F', address='', city='',
+        )
+        for n, status in enumerate(['pending', 'paid', 'overdue', 'pending']):
+            bill = Bill.objects.create(patient=self.patient, amount=Decimal('10.00') + n, description=f'Visit {n}',
+                                       status=status, due_date=date(2030, 1, 1))
+            Bill.objects.filter(pk=bill.pk).update(issue_date=date(2030, 1, 1) + timedelta(days=n))
+
+    def export(self, dataset, **params):
+        self.client.force_login(self.admin)
+        return self.client.get(reverse('admin_export', args=[dataset]), params)
+
+    def rows(self, response):
+        body = b''.join(response.streaming_content)
+        if response['Content-Type'] == 'application/gzip':
+            body = gzip.decompress(body)
+        return list(csv.reader(body.decode().splitlines()))
+
+    def test_filters_by_date_range_and_status(self):
+        response = self.export('bills', **{'from': '2030-01-02', 'to': '2030-01-04', 'status': ['pending', 'paid']})
+        self.assertTrue(response.streaming)
+        header, *rows = self.rows(response)
+        self.assertEqual(header[:2], ['Bill ID', 'Issued'])
+        self.assertEqual([(row[1], row[4], row[5]) for row in rows],
+                         [('2030-01-02', 'paid', '11.00'), ('2030-01-04', 'pending', '13.00')])
+
+    def test_gzip_and_appointments(self):
+        doctor = Doctor.objects.create(user=User.objects.create_user(username='doc', first_name='Greg'),
+                                       specialization='ENT', experience=5, phone='555')
+        Appointment.objects.create(patient=self.patient, doctor=doctor, reason='Checkup',
+                                   appointment_date=timezone.now())
+        response = self.export('appointments', gzip='1')
+        self.assertIn('appointments.csv.gz', response['Content-Disposition'])
+        header, row = self.rows(response)
+        self.assertEqual(row[header.index('Doctor first name')], 'Greg')
+
+    def test_rejects_bad_parameters_and_non_staff(self):
+        self.assertEqual(self.export('bills', status='lost').status_code, 400)
+        self.assertEqual(self.export('bills', **{'from': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.export('bills', **{'from': '2030-02-01', 'to': '2030-01-01'}).status_code, 400)
+        self.assertEqual(self.export('payroll').status_code, 400)
+        self.client.force_login(User.objects.create_user(username='clerk'))
+        self.assertEqual(self.client.get(reverse('admin_export', args=['bills'])).status_code, 302)
+
+    def test_csv_is_produced_in_blocks(self):
+        blocks = csv_blocks(['n'], ((n,) for n in range(25)), rows_per_block=10)
+        self.assertEqual([block.count(b'\n') for block in blocks], [11, 10, 5])
+
+    def test_command_writes_gzip_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bills.csv.gz')
+            call_command('export_history', 'bills', '--status', 'pending', '--output', path,
+                         stderr=StringIO())
+            with gzip.open(path, 'rt') as exported:
+                self.assertEqual(len(list(csv.reader(exported))), 1 + 2)
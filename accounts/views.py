@@ -1,13 +1,37 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
-from django.contrib.auth import authenticate, login, logout, get_user_model
+from django.contrib.auth import alogin, logout, get_user_model
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+import logging
+import time
 from doctors.models import Doctor
 from patients.models import Patient
+from patients.search import get_search_backend, search_patients
 from appointments.models import Appointment
 from billing.models import Bill
+from hospital.middleware import metrics_snapshot
+from stats.models import HospitalStats
+from .auth import aauthenticate_offloaded
+from .conditional import conditional_dashboard, doctor_dashboard_validators, patient_dashboard_validators
+from .exports import ExportError, export_chunks
+from .dashboard_cache import (
+    DOCTORS_SCOPE, GLOBAL_SCOPE, PATIENTS_SCOPE, cache_dashboard, cache_stats,
+)
+from .pagination import get_page_size, keyset_page, stream_csv
+from .roles import resolve_role
 
 User = get_user_model()
+logger = logging.getLogger('hospital.exports')
+
+# Rows fetched per round-trip when streaming a full CSV export.
+EXPORT_CHUNK_SIZE = 2000
 
 
 def home_view(request):
@@ -15,10 +39,33 @@ def home_view(request):
     return render(request, "home.html")
 
 
+def _create_account(role, create_profile, username, email, password, **fields):
+    """Create a user and its profile in one transaction; return an error message or None.
+
+    Username and email uniqueness are left to the database constraints, so
+    there is no window between checking and inserting for a concurrent
+    sign-up to slip through. The password is hashed before the transaction
+    starts so the slow hash doesn't hold a write lock.
+    """
+    user = User(role=role, username=User.normalize_username(username),
+                email=User.objects.normalize_email(email), **fields)
+    user.set_password(password)
+    try:
+        with transaction.atomic():
+            user.save()
+            create_profile(user)
+    except IntegrityError as error:
+        if 'user_email_ci_unique' in str(error):
+            return "Email already registered. Please use a different email."
+        if 'username' in str(error):
+            return "Username already exists. Please choose a different one."
+        return "Error creating account. Please try again."
+    return None
+
+
 def patient_register_view(request):
     """Patient registration page."""
     error_message = None
-    success_message = None
     
     if request.method == "POST":
         first_name = request.POST.get("first_name", "").strip()
@@ -38,23 +85,10 @@ def patient_register_view(request):
             error_message = "Password must be at least 6 characters long."
         elif password != confirm_password:
             error_message = "Passwords do not match."
-        elif User.objects.filter(username=username).exists():
-            error_message = "Username already exists. Please choose a different one."
-        elif User.objects.filter(email=email).exists():
-            error_message = "Email already registered. Please use a different email."
         else:
-            try:
-                # Create user account
-                user = User.objects.create_user(
-                    username=username,
-                    email=email,
-                    password=password,
-                    first_name=first_name,
-                    last_name=last_name
-                )
-                
-                # Create patient profile
-                patient = Patient.objects.create(
+            error_message = _create_account(
+                'patient',
+                lambda user: Patient.objects.create(
                     user=user,
                     first_name=first_name,
                     last_name=last_name,
@@ -64,15 +98,17 @@ def patient_register_view(request):
                     gender=gender,
                     address="",
                     city=""
-                )
-                
-                success_message = "Account created successfully! Please login."
-                # Clear form
+                ),
+                username=username,
+                email=email,
+                password=password,
+                first_name=first_name,
+                last_name=last_name,
+            )
+            if error_message is None:
                 return render(request, "patient_register.html", {
-                    'success_message': success_message,
+                    'success_message': "Account created successfully! Please login.",
                 })
-            except IntegrityError:
-                error_message = "Error creating account. Please try again."
     
     return render(request, "patient_register.html", {'error_message': error_message})
 
@@ -80,7 +116,6 @@ def patient_register_view(request):
 def doctor_register_view(request):
     """Doctor registration page."""
     error_message = None
-    success_message = None
     
     if request.method == "POST":
         first_name = request.POST.get("first_name", "").strip()
@@ -100,41 +135,30 @@ def doctor_register_view(request):
             error_message = "Password must be at least 6 characters long."
         elif password != confirm_password:
             error_message = "Passwords do not match."
-        elif User.objects.filter(username=username).exists():
-            error_message = "Username already exists. Please choose a different one."
-        elif User.objects.filter(email=email).exists():
-            error_message = "Email already registered. Please use a different email."
         else:
-            try:
-                # Create user account
-                user = User.objects.create_user(
-                    username=username,
-                    email=email,
-                    password=password,
-                    first_name=first_name,
-                    last_name=last_name
-                )
-                
-                # Create doctor profile
-                doctor = Doctor.objects.create(
+            error_message = _create_account(
+                'doctor',
+                lambda user: Doctor.objects.create(
                     user=user,
                     specialization=specialization,
                     experience=int(experience),
                     phone=phone
-                )
-                
-                success_message = "Doctor account created successfully! Please login."
-                # Clear form
+                ),
+                username=username,
+                email=email,
+                password=password,
+                first_name=first_name,
+                last_name=last_name,
+            )
+            if error_message is None:
                 return render(request, "doctor_register.html", {
-                    'success_message': success_message,
+                    'success_message': "Doctor account created successfully! Please login.",
                 })
-            except IntegrityError:
-                error_message = "Error creating account. Please try again."
     
     return render(request, "doctor_register.html", {'error_message': error_message})
 
 
-def patient_login_view(request):
+async def patient_login_view(request):
     """Patient/Customer login page."""
     error_message = None
     
@@ -145,22 +169,22 @@ def patient_login_view(request):
         if not username or not password:
             error_message = "Please enter both username and password."
         else:
-            user = authenticate(request, username=username, password=password)
+            user = await aauthenticate_offloaded(request, username, password)
 
             if user is not None:
                 # Check if user is a patient (not a doctor)
-                if not Doctor.objects.filter(user=user).exists():
-                    login(request, user)
+                if await sync_to_async(resolve_role)(user) != 'doctor':
+                    await alogin(request, user)
                     return redirect('/patient-dashboard/')
                 else:
                     error_message = "This account is registered as a doctor. Please use doctor login."
             else:
                 error_message = "Invalid username or password. Please try again."
 
-    return render(request, "patient_login.html", {'error_message': error_message})
+    return await sync_to_async(render)(request, "patient_login.html", {'error_message': error_message})
 
 
-def doctor_login_view(request):
+async def doctor_login_view(request):
     """Doctor login page."""
     error_message = None
     
@@ -171,22 +195,24 @@ def doctor_login_view(request):
         if not username or not password:
             error_message = "Please enter both username and password."
         else:
-            user = authenticate(request, username=username, password=password)
+            user = await aauthenticate_offloaded(request, username, password)
 
             if user is not None:
                 # Check if user is a doctor
-                if Doctor.objects.filter(user=user).exists():
-                    login(request, user)
+                if await sync_to_async(resolve_role)(user) == 'doctor':
+                    await alogin(request, user)
                     return redirect('/doctor-dashboard/')
                 else:
                     error_message = "This account is not registered as a doctor. Please use patient login."
             else:
                 error_message = "Invalid username or password. Please try again."
 
-    return render(request, "doctor_login.html", {'error_message': error_message})
+    return await sync_to_async(render)(request, "doctor_login.html", {'error_message': error_message})
 
 
 @login_required(login_url='patient_login')
+@conditional_dashboard(patient_dashboard_validators)
+@cache_dashboard('patient_dashboard', scopes=[DOCTORS_SCOPE])
 def patient_dashboard_view(request):
     """Display patient dashboard with appointments and billing."""
     
@@ -199,8 +225,8 @@ def patient_dashboard_view(request):
     context = {
         'user': request.user,
         'patient': patient,
-        'total_doctors': Doctor.objects.count(),
-        'my_appointments': Appointment.objects.filter(patient=patient).order_by('-appointment_date')[:10] if patient else [],
+        'total_doctors': HospitalStats.current().doctors,
+        'my_appointments': Appointment.objects.filter(patient=patient).listing().order_by('-appointment_date')[:10] if patient else [],
         'my_bills': Bill.objects.filter(patient=patient).order_by('-issue_date')[:10] if patient else [],
         'pending_bills': Bill.objects.filter(patient=patient, status='pending') if patient else [],
         'user_type': 'patient',
@@ -211,22 +237,118 @@ def patient_dashboard_view(request):
 # --- extra list views for admin links ------------------------------------------------
 @login_required(login_url='admin_login')
 def doctors_list_view(request):
-    """Show full list of doctors on dedicated page (for admins)."""
+    """Show full list of doctors on dedicated page (for admins).
+
+    Supports ``?q=`` (name, username, email), ``?specialization=``,
+    ``?page_size=`` and ``?cursor=`` for keyset pagination, and
+    ``?export=csv`` to stream every matching row.
+    """
     if not request.user.is_staff:
         return redirect('home')
-    doctors = Doctor.objects.all()
-    return render(request, 'doctors_list.html', {'doctors': doctors, 'user': request.user})
+
+    query = request.GET.get('q', '').strip()
+    specialization = request.GET.get('specialization', '').strip()
+
+    doctors = Doctor.objects.listing()
+    if query:
+        doctors = doctors.filter(
+            Q(user__first_name__icontains=query) | Q(user__last_name__icontains=query)
+            | Q(user__username__icontains=query) | Q(user__email__icontains=query)
+        )
+    if specialization:
+        doctors = doctors.filter(specialization__iexact=specialization)
+
+    if request.GET.get('export') == 'csv':
+        rows = doctors.order_by('id').values_list(
+            'user__first_name', 'user__last_name', 'user__username',
+            'specialization', 'experience', 'phone', 'user__email',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return stream_csv(
+            'doctors.csv',
+            ['First name', 'Last name', 'Username', 'Specialization', 'Experience', 'Phone', 'Email'],
+            rows,
+        )
+
+    # Doctor has no creation timestamp; its id is monotonic, so page on that.
+    page_size = get_page_size(request)
+    page, next_cursor = keyset_page(doctors, ('id',), request.GET.get('cursor'), page_size)
+    return render(request, 'doctors_list.html', {
+        'doctors': page,
+        'next_cursor': next_cursor,
+        'query': query,
+        'specialization': specialization,
+        'page_size': page_size,
+        'user': request.user,
+    })
 
 
 @login_required(login_url='admin_login')
 def patients_list_view(request):
-    """Show full list of patients on dedicated page (for admins)."""
+    """Show full list of patients on dedicated page (for admins).
+
+    Supports ``?q=`` (full-text search, see ``patients.search``), ``?city=``,
+    ``?gender=``, ``?page_size=`` and ``?cursor=`` for keyset pagination on
+    ``(created_at, id)``, and ``?export=csv`` to stream every matching row.
+    Search results are shown best match first, on a single page.
+    """
     if not request.user.is_staff:
         return redirect('home')
-    patients = Patient.objects.all()
-    return render(request, 'patients_list.html', {'patients': patients, 'user': request.user})
+
+    query = request.GET.get('q', '').strip()
+    city = request.GET.get('city', '').strip()
+    gender = request.GET.get('gender', '').strip()
+
+    patients = Patient.objects.listing()
+    if city:
+        patients = patients.filter(city__iexact=city)
+    if gender:
+        patients = patients.filter(gender=gender)
+
+    page_size = get_page_size(request)
+    if query and request.GET.get('export') != 'csv':
+        # Search results are ranked rather than paged: show the best matches
+        # that also pass the filters.
+        ranked_ids = search_patients(query, limit=settings.PATIENT_SEARCH_MAX_RESULTS)
+        matches = patients.in_bulk(ranked_ids)
+        page = [matches[pk] for pk in ranked_ids if pk in matches][:page_size]
+        return render(request, 'patients_list.html', {
+            'patients': page,
+            'next_cursor': None,
+            'query': query,
+            'city': city,
+            'gender': gender,
+            'page_size': page_size,
+            'user': request.user,
+        })
+    if query:
+        patients = get_search_backend().filter(patients, query)
+
+    if request.GET.get('export') == 'csv':
+        rows = patients.order_by('-created_at', '-id').values_list(
+            'first_name', 'last_name', 'email', 'phone', 'city', 'gender', 'created_at',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return stream_csv(
+            'patients.csv',
+            ['First name', 'Last name', 'Email', 'Phone', 'City', 'Gender', 'Registered'],
+            rows,
+        )
+
+    page, next_cursor = keyset_page(
+        patients, ('-created_at', '-id'), request.GET.get('cursor'), page_size
+    )
+    return render(request, 'patients_list.html', {
+        'patients': page,
+        'next_cursor': next_cursor,
+        'query': query,
+        'city': city,
+        'gender': gender,
+        'page_size': page_size,
+        'user': request.user,
+    })
 
 @login_required(login_url='doctor_login')
+@conditional_dashboard(doctor_dashboard_validators)
+@cache_dashboard('doctor_dashboard', scopes=[PATIENTS_SCOPE])
 def doctor_dashboard_view(request):
     """Display doctor dashboard with appointments and patient information."""
     
@@ -236,13 +358,15 @@ def doctor_dashboard_view(request):
     except Doctor.DoesNotExist:
         doctor = None
     
+    appointment_counts = Appointment.objects.status_counts(doctor=doctor) if doctor else {}
+
     context = {
         'user': request.user,
         'doctor': doctor,
-        'total_patients': Patient.objects.count(),
-        'my_appointments': Appointment.objects.filter(doctor=doctor).order_by('-appointment_date')[:10] if doctor else [],
-        'scheduled_appointments': Appointment.objects.filter(doctor=doctor, status='scheduled').count() if doctor else 0,
-        'completed_appointments': Appointment.objects.filter(doctor=doctor, status='completed').count() if doctor else 0,
+        'total_patients': HospitalStats.current().patients,
+        'my_appointments': Appointment.objects.filter(doctor=doctor).select_related('patient').listing().order_by('-appointment_date')[:10] if doctor else [],
+        'scheduled_appointments': appointment_counts.get('scheduled', 0),
+        'completed_appointments': appointment_counts.get('completed', 0),
         'user_type': 'doctor',
     }
     
@@ -250,33 +374,41 @@ def doctor_dashboard_view(request):
 
 
 @login_required(login_url='login')
+@cache_dashboard('dashboard', scopes=[GLOBAL_SCOPE])
 def dashboard_view(request):
     """Display hospital management dashboard with statistics and quick info."""
     
-    # Calculate total billing
-    total_billing = sum(bill.amount for bill in Bill.objects.all())
-    pending_billing = sum(bill.amount for bill in Bill.objects.filter(status='pending'))
-    
-    context = {
-        'total_doctors': Doctor.objects.count(),
-        'total_patients': Patient.objects.count(),
-        'total_appointments': Appointment.objects.count(),
-        'total_billing': f"${total_billing:,.2f}",
-        'pending_billing': f"${pending_billing:,.2f}",
-        'scheduled_appointments': Appointment.objects.filter(status='scheduled').count(),
-        'completed_appointments': Appointment.objects.filter(status='completed').count(),
-        'pending_bills': Bill.objects.filter(status='pending').count(),
-        'paid_bills': Bill.objects.filter(status='paid').count(),
-        'doctors': Doctor.objects.all()[:5],
-        'recent_patients': Patient.objects.all()[:5],
-        'recent_appointments': Appointment.objects.all()[:5],
-        'user': request.user,
-        'is_doctor': Doctor.objects.filter(user=request.user).exists(),
-    }
+    # Hospital-wide totals are maintained incrementally in a single row
+    context = hospital_dashboard_context(
+        request.user, HospitalStats.current(),
+        doctors=Doctor.objects.listing()[:5],
+        recent_patients=Patient.objects.listing()[:5],
+        recent_appointments=Appointment.objects.select_related('patient').listing()[:5],
+        is_doctor=request.role == 'doctor',
+    )
     
     return render(request, "dashboard.html", context)
 
 
+def hospital_dashboard_context(user, stats, doctors, recent_patients, recent_appointments, is_doctor):
+    return {
+        'total_doctors': stats.doctors,
+        'total_patients': stats.patients,
+        'total_appointments': stats.appointments,
+        'total_billing': f"${stats.billed_total:,.2f}",
+        'pending_billing': f"${stats.billed_pending:,.2f}",
+        'scheduled_appointments': stats.appointments_scheduled,
+        'completed_appointments': stats.appointments_completed,
+        'pending_bills': stats.bills_pending,
+        'paid_bills': stats.bills_paid,
+        'doctors': doctors,
+        'recent_patients': recent_patients,
+        'recent_appointments': recent_appointments,
+        'user': user,
+        'is_doctor': is_doctor,
+    }
+
+
 @login_required(login_url='login')
 def logout_view(request):
     """Handle user logout."""
@@ -284,7 +416,7 @@ def logout_view(request):
     return redirect('home')
 
 
-def admin_login_view(request):
+async def admin_login_view(request):
     """Admin/Chairman login page."""
     error_message = None
     
@@ -295,22 +427,23 @@ def admin_login_view(request):
         if not username or not password:
             error_message = "Please enter both username and password."
         else:
-            user = authenticate(request, username=username, password=password)
+            user = await aauthenticate_offloaded(request, username, password)
 
             if user is not None:
                 # Check if user is staff/admin
                 if user.is_staff:
-                    login(request, user)
+                    await alogin(request, user)
                     return redirect('/admin-dashboard/')
                 else:
                     error_message = "This account does not have admin privileges. Please use appropriate login."
             else:
                 error_message = "Invalid username or password. Please try again."
 
-    return render(request, "admin_login.html", {'error_message': error_message})
+    return await sync_to_async(render)(request, "admin_login.html", {'error_message': error_message})
 
 
 @login_required(login_url='admin_login')
+@cache_dashboard('admin_dashboard', scopes=[GLOBAL_SCOPE])
 def admin_dashboard_view(request):
     """Display admin/chairman dashboard with hospital overview and free doctors."""
     
@@ -318,61 +451,125 @@ def admin_dashboard_view(request):
     if not request.user.is_staff:
         return redirect('home')
     
-    # Get all doctors with their appointment counts
-    all_doctors = Doctor.objects.all()
+    all_doctors = doctor_roster_today()
+
+    # Get all appointments
+    all_appointments = Appointment.objects.select_related('patient').listing().order_by('-appointment_date')
+
+    context = admin_dashboard_context(request.user, HospitalStats.current(), all_doctors, all_appointments[:20])
     
+    return render(request, "admin_dashboard.html", context)
+
+
+def doctor_roster_today():
+    """Doctors with their number of scheduled appointments today."""
+    # Compare against a datetime range rather than appointment_date__date so
+    # the scheduled-appointment index can be used.
+    today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow_start = today_start + timedelta(days=1)
+
+    # One grouped query for the whole roster; the Doctor manager joins the
+    # user so the template can read doctor.user.* without a query per row.
+    return Doctor.objects.listing().annotate(
+        scheduled_today=Count(
+            'appointments',
+            filter=Q(
+                appointments__status='scheduled',
+                appointments__appointment_date__gte=today_start,
+                appointments__appointment_date__lt=tomorrow_start,
+            ),
+        )
+    ).order_by('id')
+
+
+def admin_dashboard_context(user, stats, all_doctors, latest_appointments):
     # Calculate free doctors (those with less than 3 scheduled appointments today)
-    from django.utils import timezone
-    from datetime import timedelta
-    
-    today = timezone.now().date()
-    tomorrow = today + timedelta(days=1)
-    
     doctors_with_appointments = []
     free_doctors = []
-    
+
     for doctor in all_doctors:
-        scheduled_today = Appointment.objects.filter(
-            doctor=doctor,
-            status='scheduled',
-            appointment_date__date=today
-        ).count()
-        
         doctors_with_appointments.append({
             'doctor': doctor,
-            'scheduled_today': scheduled_today,
-            'is_free': scheduled_today < 3
+            'scheduled_today': doctor.scheduled_today,
+            'is_free': doctor.scheduled_today < 3
         })
-        
-        if scheduled_today < 3:
+
+        if doctor.scheduled_today < 3:
             free_doctors.append(doctor)
-    
-    # Get all appointments
-    all_appointments = Appointment.objects.select_related('patient', 'doctor').order_by('-appointment_date')
-    
-    # Get statistics
-    total_billing = sum(bill.amount for bill in Bill.objects.all())
-    pending_billing = sum(bill.amount for bill in Bill.objects.filter(status='pending'))
-    
-    context = {
-        'user': request.user,
-        'total_doctors': all_doctors.count(),
-        'total_patients': Patient.objects.count(),
-        'total_appointments': Appointment.objects.count(),
-        'total_billing': f"${total_billing:,.2f}",
-        'pending_billing': f"${pending_billing:,.2f}",
-        'scheduled_count': Appointment.objects.filter(status='scheduled').count(),
-        'completed_count': Appointment.objects.filter(status='completed').count(),
-        'cancelled_count': Appointment.objects.filter(status='cancelled').count(),
-        'scheduled_appointments': Appointment.objects.filter(status='scheduled').count(),
-        'completed_appointments': Appointment.objects.filter(status='completed').count(),
-        'cancelled_appointments': Appointment.objects.filter(status='cancelled').count(),
+
+    return {
+        'user': user,
+        'total_doctors': stats.doctors,
+        'total_patients': stats.patients,
+        'total_appointments': stats.appointments,
+        'total_billing': f"${stats.billed_total:,.2f}",
+        'pending_billing': f"${stats.billed_pending:,.2f}",
+        'scheduled_count': stats.appointments_scheduled,
+        'completed_count': stats.appointments_completed,
+        'cancelled_count': stats.appointments_cancelled,
+        'scheduled_appointments': stats.appointments_scheduled,
+        'completed_appointments': stats.appointments_completed,
+        'cancelled_appointments': stats.appointments_cancelled,
         'free_doctors': free_doctors,
         'doctors_with_appointments': doctors_with_appointments,
-        'all_appointments': all_appointments[:20],  # Latest 20 appointments
-        'pending_bills': Bill.objects.filter(status='pending').count(),
+        'all_appointments': latest_appointments,  # Latest 20 appointments
+        'pending_bills': stats.bills_pending,
         # list pages will fetch full sets separately
         'user_type': 'admin',
     }
-    
-    return render(request, "admin_dashboard.html", context)
\ No newline at end of file
+
+
+@login_required(login_url='admin_login')
+def dashboard_cache_stats_view(request):
+    """Return dashboard cache hit/miss counters for this process as JSON (for admins)."""
+    if not request.user.is_staff:
+        return redirect('home')
+    return JsonResponse({'backend': settings.CACHES['dashboards']['BACKEND'], 'views': cache_stats()})
+
+
+@login_required(login_url='admin_login')
+def performance_metrics_view(request):
+    """Return rolling per-view latency and query metrics for this process as JSON (for admins)."""
+    if not request.user.is_staff:
+        return redirect('home')
+    return JsonResponse({'views': metrics_snapshot()})
+
+
+@login_required(login_url='admin_login')
+def export_history_view(request, dataset):
+    """Stream bill or appointment history as CSV (for admins).
+
+    Supports ``?from=`` and ``?to=`` (inclusive dates), ``?status=``
+    (repeatable) and ``?gzip=1``. Throughput is logged to
+    ``hospital.exports`` once the download finishes.
+    """
+    if not request.user.is_staff:
+        return redirect('home')
+
+    dates = {}
+    for name in ('from', 'to'):
+        raw = request.GET.get(name, '').strip()
+        try:
+            dates[name] = parse_date(raw) if raw else None
+        except ValueError:
+            dates[name] = None
+        if raw and dates[name] is None:
+            return HttpResponseBadRequest(f'?{name}= must be a date (YYYY-MM-DD).')
+    compress = request.GET.get('gzip') in ('1', 'true')
+    try:
+        blocks, counter = export_chunks(dataset, dates['from'], dates['to'],
+                                        request.GET.getlist('status'), compress=compress)
+    except ExportError as error:
+        return HttpResponseBadRequest(str(error))
+
+    def stream():
+        started = time.perf_counter()
+        yield from blocks
+        elapsed = time.perf_counter() - started
+        logger.info('Exported %d %s in %.2fs (%.0f rows/s)', counter.count, dataset, elapsed,
+                    counter.count / elapsed if elapsed else 0)
+
+    filename = f'{dataset}.csv.gz' if compress else f'{dataset}.csv'
+    response = StreamingHttpResponse(stream(), content_type='application/gzip' if compress else 'text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
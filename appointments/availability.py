@@ -0,0 +1,278 @@
+"""In-memory index of doctors' working hours and booked slots.
+
+Each doctor keeps a sorted list of booked start times (epoch seconds), so
+checking a slot for a conflict is a binary search. Every appointment lasts
+APPOINTMENT_SLOT_MINUTES. "Next free slots" walks each doctor's working hours
+lazily and merges the doctors with a heap, so a query touches only about as
+many candidate slots as it returns.
+
+The index is built from the database on first use. After that,
+``appointments.signals`` keeps it current as appointments, doctors and
+working hours change in this process. Other processes see those changes
+after AVAILABILITY_INDEX_TTL, when they rebuild. The database, not this
+index, has the final say on double-booking.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from itertools import islice
+from time import monotonic
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+from doctors.models import Doctor
+
+from .models import BLOCKING_STATUSES, Appointment, WorkingHours
+
+
+def _minutes(value):
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        hours, minutes = value.split(':')
+        return int(hours) * 60 + int(minutes)
+    return value.hour * 60 + value.minute
+
+
+def default_working_hours():
+    """Return settings.DEFAULT_WORKING_HOURS as weekday -> [(start, end) minutes]."""
+    configured = getattr(settings, 'DEFAULT_WORKING_HOURS', {})
+    return {
+        int(weekday): sorted((_minutes(start), _minutes(end)) for start, end in windows)
+        for weekday, windows in configured.items()
+    }
+
+
+def load_working_hours(doctor_ids=None):
+    """Return doctor id -> weekday -> [(start, end) minutes] from WorkingHours rows.
+
+    Doctors without rows are left out; they work the default hours.
+    """
+    rows = WorkingHours.objects.all()
+    if doctor_ids is not None:
+        rows = rows.filter(doctor_id__in=doctor_ids)
+    hours = {}
+    for doctor_id, weekday, start, end in rows.values_list(
+            'doctor_id', 'weekday', 'start_time', 'end_time').iterator():
+        hours.setdefault(doctor_id, {}).setdefault(weekday, []).append((_minutes(start), _minutes(end)))
+    for weekly in hours.values():
+        for windows in weekly.values():
+            windows.sort()
+    return hours
+
+
+def fits_schedule(weekly, start, slot_minutes):
+    """Whether a slot at ``start`` is on the slot grid of one of the day's windows."""
+    local = timezone.localtime(start)
+    if local.second or local.microsecond:
+        return False
+    begins = local.hour * 60 + local.minute
+    return any(
+        window_start <= begins and begins + slot_minutes <= window_end
+        and (begins - window_start) % slot_minutes == 0
+        for window_start, window_end in weekly.get(local.weekday(), ())
+    )
+
+
+@lru_cache(maxsize=4096)
+def _local_timestamp(day, minute_of_day, tz_name):
+    moment = datetime.combine(day, time(minute_of_day // 60, minute_of_day % 60))
+    return int(timezone.make_aware(moment, ZoneInfo(tz_name)).timestamp())
+
+
+def to_timestamp(moment):
+    return int(moment.timestamp())
+
+
+def from_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.get_current_timezone())
+
+
+class AvailabilityIndex:
+
+    def __init__(self, slot_minutes=30, default_hours=None):
+        self.slot = slot_minutes * 60
+        self.default_hours = default_hours or {}
+        self._lock = threading.RLock()
+        self._booked = {}          # doctor id -> sorted booked start timestamps
+        self._hours = {}           # doctor id -> weekday -> [(start, end)] or None for the default
+        self._specializations = {}  # normalized specialization -> set of doctor ids
+        self._doctor_specialization = {}
+
+    @staticmethod
+    def normalize(specialization):
+        return (specialization or '').strip().lower()
+
+    # --- building --------------------------------------------------------------
+
+    @classmethod
+    def from_database(cls):
+        index = cls(
+            slot_minutes=getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30),
+            default_hours=default_working_hours(),
+        )
+        for doctor_id, specialization in Doctor.objects.values_list('id', 'specialization').iterator():
+            index.add_doctor(doctor_id, specialization)
+
+        for doctor_id, weekly in load_working_hours().items():
+            index.set_hours(doctor_id, weekly)
+
+        # Past appointments can't conflict with anything that is still bookable.
+        since = timezone.now() - timedelta(seconds=index.slot)
+        booked = {}
+        for doctor_id, start in (Appointment.objects
+                                 .filter(status__in=BLOCKING_STATUSES, appointment_date__gte=since)
+                                 .values_list('doctor_id', 'appointment_date').iterator(chunk_size=10000)):
+            booked.setdefault(doctor_id, []).append(to_timestamp(start))
+        for doctor_id, starts in booked.items():
+            if doctor_id in index._booked:
+                starts.sort()
+                index._booked[doctor_id] = starts
+        return index
+
+    def add_doctor(self, doctor_id, specialization):
+        """Add a doctor, or update the specialization of one already indexed."""
+        with self._lock:
+            key = self.normalize(specialization)
+            previous = self._doctor_specialization.get(doctor_id)
+            if previous is not None:
+                self._specializations[previous].discard(doctor_id)
+            self._doctor_specialization[doctor_id] = key
+            self._specializations.setdefault(key, set()).add(doctor_id)
+            self._booked.setdefault(doctor_id, [])
+            self._hours.setdefault(doctor_id, None)
+
+    def remove_doctor(self, doctor_id):
+        with self._lock:
+            key = self._doctor_specialization.pop(doctor_id, None)
+            if key is not None:
+                self._specializations[key].discard(doctor_id)
+                self._booked.pop(doctor_id, None)
+                self._hours.pop(doctor_id, None)
+
+    def set_hours(self, doctor_id, weekly):
+        """Set a doctor's hours (weekday -> [(start, end)]); None or {} means the default."""
+        with self._lock:
+            if doctor_id not in self._doctor_specialization:
+                return
+            self._hours[doctor_id] = {
+                weekday: sorted((_minutes(start), _minutes(end)) for start, end in windows)
+                for weekday, windows in weekly.items()
+            } if weekly else None
+
+    def book(self, doctor_id, start):
+        with self._lock:
+            booked = self._booked.get(doctor_id)
+            if booked is not None:
+                insort(booked, to_timestamp(start))
+
+    def release(self, doctor_id, start):
+        with self._lock:
+            booked = self._booked.get(doctor_id)
+            if booked is None:
+                return
+            timestamp = to_timestamp(start)
+            position = bisect_left(booked, timestamp)
+            if position < len(booked) and booked[position] == timestamp:
+                del booked[position]
+
+    # --- queries ---------------------------------------------------------------
+
+    def _first_conflict(self, booked, timestamp):
+        # Slots are all the same length, so only the nearest booking that
+        # starts after timestamp - slot can overlap.
+        position = bisect_left(booked, timestamp - self.slot + 1)
+        if position < len(booked) and booked[position] < timestamp + self.slot:
+            return booked[position]
+        return None
+
+    def conflicts(self, doctor_id, start):
+        """Return the start of a booking that overlaps a slot at ``start``, or None."""
+        with self._lock:
+            conflict = self._first_conflict(self._booked.get(doctor_id, []), to_timestamp(start))
+        return from_timestamp(conflict) if conflict is not None else None
+
+    def is_available(self, doctor_id, start):
+        """Whether ``start`` is a free slot on the doctor's schedule."""
+        with self._lock:
+            if doctor_id not in self._booked:
+                return False
+            if not fits_schedule(self._weekly_hours(doctor_id), start, self.slot // 60):
+                return False
+            return self._first_conflict(self._booked[doctor_id], to_timestamp(start)) is None
+
+    def _weekly_hours(self, doctor_id):
+        hours = self._hours.get(doctor_id)
+        return self.default_hours if hours is None else hours
+
+    def _free_slots(self, doctor_id, after, until):
+        """Yield ``(timestamp, doctor_id)`` for the doctor's free slots in order."""
+        booked = self._booked[doctor_id]
+        weekly = self._weekly_hours(doctor_id)
+        tz_name = timezone.get_current_timezone_name()
+        day = timezone.localtime(from_timestamp(after)).date()
+        while _local_timestamp(day, 0, tz_name) < until:
+            for window_start, window_end in weekly.get(day.weekday(), ()):
+                first = _local_timestamp(day, window_start, tz_name)
+                end = min(_local_timestamp(day, window_end, tz_name), until)
+                candidate = first
+                if candidate < after:
+                    candidate += -(-(after - first) // self.slot) * self.slot
+                while candidate + self.slot <= end:
+                    conflict = self._first_conflict(booked, candidate)
+                    if conflict is None:
+                        yield candidate, doctor_id
+                        candidate += self.slot
+                    else:
+                        # Skip to the first grid slot after the booking ends.
+                        candidate += -(-(conflict + self.slot - candidate) // self.slot) * self.slot
+            day += timedelta(days=1)
+
+    def next_free_slots(self, specialization=None, count=10, after=None, horizon_days=90):
+        """Return up to ``count`` earliest ``(start, doctor_id)`` free slots.
+
+        Restricted to doctors whose specialization matches, case-insensitively,
+        when one is given.
+        """
+        after = to_timestamp(after or timezone.now())
+        until = after + horizon_days * 86400
+        with self._lock:
+            if specialization:
+                doctor_ids = self._specializations.get(self.normalize(specialization), ())
+            else:
+                doctor_ids = self._booked.keys()
+            merged = heapq.merge(*(self._free_slots(doctor_id, after, until)
+                                   for doctor_id in sorted(doctor_ids)))
+            return [(from_timestamp(timestamp), doctor_id)
+                    for timestamp, doctor_id in islice(merged, count)]
+
+
+_index = None
+_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Return this process's index, rebuilding it after AVAILABILITY_INDEX_TTL seconds."""
+    global _index, _built_at
+    ttl = getattr(settings, 'AVAILABILITY_INDEX_TTL', 300)
+    with _index_lock:
+        if _index is None or monotonic() - _built_at > ttl:
+            _index = AvailabilityIndex.from_database()
+            _built_at = monotonic()
+        return _index
+
+
+def loaded_index():
+    """Return the index if it has been built in this process, else None."""
+    return _index
+
+
+def reset_index():
+    global _index
+    with _index_lock:
+        _index = None
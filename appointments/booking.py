@@ -0,0 +1,166 @@
+"""Book appointments one at a time or in batches, without double-booking.
+
+Two layers stop a doctor from being booked twice:
+- Inside the transaction, the doctors' rows are locked with select_for_update
+  (in id order) before their existing appointments are read. On PostgreSQL
+  this serializes bookers per doctor; SQLite allows only one writer at a time
+  anyway.
+- The appt_unique_doctor_slot constraint is the final guard. Every accepted
+  start is on the slot grid, so two bookings of the same slot have the same
+  start time.
+
+Accepted rows are written with a single bulk_create. bulk_create doesn't send
+signals, so this module applies the HospitalStats deltas, dashboard
+invalidation, availability-index updates and live-stream events itself.
+"""
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from accounts.dashboard_cache import GLOBAL_SCOPE, invalidate, user_scope
+from doctors.models import Doctor
+from patients.models import Patient
+from stats.models import HospitalStats
+
+from .availability import default_working_hours, fits_schedule, load_working_hours, loaded_index
+from .live import appointment_event, broker
+from .models import BLOCKING_STATUSES, Appointment
+
+BOOKED = 'booked'
+CONFLICT = 'conflict'
+INVALID = 'invalid'
+
+
+def _result(status, **details):
+    return {'status': status, **details}
+
+
+def book_appointments(requests):
+    """Book each request; return one result dict per request, in order.
+
+    Each request is a dict with ``patient_id``, ``doctor_id``, ``start`` (an
+    aware datetime) and ``reason``. A result's ``status`` is ``booked`` (with
+    ``appointment_id``), ``conflict`` or ``invalid`` (with ``error``).
+    """
+    slot_minutes = settings.APPOINTMENT_SLOT_MINUTES
+    slot = timedelta(minutes=slot_minutes)
+    now = timezone.now()
+    results = [None] * len(requests)
+
+    doctor_ids = {request['doctor_id'] for request in requests}
+    patient_ids = {request['patient_id'] for request in requests}
+    known_doctors = set(Doctor.objects.filter(pk__in=doctor_ids).values_list('pk', flat=True))
+    patient_users = dict(Patient.objects.filter(pk__in=patient_ids).values_list('pk', 'user_id'))
+    hours = load_working_hours(known_doctors)
+    default_hours = default_working_hours()
+
+    pending = []
+    for position, request in enumerate(requests):
+        start = request['start']
+        if request['doctor_id'] not in known_doctors:
+            results[position] = _result(INVALID, error='Unknown doctor.')
+        elif request['patient_id'] not in patient_users:
+            results[position] = _result(INVALID, error='Unknown patient.')
+        elif start <= now:
+            results[position] = _result(INVALID, error='Appointments must be in the future.')
+        elif not fits_schedule(hours.get(request['doctor_id'], default_hours), start, slot_minutes):
+            results[position] = _result(INVALID, error="Not a slot in the doctor's working hours.")
+        else:
+            pending.append(position)
+
+    if not pending:
+        return results
+
+    booked_doctors = sorted({requests[position]['doctor_id'] for position in pending})
+    starts = [requests[position]['start'] for position in pending]
+    with transaction.atomic():
+        # Lock in a fixed order so concurrent batches can't deadlock.
+        list(Doctor.objects.select_for_update().filter(pk__in=booked_doctors).order_by('pk')
+             .values_list('pk', flat=True))
+        taken = {}
+        for doctor_id, start in (Appointment.objects
+                                 .filter(doctor_id__in=booked_doctors, status__in=BLOCKING_STATUSES,
+                                         appointment_date__gt=min(starts) - slot,
+                                         appointment_date__lt=max(starts) + slot)
+                                 .values_list('doctor_id', 'appointment_date')):
+            taken.setdefault(doctor_id, []).append(start)
+        for doctor_starts in taken.values():
+            doctor_starts.sort()
+
+        accepted = []
+        for position in pending:
+            request = requests[position]
+            doctor_starts = taken.setdefault(request['doctor_id'], [])
+            nearest = bisect_left(doctor_starts, request['start'] - slot + timedelta(microseconds=1))
+            if nearest < len(doctor_starts) and doctor_starts[nearest] < request['start'] + slot:
+                results[position] = _result(CONFLICT, error='That slot is already booked.')
+                continue
+            insort(doctor_starts, request['start'])
+            accepted.append(position)
+
+        created = _insert(requests, accepted, results)
+
+        if created:
+            HospitalStats.apply(appointments=len(created), appointments_scheduled=len(created))
+            # The same dashboards accounts.signals would invalidate per row.
+            user_ids = {patient_users[appointment.patient_id] for appointment in created}
+            user_ids.update(Doctor.objects.filter(pk__in={appointment.doctor_id for appointment in created})
+                            .values_list('user_id', flat=True))
+            scopes = [GLOBAL_SCOPE, *(user_scope(user_id) for user_id in user_ids if user_id)]
+            transaction.on_commit(lambda: _after_commit(created, scopes))
+    return results
+
+
+def _new_appointment(request):
+    return Appointment(
+        patient_id=request['patient_id'], doctor_id=request['doctor_id'],
+        appointment_date=request['start'], reason=request.get('reason', ''), status='scheduled',
+    )
+
+
+def _insert(requests, accepted, results):
+    """bulk_create the accepted requests and fill in their results.
+
+    If the batch hits the unique constraint (a booking committed by another
+    process in between), each row is retried in its own savepoint to find
+    the ones that collided.
+    """
+    if not accepted:
+        return []
+    try:
+        with transaction.atomic():
+            created = Appointment.objects.bulk_create([_new_appointment(requests[p]) for p in accepted])
+    except IntegrityError:
+        created = []
+        for position in accepted:
+            try:
+                with transaction.atomic():
+                    [appointment] = Appointment.objects.bulk_create([_new_appointment(requests[position])])
+            except IntegrityError:
+                results[position] = _result(CONFLICT, error='That slot is already booked.')
+            else:
+                created.append(appointment)
+                results[position] = _result(BOOKED, appointment_id=appointment.pk)
+        return created
+
+    for position, appointment in zip(accepted, created):
+        results[position] = _result(BOOKED, appointment_id=appointment.pk)
+    return created
+
+
+def _after_commit(created, scopes):
+    invalidate(*scopes)
+    index = loaded_index()
+    if index is not None:
+        for appointment in created:
+            index.book(appointment.doctor_id, appointment.appointment_date)
+    # bulk_create sent no post_save, so feed open live streams here.
+    watched = [appointment for appointment in created if broker.has_subscribers(appointment.doctor_id)]
+    if watched:
+        patients = Patient.objects.in_bulk({appointment.patient_id for appointment in watched})
+        for appointment in watched:
+            appointment.patient = patients[appointment.patient_id]
+            broker.publish(appointment.doctor_id, appointment_event(appointment))
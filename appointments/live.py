@@ -0,0 +1,219 @@
+"""Live feed of appointment changes for the doctor dashboard.
+
+``appointments.signals`` publishes every committed save or delete of an
+appointment to ``broker``. The broker is an in-process pub/sub that hands
+each event to the open streams of the appointment's doctor.
+``appointments.views.appointment_stream_view`` serves those streams as
+Server-Sent Events. It is routed only by ``hospital.asgi_urls``, because
+under WSGI every open stream would hold a worker thread.
+
+Memory stays bounded. At most APPOINTMENT_STREAM_MAX_CONNECTIONS streams are
+open per process, and each stream buffers at most
+APPOINTMENT_STREAM_QUEUE_SIZE events. A stream that falls further behind
+has its buffer dropped and gets a ``resync`` event, telling the page to
+reload.
+
+Signals only reach streams in the process that made the write. With several
+workers, set APPOINTMENT_STREAM_POLL_SECONDS. Each process then polls once
+per interval for appointments updated since its last poll, for the doctors
+it has streams for. Deletions made by other processes are not seen this way.
+"""
+import asyncio
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateformat import format as format_date
+from django.utils.dateparse import parse_datetime
+from django.utils.text import Truncator
+
+from .models import Appointment
+
+RESYNC = {'event': 'resync'}
+# Events the catch-up on reconnect replays at most; beyond that, resync.
+CATCH_UP_LIMIT = 100
+
+
+def appointment_event(appointment):
+    """The event for a saved appointment, with the fields the dashboard shows."""
+    patient = appointment.patient
+    return {
+        'event': 'appointment',
+        'id': appointment.pk,
+        'version': appointment.updated_at.isoformat(),
+        'patient': f'{patient.first_name} {patient.last_name}',
+        'phone': patient.phone,
+        'date': format_date(timezone.localtime(appointment.appointment_date), 'M d, Y - g:i A'),
+        'reason': Truncator(appointment.reason).words(6),
+        'status': appointment.status,
+        'notes': Truncator(appointment.notes or '').words(4),
+    }
+
+
+def deleted_event(appointment_id):
+    return {'event': 'deleted', 'id': appointment_id, 'version': timezone.now().isoformat()}
+
+
+def changed_since(doctor_ids, since, limit=None):
+    """Events for the doctors' appointments updated after ``since``, oldest first."""
+    appointments = (Appointment.objects.filter(doctor_id__in=doctor_ids, updated_at__gt=since)
+                    .select_related('patient').listing().order_by('updated_at', 'id'))
+    if limit is not None:
+        appointments = appointments[:limit]
+    return [(appointment.doctor_id, appointment_event(appointment)) for appointment in appointments]
+
+
+class Subscription:
+    """One open stream: a bounded queue filled on its event loop."""
+
+    def __init__(self, doctor_id, loop, size):
+        self.doctor_id = doctor_id
+        self.loop = loop
+        self.queue = asyncio.Queue(size)
+
+    def put(self, event):
+        # Runs on self.loop.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class AppointmentBroker:
+    """In-process fan-out of appointment events to doctors' streams.
+
+    ``publish()`` may be called from any thread.
+    """
+
+    # (id, version) pairs remembered to drop events that both a signal and
+    # the poller deliver.
+    RECENT_SIZE = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        self._recent = OrderedDict()
+        self._pollers = {}
+        self._count = 0
+
+    def connection_count(self):
+        return self._count
+
+    def has_subscribers(self, doctor_id):
+        return bool(self._subscriptions.get(doctor_id))
+
+    def subscribe(self, doctor_id):
+        """Open a subscription on the running loop; None when at capacity."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._count >= settings.APPOINTMENT_STREAM_MAX_CONNECTIONS:
+                return None
+            subscription = Subscription(doctor_id, loop, settings.APPOINTMENT_STREAM_QUEUE_SIZE)
+            self._subscriptions[doctor_id].add(subscription)
+            self._count += 1
+            if settings.APPOINTMENT_STREAM_POLL_SECONDS > 0 and loop not in self._pollers:
+                self._pollers[loop] = loop.create_task(self._poll(loop))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.doctor_id)
+            if subscriptions is not None and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscriptions[subscription.doctor_id]
+
+    def publish(self, doctor_id, event):
+        key = (event['id'], event['version'])
+        with self._lock:
+            if key in self._recent:
+                return
+            self._recent[key] = None
+            if len(self._recent) > self.RECENT_SIZE:
+                self._recent.popitem(last=False)
+            subscriptions = list(self._subscriptions.get(doctor_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The stream's loop has closed; it is being torn down.
+                pass
+
+    async def _poll(self, loop):
+        interval = settings.APPOINTMENT_STREAM_POLL_SECONDS
+        # Look back one extra interval each time: a transaction may commit a
+        # row whose updated_at is older than rows an earlier poll already saw.
+        # The repeats are dropped by publish().
+        lag = timedelta(seconds=interval)
+        since = timezone.now()
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                with self._lock:
+                    doctor_ids = [doctor_id for doctor_id, subscriptions in self._subscriptions.items()
+                                  if any(subscription.loop is loop for subscription in subscriptions)]
+                    if not doctor_ids:
+                        del self._pollers[loop]
+                        return
+                for doctor_id, event in await sync_to_async(changed_since)(doctor_ids, since - lag):
+                    self.publish(doctor_id, event)
+                    since = max(since, parse_datetime(event['version']))
+        except BaseException:
+            with self._lock:
+                self._pollers.pop(loop, None)
+            raise
+
+
+broker = AppointmentBroker()
+
+
+def _sse(event):
+    event = dict(event)
+    kind = event.pop('event')
+    lines = [f'event: {kind}']
+    if 'version' in event:
+        lines.append(f"id: {event['version']}")
+    lines.append(f'data: {json.dumps(event)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def event_stream(subscription, backlog=()):
+    """The SSE body for ``subscription``: ``backlog`` first, then live events.
+
+    Closing the stream (the client disconnecting) ends the subscription.
+    """
+    try:
+        yield 'retry: 5000\n\n'
+        for event in backlog:
+            yield _sse(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(),
+                                               settings.APPOINTMENT_STREAM_HEARTBEAT_SECONDS)
+            except TimeoutError:
+                # Comment line: keeps proxies from timing the stream out and
+                # surfaces dead connections.
+                yield ': keepalive\n\n'
+                continue
+            yield _sse(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def catch_up(doctor_id, last_event_id):
+    """Events a client reconnecting with ``Last-Event-ID`` missed."""
+    try:
+        since = parse_datetime(last_event_id or '')
+    except ValueError:
+        since = None
+    if since is None:
+        return []
+    backlog = [event for _, event in changed_since([doctor_id], since, CATCH_UP_LIMIT + 1)]
+    return [RESYNC] if len(backlog) > CATCH_UP_LIMIT else backlog
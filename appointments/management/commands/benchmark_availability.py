@@ -0,0 +1,127 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import timedelta
+import random
+import statistics
+import time
+
+from appointments.availability import AvailabilityIndex, from_timestamp, to_timestamp
+
+SPECIALIZATIONS = ['Cardiology', 'Neurology', 'Orthopedics', 'Pediatrics', 'Dermatology',
+                   'ENT', 'Oncology', 'Psychiatry', 'Radiology', 'General Medicine']
+
+WORKING_HOURS = {weekday: [(9 * 60, 13 * 60), (14 * 60, 18 * 60)] for weekday in range(5)}
+
+
+class NaiveAvailability:
+    """Baseline that scans a doctor's bookings for every candidate slot.
+
+    This is the work a view does when it loads each doctor's appointments
+    and tests candidate times one by one.
+    """
+
+    def __init__(self, grid, bookings):
+        self.grid = grid          # index with the same doctors and no bookings
+        self.bookings = bookings  # doctor id -> unsorted booked timestamps
+
+    def conflicts(self, doctor_id, start):
+        timestamp = to_timestamp(start)
+        return any(abs(booked - timestamp) < self.grid.slot for booked in self.bookings[doctor_id])
+
+    def next_free_slots(self, doctor_ids, count, after, until):
+        found = []
+        for doctor_id in doctor_ids:
+            mine = 0
+            for timestamp, _ in self.grid._free_slots(doctor_id, after, until):
+                if not any(abs(booked - timestamp) < self.grid.slot for booked in self.bookings[doctor_id]):
+                    found.append((timestamp, doctor_id))
+                    mine += 1
+                    if mine == count:
+                        break
+        return sorted(found)[:count]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the appointment availability index against naive scanning '
+        'on synthetic data (default: 1,000 doctors x 90 days). Needs no database rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=1000)
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--fill', type=float, default=0.7,
+                            help='Fraction of working slots that are booked (default: 0.7).')
+        parser.add_argument('--queries', type=int, default=50,
+                            help='Queries per measurement; the median is reported.')
+        parser.add_argument('--count', type=int, default=10, help='Slots per "next free" query.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        days = options['days']
+        start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        after = to_timestamp(start)
+        until = after + days * 86400
+
+        grid = AvailabilityIndex(slot_minutes=30, default_hours=WORKING_HOURS)
+        index = AvailabilityIndex(slot_minutes=30, default_hours=WORKING_HOURS)
+        by_specialization = {}
+        for doctor_id in range(1, options['doctors'] + 1):
+            specialization = SPECIALIZATIONS[doctor_id % len(SPECIALIZATIONS)]
+            grid.add_doctor(doctor_id, specialization)
+            index.add_doctor(doctor_id, specialization)
+            by_specialization.setdefault(specialization, []).append(doctor_id)
+
+        self.stdout.write(f"Seeding {options['doctors']:,} doctors x {days} days...")
+        bookings = {
+            doctor_id: [timestamp for timestamp, _ in grid._free_slots(doctor_id, after, until)
+                        if rng.random() < options['fill']]
+            for doctor_id in range(1, options['doctors'] + 1)
+        }
+        # Book in random order, as signals would.
+        to_book = [(doctor_id, from_timestamp(timestamp))
+                   for doctor_id, starts in bookings.items() for timestamp in starts]
+        rng.shuffle(to_book)
+        started = time.perf_counter()
+        for doctor_id, moment in to_book:
+            index.book(doctor_id, moment)
+        self.stdout.write(
+            f"{len(to_book):,} bookings indexed incrementally in {time.perf_counter() - started:.2f}s"
+        )
+
+        naive = NaiveAvailability(grid, bookings)
+        checks = [(rng.randint(1, options['doctors']), from_timestamp(rng.randrange(after, until)))
+                  for _ in range(options['queries'])]
+        wanted = [rng.choice(SPECIALIZATIONS) for _ in range(options['queries'])]
+        count = options['count']
+
+        rows = [
+            ('conflict check',
+             self.measure(checks, lambda check: index.conflicts(*check)),
+             self.measure(checks, lambda check: naive.conflicts(*check))),
+            (f'next {count} free slots',
+             self.measure(wanted, lambda name: index.next_free_slots(
+                 name, count=count, after=start, horizon_days=days)),
+             self.measure(wanted, lambda name: naive.next_free_slots(
+                 by_specialization[name], count, after, until))),
+            ('book + release',
+             self.measure(checks, lambda check: (index.book(*check), index.release(*check))),
+             None),
+        ]
+
+        self.stdout.write("\n== Median ms per operation")
+        self.stdout.write(f"  {'operation':<24} {'index':>10} {'naive':>10} {'speedup':>9}")
+        for name, fast, slow in rows:
+            if slow is None:
+                self.stdout.write(f"  {name:<24} {fast:>10.4f} {'-':>10} {'-':>9}")
+            else:
+                self.stdout.write(f"  {name:<24} {fast:>10.4f} {slow:>10.4f} {slow / fast:>8.1f}x")
+
+    def measure(self, inputs, operation):
+        timings = []
+        for value in inputs:
+            started = time.perf_counter()
+            operation(value)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
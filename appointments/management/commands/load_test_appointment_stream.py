@@ -0,0 +1,184 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from datetime import date
+import asyncio
+import json
+import logging
+import resource
+import statistics
+import time
+import tracemalloc
+
+from appointments.live import broker
+from appointments.models import Appointment
+from doctors.models import Doctor
+from patients.models import Patient
+
+PREFIX = 'streamload'
+
+
+class StreamClient:
+    """A raw ASGI client holding one live stream open and timing its events."""
+
+    def __init__(self, app, path, cookie):
+        self.app = app
+        self.path = path
+        self.cookie = cookie
+        self.status = None
+        self.requested = False
+        self.disconnected = asyncio.Event()
+        self.buffer = b''
+        self.received = {}
+
+    async def run(self):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': self.path, 'raw_path': self.path.encode(),
+            'query_string': b'', 'root_path': '', 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream'),
+                        (b'cookie', self.cookie.encode())],
+        }
+        await self.app(scope, self.receive, self.send)
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            return
+        self.buffer += message.get('body', b'')
+        *blocks, self.buffer = self.buffer.split(b'\n\n')
+        for block in blocks:
+            for line in block.split(b'\n'):
+                if line.startswith(b'data: '):
+                    event = json.loads(line[6:])
+                    self.received[(event['id'], event['version'])] = time.perf_counter()
+
+
+class Command(BaseCommand):
+    help = (
+        'Open hundreds of live appointment streams against the ASGI application '
+        'in this process, push appointment changes through them, and report '
+        'delivery latency and memory per open stream. Creates its own doctors '
+        'and patient and deletes them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=500,
+                            help='Streams held open at once (default: 500).')
+        parser.add_argument('--doctors', type=int, default=10,
+                            help='Doctors the streams are spread over (default: 10).')
+        parser.add_argument('--events', type=int, default=200,
+                            help='Appointment changes pushed (default: 200).')
+        parser.add_argument('--interval', type=float, default=0.005,
+                            help='Seconds between changes (default: 0.005).')
+
+    def handle(self, *args, **options):
+        if options['connections'] < 1 or options['doctors'] < 1:
+            raise CommandError('--connections and --doctors must be positive.')
+        # Opening hundreds of streams at once trips the latency budget.
+        logging.getLogger('hospital.performance').setLevel(logging.ERROR)
+        appointments, cookies = self.create_people(options['doctors'])
+        try:
+            overrides = {
+                'ROOT_URLCONF': 'hospital.asgi_urls',
+                'ALLOWED_HOSTS': ['*'],
+                'APPOINTMENT_STREAM_MAX_CONNECTIONS': max(options['connections'], 1000),
+            }
+            with override_settings(**overrides):
+                asyncio.run(self.run(appointments, cookies, options))
+        finally:
+            Doctor.objects.filter(user__username__startswith=PREFIX).delete()
+            Patient.objects.filter(email__startswith=PREFIX).delete()
+            get_user_model().objects.filter(username__startswith=PREFIX).delete()
+
+    def create_people(self, count):
+        User = get_user_model()
+        patient = Patient.objects.create(
+            first_name='Stream', last_name='Load', email=f'{PREFIX}@example.com', phone='555',
+            date_of_birth=date(1990, 1, 1), gender='O', address='', city='',
+        )
+        appointments, cookies = [], []
+        for i in range(count):
+            user = User.objects.create_user(username=f'{PREFIX}{i}', role='doctor')
+            doctor = Doctor.objects.create(user=user, specialization='Load', experience=1, phone='555')
+            appointments.append(Appointment.objects.create(
+                patient=patient, doctor=doctor, appointment_date=timezone.now(), reason='Load test',
+            ))
+            client = Client()
+            client.force_login(user)
+            cookies.append(f"sessionid={client.cookies['sessionid'].value}")
+        return appointments, cookies
+
+    async def run(self, appointments, cookies, options):
+        app = ASGIHandler()
+        path = reverse('doctor_appointment_stream')
+        doctors = len(appointments)
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        clients = [StreamClient(app, path, cookies[i % doctors]) for i in range(options['connections'])]
+        tasks = [asyncio.create_task(client.run()) for client in clients]
+        started = time.perf_counter()
+        await self.wait_for(lambda: all(client.status for client in clients), 60, 'streams to open')
+        opened_in = time.perf_counter() - started
+        held = tracemalloc.get_traced_memory()[0] - baseline
+        if any(client.status != 200 for client in clients):
+            raise CommandError(f"Streams answered {sorted({client.status for client in clients})}.")
+
+        sent = {}
+        for i in range(options['events']):
+            appointment = appointments[i % doctors]
+            appointment.notes = f'Update {i}'
+            started = time.perf_counter()
+            # Autocommit: post_save's on_commit publishes before save() returns.
+            await sync_to_async(appointment.save)()
+            sent[(appointment.pk, appointment.updated_at.isoformat())] = started
+            await asyncio.sleep(options['interval'])
+
+        per_doctor = options['connections'] // doctors
+        expected = sum(per_doctor + (i % doctors < options['connections'] % doctors)
+                       for i in range(options['events']))
+        await self.wait_for(lambda: sum(len(client.received) for client in clients) >= expected, 30,
+                            'events to arrive')
+        latencies = [received - sent[key]
+                     for client in clients for key, received in client.received.items() if key in sent]
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+
+        for client in clients:
+            client.disconnected.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), 30)
+        await self.wait_for(lambda: broker.connection_count() == 0, 10, 'streams to close')
+
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        self.stdout.write(
+            f"{len(clients)} streams over {doctors} doctors, opened in {opened_in:.2f}s\n"
+            f"  {options['events']} changes -> {len(latencies):,} of {expected:,} deliveries\n"
+            f"  latency p50 {cuts[49] * 1000:.2f} ms, p99 {cuts[98] * 1000:.2f} ms, "
+            f"max {max(latencies) * 1000:.2f} ms\n"
+            f"  memory held by open streams {held / 1024:,.0f} KiB ({held / len(clients) / 1024:.1f} KiB each), "
+            f"peak {peak / 1024:,.0f} KiB, process max RSS "
+            f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MiB"
+        )
+        if len(latencies) == expected:
+            self.stdout.write(self.style.SUCCESS('✓ every event delivered; all streams closed cleanly'))
+        else:
+            self.stdout.write(self.style.ERROR('✗ some events were not delivered'))
+
+    async def wait_for(self, condition, timeout, what):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise CommandError(f"Timed out waiting for {what}.")
+            await asyncio.sleep(0.01)
@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
+from django.utils import timezone
+from datetime import date, datetime, time as clock, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import random
+import time
+
+from appointments.availability import default_working_hours
+from appointments.booking import BOOKED, CONFLICT, book_appointments
+from appointments.models import BLOCKING_STATUSES, Appointment
+from doctors.models import Doctor
+from patients.models import Patient
+
+PREFIX = 'stressbook'
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent bookers against the configured database (set DATABASE_URL '
+        'to try PostgreSQL) and check that no booking is lost or duplicated. '
+        'Creates its own doctors and patients and deletes them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=400,
+                            help='Booking requests per worker (default: 400).')
+        parser.add_argument('--batch', type=int, default=20, help='Requests per booking call.')
+        parser.add_argument('--doctors', type=int, default=5)
+        parser.add_argument('--slots', type=int, default=40,
+                            help='Slots per doctor the workers compete for (default: 40).')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        doctors, patients = self.create_people(options['doctors'], options['workers'])
+        try:
+            slots = self.upcoming_slots(options['slots'])
+            self.stdout.write(
+                f"{connection.vendor}: {options['workers']} workers x {options['requests']} requests "
+                f"over {len(doctors)} doctors x {len(slots)} slots"
+            )
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                outcomes = list(pool.map(
+                    lambda worker: self.book(worker, doctors, patients[worker], slots, options),
+                    range(options['workers']),
+                ))
+            elapsed = time.perf_counter() - started
+            self.verify(outcomes, doctors, elapsed)
+        finally:
+            Doctor.objects.filter(pk__in=doctors).delete()
+            Patient.objects.filter(pk__in=patients).delete()
+            get_user_model().objects.filter(username__startswith=PREFIX).delete()
+
+    def create_people(self, doctor_count, patient_count):
+        User = get_user_model()
+        if User.objects.filter(username__startswith=PREFIX).exists():
+            raise CommandError(f'Users named {PREFIX}* already exist; remove them first.')
+        doctors = [
+            Doctor.objects.create(
+                user=User.objects.create_user(username=f'{PREFIX}_doc{n}', role='doctor'),
+                specialization='Stress', experience=1, phone='555',
+            ).pk
+            for n in range(doctor_count)
+        ]
+        patients = [
+            Patient.objects.create(
+                first_name='Stress', last_name=str(n), email=f'{PREFIX}{n}@example.com',
+                phone='555', date_of_birth=date(1990, 1, 1), gender='O', address='', city='',
+            ).pk
+            for n in range(patient_count)
+        ]
+        return doctors, patients
+
+    def upcoming_slots(self, count):
+        """The first ``count`` default working-hours slots from tomorrow on."""
+        slot = timedelta(minutes=settings.APPOINTMENT_SLOT_MINUTES)
+        hours = default_working_hours()
+        if not any(hours.values()):
+            raise CommandError('DEFAULT_WORKING_HOURS has no working days.')
+        day = timezone.localdate() + timedelta(days=1)
+        slots = []
+        while len(slots) < count:
+            for window_start, window_end in hours.get(day.weekday(), ()):
+                midnight = timezone.make_aware(datetime.combine(day, clock()))
+                moment = midnight + timedelta(minutes=window_start)
+                while moment + slot <= midnight + timedelta(minutes=window_end) and len(slots) < count:
+                    slots.append(moment)
+                    moment += slot
+            day += timedelta(days=1)
+        return slots
+
+    def book(self, worker, doctors, patient_id, slots, options):
+        rng = random.Random(options['seed'] + worker)
+        results = []
+        try:
+            remaining = options['requests']
+            while remaining:
+                size = min(options['batch'], remaining)
+                remaining -= size
+                results += book_appointments([
+                    {'patient_id': patient_id, 'doctor_id': rng.choice(doctors),
+                     'start': rng.choice(slots), 'reason': 'Stress test'}
+                    for _ in range(size)
+                ])
+        finally:
+            connections.close_all()
+        return results
+
+    def verify(self, outcomes, doctors, elapsed):
+        results = [result for outcome in outcomes for result in outcome]
+        booked_ids = [result['appointment_id'] for result in results if result['status'] == BOOKED]
+        conflicts = sum(result['status'] == CONFLICT for result in results)
+        other = len(results) - len(booked_ids) - conflicts
+
+        rows = Appointment.objects.filter(doctor_id__in=doctors, status__in=BLOCKING_STATUSES)
+        stored = set(rows.values_list('pk', flat=True))
+        duplicates = (rows.values('doctor_id', 'appointment_date')
+                      .annotate(n=Count('id')).filter(n__gt=1).count())
+        lost = len(set(booked_ids) - stored)
+        unreported = len(stored - set(booked_ids))
+
+        self.stdout.write(
+            f'{len(results)} requests in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s): '
+            f'{len(booked_ids)} booked, {conflicts} conflicts, {other} other'
+        )
+        self.stdout.write(
+            f'rows stored: {len(stored)}, duplicate slots: {duplicates}, '
+            f'lost bookings: {lost}, rows nobody was told about: {unreported}'
+        )
+        if duplicates or lost or unreported or other:
+            raise CommandError('Booking invariants violated.')
+        self.stdout.write(self.style.SUCCESS('No lost or duplicate bookings.'))
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:00
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def cancel_double_bookings(apps, schema_editor):
+    """Keep the earliest scheduled appointment of each double-booked slot; cancel the rest.
+
+    Completed and cancelled appointments are history and are left alone.
+    """
+    Appointment = apps.get_model('appointments', 'Appointment')
+    HospitalStats = apps.get_model('stats', 'HospitalStats')
+
+    duplicated = (Appointment.objects.filter(status='scheduled')
+                  .values('doctor_id', 'appointment_date')
+                  .annotate(rows=Count('id'), keep=Min('id'))
+                  .filter(rows__gt=1))
+    cancelled = 0
+    for slot in duplicated.iterator():
+        cancelled += (Appointment.objects
+                      .filter(doctor_id=slot['doctor_id'], appointment_date=slot['appointment_date'],
+                              status='scheduled')
+                      .exclude(pk=slot['keep'])
+                      .update(status='cancelled'))
+
+    # Signals don't run in migrations; move the counts across by hand.
+    if cancelled:
+        HospitalStats.objects.update(appointments_scheduled=F('appointments_scheduled') - cancelled,
+                                     appointments_cancelled=F('appointments_cancelled') + cancelled)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_working_hours'),
+        ('doctors', '0001_initial'),
+        ('patients', '0002_dashboard_indexes'),
+        ('stats', '0002_populate_hospital_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'scheduled')), fields=('doctor', 'appointment_date'), name='appt_unique_doctor_slot'),
+        ),
+    ]
@@ -1,7 +1,50 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from patients.models import Patient
-from doctors.models import Doctor
+from patients.models import Patient, LISTING_FIELDS as PATIENT_LISTING_FIELDS
+from doctors.models import Doctor, LISTING_FIELDS as DOCTOR_LISTING_FIELDS
+
+# Appointments in these statuses occupy their doctor's slot.
+BLOCKING_STATUSES = ('scheduled', 'completed')
+
+
+class AppointmentQuerySet(models.QuerySet):
+
+    def _status_count_query(self, doctor, patient):
+        queryset = self
+        if doctor is not None:
+            queryset = queryset.filter(doctor=doctor)
+        if patient is not None:
+            queryset = queryset.filter(patient=patient)
+
+        aggregates = {'total': models.Count('id')}
+        for status, _ in Appointment.STATUS_CHOICES:
+            aggregates[status] = models.Count('id', filter=models.Q(status=status))
+        return queryset, aggregates
+
+    def status_counts(self, doctor=None, patient=None):
+        """Return the number of appointments per status plus a 'total'.
+
+        All counts come from one conditional-aggregate query; pass a doctor
+        or patient to scope them.
+        """
+        queryset, aggregates = self._status_count_query(doctor, patient)
+        return queryset.aggregate(**aggregates)
+
+    async def astatus_counts(self, doctor=None, patient=None):
+        queryset, aggregates = self._status_count_query(doctor, patient)
+        return await queryset.aaggregate(**aggregates)
+
+    def listing(self):
+        """Join the doctor and its user, loading only the columns listings show.
+
+        Chain ``select_related('patient')`` to show the patient too; only
+        its listing columns are loaded, not the address or clinical notes.
+        """
+        return self.select_related('doctor__user').only(
+            'appointment_date', 'reason', 'status', 'notes', 'updated_at',
+            *(f'patient__{field}' for field in PATIENT_LISTING_FIELDS),
+            *(f'doctor__{field}' for field in DOCTOR_LISTING_FIELDS),
+        )
 
 
 class Appointment(models.Model):
@@ -20,8 +63,77 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AppointmentQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # Keep the HospitalStats update made by the post_save handler in the
+        # same transaction as this write.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.patient} - {self.doctor} on {self.appointment_date}"
 
     class Meta:
         ordering = ['-appointment_date']
+        indexes = [
+            # Doctor dashboard counters and the admin "scheduled today" table.
+            models.Index(fields=['doctor', 'status', 'appointment_date'], name='appt_doctor_status_date_idx'),
+            # Patient dashboard: latest appointments first.
+            models.Index(fields=['patient', '-appointment_date'], name='appt_patient_date_idx'),
+            # Doctor dashboard: latest appointments first.
+            models.Index(fields=['doctor', '-appointment_date'], name='appt_doctor_date_idx'),
+            # Hospital-wide status counters.
+            models.Index(fields=['status'], name='appt_status_idx'),
+            # Only scheduled appointments are looked up by day.
+            models.Index(
+                fields=['appointment_date', 'doctor'],
+                condition=models.Q(status='scheduled'),
+                name='appt_scheduled_date_idx',
+            ),
+        ]
+        constraints = [
+            # No double-booking: a doctor has one scheduled appointment per
+            # start time. Completed visits are in the past, so they can't
+            # clash with a new booking and are left out.
+            models.UniqueConstraint(
+                fields=['doctor', 'appointment_date'],
+                condition=models.Q(status='scheduled'),
+                name='appt_unique_doctor_slot',
+            ),
+        ]
+
+
+class WorkingHours(models.Model):
+    """A window in which a doctor takes appointments on one weekday.
+
+    A doctor may have several windows per day. Doctors with no rows at all
+    work settings.DEFAULT_WORKING_HOURS.
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='working_hours')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    def __str__(self):
+        return f"{self.doctor} {self.get_weekday_display()} {self.start_time}-{self.end_time}"
+
+    class Meta:
+        ordering = ['doctor', 'weekday', 'start_time']
+        verbose_name_plural = 'working hours'
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(start_time__lt=models.F('end_time')),
+                name='working_hours_start_before_end',
+            ),
+        ]
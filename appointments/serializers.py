@@ -0,0 +1,30 @@
+from rest_framework import serializers
+
+from doctors.serializers import DoctorSummarySerializer
+from hospital.api import DynamicFieldsModelSerializer
+from patients.serializers import PatientSummarySerializer
+
+from .models import Appointment
+
+
+class AppointmentSerializer(DynamicFieldsModelSerializer):
+    patient = PatientSummarySerializer(read_only=True)
+    doctor = DoctorSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Appointment
+        fields = ['id', 'patient', 'doctor', 'appointment_date', 'reason', 'status',
+                  'notes', 'created_at', 'updated_at']
+
+
+class BookingRequestSerializer(serializers.Serializer):
+    """One booking in a request to the booking endpoint.
+
+    Ids are plain integers; the booking service checks them for the whole
+    batch at once.
+    """
+    doctor = serializers.IntegerField()
+    start = serializers.DateTimeField()
+    reason = serializers.CharField(required=False, allow_blank=True, default='')
+    # Staff book on behalf of a patient; patients always book for themselves.
+    patient = serializers.IntegerField(required=False)
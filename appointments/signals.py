@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from doctors.models import Doctor
+
+from .availability import load_working_hours, loaded_index
+from .live import appointment_event, broker, deleted_event
+from .models import BLOCKING_STATUSES, Appointment, WorkingHours
+
+# The availability index is only touched once the write has committed, and
+# only if this process has built one; otherwise it is loaded fresh later.
+
+
+def _on_commit(update):
+    def apply():
+        index = loaded_index()
+        if index is not None:
+            update(index)
+
+    if loaded_index() is not None:
+        transaction.on_commit(apply)
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_slot(sender, instance, **kwargs):
+    instance._availability_previous = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list('doctor_id', 'appointment_date', 'status').first()
+        if instance.pk and loaded_index() is not None else None
+    )
+
+
+@receiver(post_save, sender=Appointment)
+def index_saved_appointment(sender, instance, **kwargs):
+    previous = getattr(instance, '_availability_previous', None)
+    current = (instance.doctor_id, instance.appointment_date, instance.status)
+
+    def update(index):
+        if previous is not None and previous[2] in BLOCKING_STATUSES:
+            index.release(previous[0], previous[1])
+        if instance.status in BLOCKING_STATUSES:
+            index.book(current[0], current[1])
+
+    if previous != current:
+        _on_commit(update)
+
+
+@receiver(post_delete, sender=Appointment)
+def index_deleted_appointment(sender, instance, **kwargs):
+    if instance.status in BLOCKING_STATUSES:
+        doctor_id, start = instance.doctor_id, instance.appointment_date
+        _on_commit(lambda index: index.release(doctor_id, start))
+
+
+@receiver(post_save, sender=Appointment)
+def publish_saved_appointment(sender, instance, **kwargs):
+    # Only build the event when this process has a stream open for the doctor.
+    if broker.has_subscribers(instance.doctor_id):
+        transaction.on_commit(lambda: broker.publish(instance.doctor_id, appointment_event(instance)))
+
+
+@receiver(post_delete, sender=Appointment)
+def publish_deleted_appointment(sender, instance, **kwargs):
+    if broker.has_subscribers(instance.doctor_id):
+        doctor_id, event = instance.doctor_id, deleted_event(instance.pk)
+        transaction.on_commit(lambda: broker.publish(doctor_id, event))
+
+
+@receiver(post_save, sender=Doctor)
+def index_saved_doctor(sender, instance, **kwargs):
+    doctor_id, specialization = instance.pk, instance.specialization
+    _on_commit(lambda index: index.add_doctor(doctor_id, specialization))
+
+
+@receiver(post_delete, sender=Doctor)
+def index_deleted_doctor(sender, instance, **kwargs):
+    # delete() clears instance.pk before the commit callbacks run.
+    doctor_id = instance.pk
+    _on_commit(lambda index: index.remove_doctor(doctor_id))
+
+
+@receiver([post_save, post_delete], sender=WorkingHours)
+def index_working_hours(sender, instance, **kwargs):
+    doctor_id = instance.doctor_id
+
+    def update(index):
+        index.set_hours(doctor_id, load_working_hours([doctor_id]).get(doctor_id))
+
+    _on_commit(update)
@@ -1,3 +1,502 @@
-from django.test import TestCase
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from doctors.models import Doctor
+from patients.models import Patient
+from stats.models import HospitalStats
+
+from .availability import AvailabilityIndex, get_index, reset_index
+from .booking import BOOKED, CONFLICT, INVALID, _insert, book_appointments
+from .live import RESYNC, AppointmentBroker, appointment_event, event_stream
+from .models import Appointment, WorkingHours
+
+User = get_user_model()
+
+
+class AppointmentStatusCountsTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+            address='', city='',
+        )
+        self.doctors = [
+            Doctor.objects.create(
+                user=User.objects.create_user(username=f'doc{i}'),
+                specialization='ENT', experience=5, phone='555',
+            )
+            for i in range(2)
+        ]
+        for doctor, status in [(self.doctors[0], 'scheduled'),
+                               (self.doctors[0], 'scheduled'),
+                               (self.doctors[0], 'completed'),
+                               (self.doctors[1], 'cancelled')]:
+            Appointment.objects.create(
+                patient=self.patient, doctor=doctor,
+                appointment_date=timezone.now(), reason='Checkup', status=status,
+            )
+
+    def test_counts_all_statuses_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = Appointment.objects.status_counts()
+        self.assertEqual(counts, {'total': 4, 'scheduled': 2, 'completed': 1, 'cancelled': 1})
+
+    def test_counts_scoped_to_doctor(self):
+        counts = Appointment.objects.status_counts(doctor=self.doctors[1])
+        self.assertEqual(counts, {'total': 1, 'scheduled': 0, 'completed': 0, 'cancelled': 1})
+
+    def test_counts_scoped_to_patient(self):
+        counts = Appointment.objects.status_counts(patient=self.patient)
+        self.assertEqual(counts['total'], 4)
+
+
+class AppointmentApiTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='chairman', is_staff=True, role='admin')
+        self.patient = Patient.objects.create(
+            user=User.objects.create_user(username='pat', role='patient'),
+            first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+            address='', city='',
+        )
+        self.doctors = [
+            Doctor.objects.create(
+                user=User.objects.create_user(username=f'doc{i}', first_name=f'Doc{i}', role='doctor'),
+                specialization='ENT', experience=5, phone='555',
+            )
+            for i in range(2)
+        ]
+
+    def add_appointments(self, count, doctor=None):
+        now = timezone.now()
+        for i in range(count):
+            Appointment.objects.create(
+                patient=self.patient, doctor=doctor or self.doctors[i % 2],
+                appointment_date=now + timedelta(hours=i), reason='Checkup',
+            )
+
+    def list_queries(self, user, params=''):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api-appointment-list') + params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_query_count_is_constant_per_page(self):
+        self.add_appointments(3)
+        small, page = self.list_queries(self.admin)
+        self.assertEqual(len(page['results']), 3)
+        self.add_appointments(20)
+        large, page = self.list_queries(self.admin)
+        self.assertEqual(len(page['results']), 23)
+        self.assertEqual(small, large)
+
+    def test_nested_doctor_and_patient(self):
+        self.add_appointments(1, doctor=self.doctors[0])
+        _, page = self.list_queries(self.admin)
+        row = page['results'][0]
+        self.assertEqual(row['doctor'], {'id': self.doctors[0].id, 'name': 'Doc0', 'specialization': 'ENT'})
+        self.assertEqual(row['patient']['last_name'], 'Ient')
+
+    def test_fields_selection_skips_unused_joins(self):
+        self.add_appointments(2)
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api-appointment-list') + '?fields=id,status')
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'status'})
+        self.assertFalse([q for q in ctx.captured_queries if 'doctors_doctor' in q['sql']])
+
+    def test_cursor_pagination(self):
+        self.add_appointments(5)
+        _, first = self.list_queries(self.admin, '?page_size=3')
+        self.assertEqual(len(first['results']), 3)
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 2)
+        self.assertIsNone(second['next'])
+        seen = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(sorted(seen), sorted(Appointment.objects.values_list('id', flat=True)))
+
+    def test_users_see_only_their_own_appointments(self):
+        self.add_appointments(1, doctor=self.doctors[0])
+        self.add_appointments(2, doctor=self.doctors[1])
+        _, page = self.list_queries(self.doctors[1].user)
+        self.assertEqual(len(page['results']), 2)
+        _, page = self.list_queries(self.patient.user)
+        self.assertEqual(len(page['results']), 3)
+        other = User.objects.create_user(username='nobody', role='patient')
+        _, page = self.list_queries(other)
+        self.assertEqual(page['results'], [])
+
+    def test_etag_conditional_response(self):
+        self.add_appointments(2)
+        self.client.force_login(self.admin)
+        url = reverse('api-appointment-list')
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+        self.add_appointments(1)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_requires_authentication(self):
+        response = self.client.get(reverse('api-appointment-list'))
+        self.assertEqual(response.status_code, 403)
+
+
+# 2030-01-07 is a Monday.
+MONDAY = datetime(2030, 1, 7, tzinfo=dt_timezone.utc)
+
+
+def at(day_offset, hour, minute=0):
+    return MONDAY + timedelta(days=day_offset, hours=hour, minutes=minute)
+
+
+class AvailabilityIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.index = AvailabilityIndex(slot_minutes=30, default_hours={
+            weekday: [(9 * 60, 12 * 60)] for weekday in range(5)
+        })
+        self.index.add_doctor(1, 'Cardiology')
+        self.index.add_doctor(2, ' cardiology ')
+        self.index.add_doctor(3, 'ENT')
+
+    def test_conflicts_with_overlapping_bookings_only(self):
+        self.index.book(1, at(0, 10))
+        self.assertEqual(self.index.conflicts(1, at(0, 10)), at(0, 10))
+        self.assertEqual(self.index.conflicts(1, at(0, 9, 45)), at(0, 10))
+        self.assertEqual(self.index.conflicts(1, at(0, 10, 29)), at(0, 10))
+        self.assertIsNone(self.index.conflicts(1, at(0, 9, 30)))
+        self.assertIsNone(self.index.conflicts(1, at(0, 10, 30)))
+        self.assertIsNone(self.index.conflicts(2, at(0, 10)))
+
+    def test_next_free_slots_skip_bookings_and_merge_doctors(self):
+        self.index.book(1, at(0, 9))
+        self.index.book(2, at(0, 9))
+        self.index.book(2, at(0, 9, 40))  # off-grid: blocks 9:30 and 10:00
+        slots = self.index.next_free_slots('CARDIOLOGY', count=4, after=at(0, 8))
+        self.assertEqual(slots, [(at(0, 9, 30), 1), (at(0, 10), 1), (at(0, 10, 30), 1), (at(0, 10, 30), 2)])
+
+    def test_slots_follow_working_hours(self):
+        self.index.set_hours(3, {5: [('08:00', '09:00')]})  # Saturdays only
+        slots = self.index.next_free_slots('ent', count=3, after=at(0, 0))
+        self.assertEqual(slots, [(at(5, 8), 3), (at(5, 8, 30), 3), (at(12, 8), 3)])
+        self.assertTrue(self.index.is_available(3, at(5, 8, 30)))
+        self.assertFalse(self.index.is_available(3, at(5, 8, 45)))
+        self.assertFalse(self.index.is_available(3, at(0, 10)))
+
+    def test_release_frees_the_slot(self):
+        self.index.book(3, at(0, 9))
+        self.index.release(3, at(0, 9))
+        self.assertEqual(self.index.next_free_slots('ent', count=1, after=at(0, 9)), [(at(0, 9), 3)])
+
+    def test_after_is_rounded_up_to_the_slot_grid(self):
+        self.assertEqual(self.index.next_free_slots('ent', count=1, after=at(0, 9, 10)),
+                         [(at(0, 9, 30), 3)])
+
+    def test_unknown_specialization_has_no_slots(self):
+        self.assertEqual(self.index.next_free_slots('Dermatology', after=at(0, 8)), [])
+
+
+@override_settings(APPOINTMENT_SLOT_MINUTES=30,
+                   DEFAULT_WORKING_HOURS={weekday: [('09:00', '10:00')] for weekday in range(5)})
+class AvailabilitySignalTests(TestCase):
+
+    def setUp(self):
+        reset_index()
+        self.addCleanup(reset_index)
+        self.patient = Patient.objects.create(
+            first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+            address='', city='',
+        )
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create_user(username='doc', first_name='Greg'),
+            specialization='ENT', experience=5, phone='555',
+        )
+
+    def free(self, specialization='ENT'):
+        return [start for start, _ in get_index().next_free_slots(specialization, count=2, after=at(0, 0))]
+
+    def test_index_follows_appointment_changes(self):
+        self.assertEqual(self.free(), [at(0, 9), at(0, 9, 30)])
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = Appointment.objects.create(
+                patient=self.patient, doctor=self.doctor, appointment_date=at(0, 9), reason='Checkup',
+            )
+        self.assertEqual(self.free(), [at(0, 9, 30), at(1, 9)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.appointment_date = at(0, 9, 30)
+            appointment.save()
+        self.assertEqual(self.free(), [at(0, 9), at(1, 9)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = 'cancelled'
+            appointment.save()
+        self.assertEqual(self.free(), [at(0, 9), at(0, 9, 30)])
+
+    def test_index_follows_doctors_and_working_hours(self):
+        get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkingHours.objects.create(doctor=self.doctor, weekday=2, start_time=time(14), end_time=time(15))
+        self.assertEqual(self.free(), [at(2, 14), at(2, 14, 30)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor.specialization = 'Cardiology'
+            self.doctor.save()
+        self.assertEqual(self.free('ENT'), [])
+        self.assertEqual(self.free('cardiology'), [at(2, 14), at(2, 14, 30)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor.delete()
+        self.assertEqual(self.free('cardiology'), [])
+
+    def test_availability_endpoint(self):
+        self.client.force_login(self.patient_user())
+        response = self.client.get(reverse('api-availability'),
+                                   {'specialization': 'ent', 'count': 3, 'after': '2030-01-07T09:15:00Z'})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([row['start'] for row in body['results']],
+                         ['2030-01-07T09:30:00Z', '2030-01-08T09:00:00Z', '2030-01-08T09:30:00Z'])
+        self.assertEqual(body['results'][0]['doctor']['name'], 'Greg')
+
+    def patient_user(self):
+        return User.objects.create_user(username='pat', role='patient')
+
+
+@override_settings(APPOINTMENT_SLOT_MINUTES=30,
+                   DEFAULT_WORKING_HOURS={weekday: [('09:00', '10:00')] for weekday in range(5)})
+class BookingTests(TestCase):
+
+    def setUp(self):
+        reset_index()
+        self.addCleanup(reset_index)
+        self.patient = Patient.objects.create(
+            user=User.objects.create_user(username='pat', role='patient'),
+            first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+            address='', city='',
+        )
+        self.doctors = [
+            Doctor.objects.create(
+                user=User.objects.create_user(username=f'doc{i}', role='doctor'),
+                specialization='ENT', experience=5, phone='555',
+            )
+            for i in range(2)
+        ]
+
+    def request(self, start, doctor=0, **extra):
+        return {'patient_id': self.patient.pk, 'doctor_id': self.doctors[doctor].pk,
+                'start': start, 'reason': 'Checkup', **extra}
+
+    def book(self, *requests):
+        with self.captureOnCommitCallbacks(execute=True):
+            results = book_appointments(list(requests))
+        return [result['status'] for result in results]
+
+    def test_batch_books_free_slots_and_reports_conflicts(self):
+        self.book(self.request(at(0, 9)))
+        statuses = self.book(
+            self.request(at(0, 9)),              # taken before
+            self.request(at(0, 9, 30)),
+            self.request(at(0, 9, 30)),          # taken earlier in this batch
+            self.request(at(0, 9, 30), doctor=1),
+        )
+        self.assertEqual(statuses, [CONFLICT, BOOKED, CONFLICT, BOOKED])
+        self.assertEqual(Appointment.objects.count(), 3)
+
+    def test_invalid_requests_are_not_booked(self):
+        statuses = self.book(
+            self.request(at(0, 9, 15)),                  # off the slot grid
+            self.request(at(0, 10)),                     # after hours
+            self.request(at(5, 9)),                      # Saturday
+            self.request(timezone.now() - timedelta(days=1)),
+            self.request(at(0, 9), doctor_id=0),
+            self.request(at(0, 9), patient_id=0),
+        )
+        self.assertEqual(statuses, [INVALID] * 6)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_one_insert_for_the_batch(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.book(*(self.request(at(day, 9)) for day in range(5)))
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "appointments_appointment"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_updates_stats_and_availability_index(self):
+        get_index()
+        before = HospitalStats.current()
+        self.book(self.request(at(0, 9)), self.request(at(0, 9), doctor=1))
+        after = HospitalStats.current()
+        self.assertEqual(after.appointments - before.appointments, 2)
+        self.assertEqual(after.appointments_scheduled - before.appointments_scheduled, 2)
+        self.assertFalse(get_index().is_available(self.doctors[0].pk, at(0, 9)))
+        self.assertTrue(get_index().is_available(self.doctors[0].pk, at(0, 9, 30)))
+
+    def test_insert_race_falls_back_to_per_row_conflicts(self):
+        # Another process booked 9:00 after this batch read the schedule.
+        Appointment.objects.create(patient=self.patient, doctor=self.doctors[0],
+                                   appointment_date=at(0, 9), reason='Checkup')
+        requests = [self.request(at(0, 9)), self.request(at(0, 9, 30))]
+        results = [None, None]
+        created = _insert(requests, [0, 1], results)
+        self.assertEqual([result['status'] for result in results], [CONFLICT, BOOKED])
+        self.assertEqual([appointment.pk for appointment in created], [results[1]['appointment_id']])
+
+    def post(self, user, payload):
+        self.client.force_login(user)
+        return self.client.post(reverse('api-bookings'), payload, content_type='application/json')
+
+    def test_endpoint_single_booking(self):
+        payload = {'doctor': self.doctors[0].pk, 'start': '2030-01-07T09:00:00Z', 'reason': 'Checkup'}
+        response = self.post(self.patient.user, payload)
+        self.assertEqual(response.status_code, 201)
+        appointment = Appointment.objects.get(pk=response.json()['appointment_id'])
+        self.assertEqual(appointment.patient, self.patient)
+        self.assertEqual(self.post(self.patient.user, payload).status_code, 409)
+        self.assertEqual(self.post(self.patient.user, {**payload, 'start': 'soon'}).status_code, 400)
+
+    def test_endpoint_batch_for_staff(self):
+        admin = User.objects.create_user(username='chairman', is_staff=True, role='admin')
+        booking = {'doctor': self.doctors[0].pk, 'start': '2030-01-07T09:00:00Z'}
+        response = self.post(admin, [{**booking, 'patient': self.patient.pk}, booking,
+                                     {**booking, 'patient': self.patient.pk}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()['results']],
+                         [BOOKED, INVALID, CONFLICT])
+
+    def test_endpoint_rejects_doctors_and_oversized_batches(self):
+        booking = {'doctor': self.doctors[0].pk, 'start': '2030-01-07T09:00:00Z'}
+        self.assertEqual(self.post(self.doctors[0].user, booking).status_code, 403)
+        with self.settings(BOOKING_MAX_BATCH=2):
+            self.assertEqual(self.post(self.patient.user, [booking] * 3).status_code, 400)
+
+
+class BookingStressTests(TransactionTestCase):
+
+    def test_concurrent_bookers_neither_lose_nor_duplicate_bookings(self):
+        # Shared-cache in-memory SQLite fails concurrent writers with "table is
+        # locked" instead of waiting, so this needs a file or server database.
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('needs a database that lets concurrent writers wait')
+        out = StringIO()
+        call_command('stress_booking', workers=4, requests=60, batch=10, doctors=2, slots=10, stdout=out)
+        self.assertIn('No lost or duplicate bookings.', out.getvalue())
+        self.assertFalse(Appointment.objects.exists())
+
+
+class AppointmentStreamTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+            address='', city='',
+        )
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create_user(username='doc', role='doctor'),
+            specialization='ENT', experience=5, phone='555',
+        )
+
+    def event(self, appointment_id, version='v1'):
+        return {'event': 'appointment', 'id': appointment_id, 'version': version, 'status': 'scheduled'}
+
+    @override_settings(APPOINTMENT_STREAM_QUEUE_SIZE=2, APPOINTMENT_STREAM_MAX_CONNECTIONS=2)
+    async def test_broker_fans_out_drops_duplicates_and_resyncs_slow_streams(self):
+        broker = AppointmentBroker()
+        first, second = broker.subscribe(1), broker.subscribe(2)
+        self.assertIsNone(broker.subscribe(1))
+
+        # publish() runs in the signal's thread, not on the loop.
+        await asyncio.to_thread(broker.publish, 1, self.event(10))
+        await asyncio.to_thread(broker.publish, 1, self.event(10))
+        await asyncio.sleep(0)
+        self.assertEqual((first.queue.qsize(), second.queue.qsize()), (1, 0))
+
+        for version in ('v2', 'v3'):
+            broker.publish(1, self.event(10, version))
+        await asyncio.sleep(0)
+        self.assertEqual([first.queue.get_nowait() for _ in range(first.queue.qsize())], [RESYNC])
+
+        broker.unsubscribe(first)
+        broker.unsubscribe(first)
+        self.assertEqual(broker.connection_count(), 1)
+        self.assertFalse(broker.has_subscribers(1))
+
+    async def test_closing_the_stream_unsubscribes(self):
+        broker = AppointmentBroker()
+        subscription = broker.subscribe(1)
+        with mock.patch('appointments.live.broker', broker):
+            stream = event_stream(subscription, [self.event(10)])
+            self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+            self.assertIn('event: appointment\nid: v1\n', await anext(stream))
+            broker.publish(1, self.event(11))
+            self.assertIn('"id": 11', await anext(stream))
+            await stream.aclose()
+        self.assertEqual(broker.connection_count(), 0)
+
+    def test_saves_and_deletes_are_published_on_commit(self):
+        with mock.patch('appointments.signals.broker') as broker:
+            broker.has_subscribers.return_value = True
+            with self.captureOnCommitCallbacks(execute=True):
+                appointment = Appointment.objects.create(patient=self.patient, doctor=self.doctor,
+                                                         appointment_date=timezone.now(), reason='Checkup')
+            doctor_id, event = broker.publish.call_args.args
+            self.assertEqual((doctor_id, event['id'], event['patient']), (self.doctor.pk, appointment.pk, 'Pat Ient'))
+            with self.captureOnCommitCallbacks(execute=True):
+                appointment.delete()
+            self.assertEqual(broker.publish.call_args.args[1]['event'], 'deleted')
+
+    def test_bookings_are_published(self):
+        start = timezone.make_aware(datetime.combine(date.today() + timedelta(days=7), time(10)))
+        while start.weekday() >= 5:
+            start += timedelta(days=1)
+        with mock.patch('appointments.booking.broker') as broker:
+            broker.has_subscribers.return_value = True
+            with self.captureOnCommitCallbacks(execute=True):
+                [result] = book_appointments([{'patient_id': self.patient.pk, 'doctor_id': self.doctor.pk,
+                                               'start': start}])
+        self.assertEqual(result['status'], BOOKED)
+        self.assertEqual(broker.publish.call_args.args[1]['status'], 'scheduled')
+
+    @override_settings(ROOT_URLCONF='hospital.asgi_urls')
+    async def test_stream_view(self):
+        broker = AppointmentBroker()
+        url = reverse('doctor_appointment_stream')
+        self.assertEqual((await self.async_client.get(url)).status_code, 403)
+        await self.async_client.aforce_login(self.doctor.user)
+        with mock.patch('appointments.views.broker', broker), mock.patch('appointments.live.broker', broker):
+            response = await self.async_client.get(url)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            content = aiter(response.streaming_content)
+            self.assertEqual(await anext(content), b'retry: 5000\n\n')
+            broker.publish(self.doctor.pk, self.event(10))
+            self.assertIn(b'event: appointment', await anext(content))
+
+    @override_settings(ROOT_URLCONF='hospital.asgi_urls')
+    async def test_reconnect_replays_missed_changes(self):
+        appointment = await Appointment.objects.acreate(patient=self.patient, doctor=self.doctor,
+                                                        appointment_date=timezone.now(), reason='Checkup')
+        await self.async_client.aforce_login(self.doctor.user)
+        since = (appointment.updated_at - timedelta(seconds=1)).isoformat()
+        with mock.patch('appointments.views.broker', AppointmentBroker()):
+            response = await self.async_client.get(reverse('doctor_appointment_stream'),
+                                                   headers={'last-event-id': since})
+            content = aiter(response.streaming_content)
+            await anext(content)
+            replayed = (await anext(content)).decode()
+        expected = appointment_event(await Appointment.objects.select_related('patient').aget(pk=appointment.pk))
+        self.assertIn(f"id: {expected['version']}", replayed)
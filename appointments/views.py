@@ -1,3 +1,165 @@
-from django.shortcuts import render
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from accounts.roles import resolve_role
+from doctors.models import Doctor
+from doctors.serializers import DoctorSummarySerializer
+from hospital.api import ReadOnlyApiViewSet
+from patients.models import Patient
+
+from .availability import get_index
+from .booking import BOOKED, CONFLICT, book_appointments
+from .live import broker, catch_up, event_stream
+from .models import Appointment
+from .serializers import AppointmentSerializer, BookingRequestSerializer
+
+
+class AppointmentViewSet(ReadOnlyApiViewSet):
+    """Appointments: all for staff, otherwise the doctor's or patient's own.
+
+    Filter with ``?status=``.
+    """
+    serializer_class = AppointmentSerializer
+    ordering = ('-appointment_date', '-id')
+    related_fields = {'patient': ['patient'], 'doctor': ['doctor__user']}
+
+    def get_base_queryset(self):
+        user = self.request.user
+        queryset = Appointment.objects.all()
+        if not user.is_staff:
+            role = resolve_role(user)
+            if role == 'doctor':
+                queryset = queryset.filter(doctor__user=user)
+            elif role == 'patient':
+                queryset = queryset.filter(patient__user=user)
+            else:
+                return queryset.none()
+        status = self.request.query_params.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset
+
+
+class AvailabilityView(APIView):
+    """Next free appointment slots, earliest first.
+
+    ``?specialization=`` limits the doctors, ``?count=`` (up to 100) sets
+    how many slots to return and ``?after=`` (ISO 8601) where to start.
+    """
+
+    def get(self, request):
+        try:
+            count = max(1, min(int(request.query_params.get('count', 10)), 100))
+        except ValueError:
+            raise ValidationError({'count': 'Must be an integer.'})
+        after = request.query_params.get('after')
+        if after:
+            after = parse_datetime(after)
+            if after is None:
+                raise ValidationError({'after': 'Must be an ISO 8601 datetime.'})
+            if timezone.is_naive(after):
+                after = timezone.make_aware(after)
+            after = max(after, timezone.now())
+
+        slots = get_index().next_free_slots(
+            specialization=request.query_params.get('specialization'),
+            count=count,
+            after=after,
+            horizon_days=settings.AVAILABILITY_HORIZON_DAYS,
+        )
+        doctors = Doctor.objects.in_bulk({doctor_id for _, doctor_id in slots})
+        return Response({
+            'slot_minutes': settings.APPOINTMENT_SLOT_MINUTES,
+            'results': [
+                {'start': start, 'doctor': DoctorSummarySerializer(doctors[doctor_id]).data}
+                for start, doctor_id in slots
+                if doctor_id in doctors
+            ],
+        })
+
+
+class BookingView(APIView):
+    """Book one appointment, or a list of up to BOOKING_MAX_BATCH.
+
+    Each booking has ``doctor``, ``start`` and ``reason``; staff also give
+    ``patient``. A single booking answers 201, 409 (slot taken) or 400. A
+    list answers 200 with one result per booking, in order.
+    """
+    single_status = {BOOKED: status.HTTP_201_CREATED, CONFLICT: status.HTTP_409_CONFLICT}
+
+    def post(self, request):
+        user = request.user
+        own_patient_id = None
+        if not user.is_staff:
+            if resolve_role(user) != 'patient':
+                raise PermissionDenied('Only patients and staff can book appointments.')
+            own_patient_id = Patient.objects.filter(user=user).values_list('pk', flat=True).first()
+            if own_patient_id is None:
+                raise PermissionDenied('No patient record is linked to this account.')
+
+        many = isinstance(request.data, list)
+        items = request.data if many else [request.data]
+        if len(items) > settings.BOOKING_MAX_BATCH:
+            raise ValidationError({'detail': f'At most {settings.BOOKING_MAX_BATCH} bookings per request.'})
+
+        results = [None] * len(items)
+        positions, bookings = [], []
+        for position, item in enumerate(items):
+            serializer = BookingRequestSerializer(data=item)
+            if not serializer.is_valid():
+                results[position] = {'status': 'invalid', 'error': serializer.errors}
+                continue
+            data = serializer.validated_data
+            patient_id = own_patient_id if own_patient_id is not None else data.get('patient')
+            if patient_id is None:
+                results[position] = {'status': 'invalid', 'error': {'patient': ['This field is required.']}}
+                continue
+            positions.append(position)
+            bookings.append({'patient_id': patient_id, 'doctor_id': data['doctor'],
+                             'start': data['start'], 'reason': data['reason']})
+
+        for position, result in zip(positions, book_appointments(bookings)):
+            results[position] = result
+        if many:
+            return Response({'results': results})
+        [result] = results
+        return Response(result, status=self.single_status.get(result['status'], status.HTTP_400_BAD_REQUEST))
+
+
+async def appointment_stream_view(request):
+    """Server-Sent Events stream of the signed-in doctor's appointment changes.
+
+    ASGI only (see ``appointments.live``). A reconnecting browser sends the
+    id of the last event it saw in ``Last-Event-ID``, and the changes it
+    missed are replayed first.
+    """
+    user = await request.auser()
+    if not user.is_authenticated or await sync_to_async(resolve_role)(user) != 'doctor':
+        return HttpResponseForbidden('Doctors only.')
+    doctor_id = await Doctor.objects.filter(user=user).values_list('pk', flat=True).afirst()
+    if doctor_id is None:
+        return HttpResponseForbidden('Doctors only.')
+
+    subscription = broker.subscribe(doctor_id)
+    if subscription is None:
+        response = HttpResponse('Too many live connections; try again later.', status=503)
+        response['Retry-After'] = '30'
+        return response
+    try:
+        backlog = await sync_to_async(catch_up)(doctor_id, request.headers.get('Last-Event-ID'))
+    except BaseException:
+        broker.unsubscribe(subscription)
+        raise
+
+    response = StreamingHttpResponse(event_stream(subscription, backlog), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx-style proxies not to buffer the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
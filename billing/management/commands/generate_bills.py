@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from decimal import Decimal, InvalidOperation
+import time
+
+from billing.services import bill_completed_appointments
+
+
+def amount(value):
+    try:
+        return Decimal(value).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(value)
+
+
+class Command(BaseCommand):
+    help = (
+        'Create a pending bill for every completed appointment that has none, '
+        'in batches. Safe to run concurrently; rerun to resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Bills created per transaction (default: 1000).')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after about this many bills.')
+        parser.add_argument('--amount', type=amount, default=None,
+                            help='Bill amount (default: BILLING_CONSULTATION_FEE).')
+        parser.add_argument('--due-days', type=int, default=None,
+                            help='Days until each bill is due (default: BILLING_DUE_DAYS).')
+
+    def handle(self, *args, **options):
+        fee = options['amount'] if options['amount'] is not None else settings.BILLING_CONSULTATION_FEE
+        self.stdout.write(f"Billing completed appointments at {fee} each...")
+        started = time.perf_counter()
+        total = last_id = 0
+        while options['limit'] is None or total < options['limit']:
+            batch_size = options['batch_size']
+            if options['limit'] is not None:
+                batch_size = min(batch_size, options['limit'] - total)
+            created, last_id = bill_completed_appointments(batch_size, amount=options['amount'],
+                                                           due_days=options['due_days'], after_id=last_id)
+            if not created:
+                break
+            total += created
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {total:,} bills ({total / elapsed:,.0f} rows/s)")
+
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f"✓ Created {total:,} bills in {elapsed:.2f}s ({rate:,.0f} rows/s)."))
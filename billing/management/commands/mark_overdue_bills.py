@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import date
+import time
+
+from billing.services import mark_overdue_bills
+
+
+class Command(BaseCommand):
+    help = (
+        'Mark pending bills past their due date as overdue, with one UPDATE per '
+        'batch. Safe to run concurrently; rerun to resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Bills updated per transaction (default: 5000).')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after about this many bills.')
+        parser.add_argument('--today', type=date.fromisoformat, default=None,
+                            help='Treat this date (YYYY-MM-DD) as today.')
+
+    def handle(self, *args, **options):
+        today = options['today'] or timezone.localdate()
+        self.stdout.write(f"Marking bills due before {today} as overdue...")
+        started = time.perf_counter()
+        total = 0
+        while options['limit'] is None or total < options['limit']:
+            batch_size = options['batch_size']
+            if options['limit'] is not None:
+                batch_size = min(batch_size, options['limit'] - total)
+            updated = mark_overdue_bills(batch_size, today=today)
+            if not updated:
+                break
+            total += updated
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {total:,} bills ({total / elapsed:,.0f} rows/s)")
+
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f"✓ Marked {total:,} bills overdue in {elapsed:.2f}s ({rate:,.0f} rows/s)."))
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['patient', 'status'], name='bill_patient_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['patient', '-issue_date'], name='bill_patient_issue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['status', '-issue_date'], name='bill_status_issue_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['due_date', 'id'], condition=models.Q(status='pending'),
+                               name='bill_pending_due_idx'),
+        ),
+    ]
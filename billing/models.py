@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from patients.models import Patient
 from appointments.models import Appointment
 
@@ -21,8 +21,25 @@ class Bill(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        # Keep the HospitalStats update made by the post_save handler in the
+        # same transaction as this write.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Bill for {self.patient} - ${self.amount}"
 
     class Meta:
         ordering = ['-issue_date']
+        indexes = [
+            # Patient dashboard: pending bills.
+            models.Index(fields=['patient', 'status'], name='bill_patient_status_idx'),
+            # Patient dashboard: latest bills first.
+            models.Index(fields=['patient', '-issue_date'], name='bill_patient_issue_idx'),
+            # Status counters and per-status listings, newest first.
+            models.Index(fields=['status', '-issue_date'], name='bill_status_issue_idx'),
+            # Overdue sweep: pending bills by due date.
+            models.Index(fields=['due_date', 'id'], condition=models.Q(status='pending'),
+                         name='bill_pending_due_idx'),
+        ]
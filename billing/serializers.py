@@ -0,0 +1,17 @@
+from rest_framework import serializers
+
+from hospital.api import DynamicFieldsModelSerializer
+from patients.serializers import PatientSummarySerializer
+
+from .models import Bill
+
+
+class BillSerializer(DynamicFieldsModelSerializer):
+    patient = PatientSummarySerializer(read_only=True)
+    # Read from appointment_id; no join needed.
+    appointment = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model = Bill
+        fields = ['id', 'patient', 'appointment', 'amount', 'description', 'status',
+                  'issue_date', 'due_date', 'paid_date']
@@ -0,0 +1,144 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from accounts.dashboard_cache import GLOBAL_SCOPE, invalidate, user_scope
+from appointments.models import Appointment
+from patients.models import Patient
+from stats.models import HospitalStats
+
+from .models import Bill
+
+# Statuses whose amount is still owed by the patient.
+OUTSTANDING_STATUSES = ('pending', 'overdue')
+
+
+def billing_summary(queryset=None):
+    """Return billing totals, counts and outstanding amounts per status.
+
+    Everything is computed by the database in a single aggregate query, so
+    the cost does not depend on how many bills have been issued.
+    """
+    if queryset is None:
+        queryset = Bill.objects.all()
+
+    aggregates = {
+        'total_count': Count('id'),
+        'total_amount': Sum('amount', default=Decimal('0')),
+    }
+    for status, _ in Bill.STATUS_CHOICES:
+        aggregates[f'{status}_count'] = Count('id', filter=Q(status=status))
+        aggregates[f'{status}_amount'] = Sum(
+            'amount', filter=Q(status=status), default=Decimal('0')
+        )
+    row = queryset.aggregate(**aggregates)
+
+    by_status = {
+        status: {
+            'label': label,
+            'count': row[f'{status}_count'],
+            'amount': row[f'{status}_amount'],
+        }
+        for status, label in Bill.STATUS_CHOICES
+    }
+    return {
+        'total_count': row['total_count'],
+        'total_amount': row['total_amount'],
+        'outstanding_amount': sum(
+            (by_status[status]['amount'] for status in OUTSTANDING_STATUSES),
+            Decimal('0'),
+        ),
+        'by_status': by_status,
+    }
+
+
+# Batch jobs below lock the rows they work on with SKIP LOCKED, so several
+# copies can run at once on PostgreSQL without waiting on each other; SQLite
+# runs one writing transaction at a time anyway. A run may read a row just
+# before another run commits its work on it, so the work is re-checked in a
+# new statement once the row is locked. Each batch commits on its own and the
+# work left is read back from the tables, so an interrupted run simply
+# continues where it stopped. Both jobs write with set-based queries, which
+# send no signals, so they apply the HospitalStats deltas and dashboard
+# invalidation themselves.
+
+
+def _invalidate_patient_dashboards(patient_ids):
+    user_ids = Patient.objects.filter(pk__in=patient_ids, user__isnull=False).values_list('user_id', flat=True)
+    scopes = [GLOBAL_SCOPE, *(user_scope(user_id) for user_id in user_ids)]
+    transaction.on_commit(lambda: invalidate(*scopes))
+
+
+def bill_completed_appointments(batch_size=1000, amount=None, due_days=None, after_id=0):
+    """Create pending bills for up to ``batch_size`` unbilled completed appointments.
+
+    Only appointments with an id above ``after_id`` are considered. Returns
+    ``(created, last_id)``; pass ``last_id`` back in to continue without
+    rescanning, and stop when ``created`` is 0.
+    """
+    amount = Decimal(amount if amount is not None else settings.BILLING_CONSULTATION_FEE)
+    due_days = settings.BILLING_DUE_DAYS if due_days is None else due_days
+    due_date = timezone.localdate() + timedelta(days=due_days)
+    with transaction.atomic():
+        locked = list(
+            Appointment.objects
+            .filter(status='completed', id__gt=after_id)
+            .filter(~Exists(Bill.objects.filter(appointment=OuterRef('pk'))))
+            .order_by('id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', 'patient_id', 'appointment_date')[:batch_size]
+        )
+        if not locked:
+            return 0, after_id
+        billed = _billed_appointment_ids([appointment_id for appointment_id, _, _ in locked])
+        bills = [
+            Bill(patient_id=patient_id, appointment_id=appointment_id, amount=amount,
+                 description=f'Consultation on {timezone.localtime(moment):%Y-%m-%d}',
+                 status='pending', due_date=due_date)
+            for appointment_id, patient_id, moment in locked
+            if appointment_id not in billed
+        ]
+        Bill.objects.bulk_create(bills)
+        created = len(bills)
+        HospitalStats.apply(bills=created, bills_pending=created,
+                            billed_total=created * amount, billed_pending=created * amount)
+        if bills:
+            _invalidate_patient_dashboards({bill.patient_id for bill in bills})
+    return created, locked[-1][0]
+
+
+def _billed_appointment_ids(appointment_ids):
+    """Return which of ``appointment_ids`` already have a bill.
+
+    Runs as its own statement after the appointments are locked, so on
+    PostgreSQL it sees bills another run committed after our first read.
+    """
+    return set(Bill.objects.filter(appointment_id__in=appointment_ids).values_list('appointment_id', flat=True))
+
+
+def mark_overdue_bills(batch_size=5000, today=None):
+    """Move up to ``batch_size`` pending bills due before ``today`` to overdue.
+
+    Returns the number of bills updated; 0 means none are left.
+    """
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        ids = list(
+            Bill.objects.filter(status='pending', due_date__lt=today)
+            .order_by('id').select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        bills = Bill.objects.filter(pk__in=ids, status='pending')
+        totals = bills.aggregate(amount=Sum('amount', default=Decimal('0')))
+        patient_ids = set(bills.values_list('patient_id', flat=True))
+        updated = bills.update(status='overdue', updated_at=timezone.now())
+        HospitalStats.apply(bills_pending=-updated, bills_overdue=updated,
+                            billed_pending=-totals['amount'], billed_overdue=totals['amount'])
+        _invalidate_patient_dashboards(patient_ids)
+    return updated
@@ -1,3 +1,220 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from appointments.models import Appointment
+from doctors.models import Doctor
+from patients.models import Patient
+from stats.models import HospitalStats
+
+from . import services
+from .models import Bill
+from .services import bill_completed_appointments, billing_summary, mark_overdue_bills
+
+User = get_user_model()
+
+
+class BillingSummaryTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+            address='', city='',
+        )
+        for amount, status in [('100.00', 'pending'), ('50.50', 'pending'),
+                               ('200.00', 'paid'), ('25.00', 'overdue')]:
+            Bill.objects.create(
+                patient=self.patient, amount=Decimal(amount), description='Visit',
+                status=status, due_date=date(2030, 1, 1),
+            )
+
+    def test_summary_uses_a_single_query(self):
+        with self.assertNumQueries(1):
+            summary = billing_summary()
+        self.assertEqual(summary['total_count'], 4)
+        self.assertEqual(summary['total_amount'], Decimal('375.50'))
+        self.assertEqual(summary['outstanding_amount'], Decimal('175.50'))
+        self.assertEqual(summary['by_status']['pending'],
+                         {'label': 'Pending', 'count': 2, 'amount': Decimal('150.50')})
+        self.assertEqual(summary['by_status']['paid']['count'], 1)
+
+    def test_summary_of_empty_table(self):
+        Bill.objects.all().delete()
+        summary = billing_summary()
+        self.assertEqual(summary['total_amount'], Decimal('0'))
+        self.assertEqual(summary['by_status']['overdue']['count'], 0)
+
+    def test_summary_endpoint_is_staff_only(self):
+        user = User.objects.create_user(username='clerk', password='secret123')
+        self.client.force_login(user)
+        response = self.client.get(reverse('admin_billing_summary'))
+        self.assertEqual(response.status_code, 302)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get(reverse('admin_billing_summary'))
+        self.assertEqual(response.json()['outstanding_amount'], '175.50')
+
+
+class BillApiTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='chairman', is_staff=True, role='admin')
+        self.patients = [
+            Patient.objects.create(
+                user=User.objects.create_user(username=f'pat{i}', role='patient'),
+                first_name=f'Pat{i}', last_name='Ient', email=f'pat{i}@example.com',
+                phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+                address='', city='',
+            )
+            for i in range(2)
+        ]
+
+    def add_bills(self, count, patient=None, status='pending'):
+        for i in range(count):
+            Bill.objects.create(
+                patient=patient or self.patients[i % 2], amount=Decimal('10.00'),
+                description='Visit', status=status, due_date=date(2030, 1, 1),
+            )
+
+    def list_bills(self, user, params=''):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api-bill-list') + params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()['results']
+
+    def test_query_count_is_constant_per_page(self):
+        self.add_bills(2)
+        small, rows = self.list_bills(self.admin)
+        self.add_bills(15)
+        large, more_rows = self.list_bills(self.admin)
+        self.assertEqual((len(rows), len(more_rows)), (2, 17))
+        self.assertEqual(small, large)
+        self.assertEqual(more_rows[0]['amount'], '10.00')
+
+    def test_patient_sees_only_own_bills_and_can_filter_by_status(self):
+        self.add_bills(3, patient=self.patients[0])
+        self.add_bills(1, patient=self.patients[0], status='paid')
+        self.add_bills(2, patient=self.patients[1])
+        _, rows = self.list_bills(self.patients[0].user)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row['patient']['id'] for row in rows}, {self.patients[0].id})
+        _, rows = self.list_bills(self.patients[0].user, '?status=paid')
+        self.assertEqual(len(rows), 1)
+
+    def test_doctor_sees_no_bills(self):
+        self.add_bills(2)
+        doctor = User.objects.create_user(username='doc', role='doctor')
+        _, rows = self.list_bills(doctor)
+        self.assertEqual(rows, [])
+
+
+@override_settings(BILLING_CONSULTATION_FEE='80.00', BILLING_DUE_DAYS=14)
+class BillingBatchJobTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+            address='', city='',
+        )
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create_user(username='doc'),
+            specialization='ENT', experience=5, phone='555',
+        )
+        HospitalStats.current()
+
+    def add_appointments(self, *statuses):
+        start = timezone.now() - timedelta(days=30)
+        return [
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor,
+                                       appointment_date=start + timedelta(hours=n),
+                                       reason='Checkup', status=status)
+            for n, status in enumerate(statuses)
+        ]
+
+    def add_bill(self, status, due_date, amount='10.00'):
+        return Bill.objects.create(patient=self.patient, amount=Decimal(amount), description='Visit',
+                                   status=status, due_date=due_date)
+
+    def assertStatsMatchTables(self):
+        _, drift = HospitalStats.rebuild()
+        self.assertEqual(drift, {})
+
+    def test_bills_each_completed_appointment_once(self):
+        done, _, _, billed = self.add_appointments('completed', 'scheduled', 'cancelled', 'completed')
+        Bill.objects.create(patient=self.patient, appointment=billed, amount=Decimal('5.00'),
+                            description='Visit', due_date=date(2030, 1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(bill_completed_appointments(), (1, done.pk))
+            self.assertEqual(bill_completed_appointments(), (0, 0))
+        bill = Bill.objects.get(appointment=done)
+        self.assertEqual((bill.amount, bill.status), (Decimal('80.00'), 'pending'))
+        self.assertEqual(bill.due_date, timezone.localdate() + timedelta(days=14))
+        self.assertStatsMatchTables()
+
+    def test_skips_appointments_billed_by_a_concurrent_run(self):
+        done, raced = self.add_appointments('completed', 'completed')
+        recheck = services._billed_appointment_ids
+
+        def race_then_recheck(appointment_ids):
+            # Another run commits a bill for `raced` after this one read it as unbilled.
+            Bill.objects.create(patient=self.patient, appointment=raced, amount=Decimal('5.00'),
+                                description='Visit', due_date=date(2030, 1, 1))
+            return recheck(appointment_ids)
+
+        with mock.patch.object(services, '_billed_appointment_ids', race_then_recheck), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(bill_completed_appointments(), (1, raced.pk))
+        self.assertEqual(Bill.objects.filter(appointment=raced).count(), 1)
+        self.assertEqual(Bill.objects.get(appointment=done).amount, Decimal('80.00'))
+        self.assertStatsMatchTables()
+
+    def test_generate_bills_command_runs_in_batches(self):
+        self.add_appointments(*['completed'] * 5)
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('generate_bills', batch_size=2, amount=Decimal('12.50'), stdout=out)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "billing_bill"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(Bill.objects.filter(amount=Decimal('12.50')).count(), 5)
+        self.assertIn('Created 5 bills', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertStatsMatchTables()
+
+    def test_marks_only_pending_bills_past_due(self):
+        today = date(2030, 1, 10)
+        late = [self.add_bill('pending', today - timedelta(days=n), amount='20.00') for n in (1, 2, 3)]
+        due_today = self.add_bill('pending', today)
+        paid = self.add_bill('paid', today - timedelta(days=5))
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(mark_overdue_bills(batch_size=2, today=today), 2)
+                self.assertEqual(mark_overdue_bills(batch_size=2, today=today), 1)
+                self.assertEqual(mark_overdue_bills(batch_size=2, today=today), 0)
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "billing_bill"')]
+        self.assertEqual(len(updates), 2)
+        statuses = dict(Bill.objects.values_list('pk', 'status'))
+        self.assertEqual({statuses[bill.pk] for bill in late}, {'overdue'})
+        self.assertEqual((statuses[due_today.pk], statuses[paid.pk]), ('pending', 'paid'))
+        stats = HospitalStats.current()
+        self.assertEqual((stats.bills_overdue, stats.billed_overdue), (3, Decimal('60.00')))
+        self.assertStatsMatchTables()
+
+    def test_mark_overdue_bills_command(self):
+        self.add_bill('pending', date(2030, 1, 1))
+        out = StringIO()
+        call_command('mark_overdue_bills', today=date(2030, 1, 2), stdout=out)
+        self.assertEqual(Bill.objects.get().status, 'overdue')
+        self.assertIn('Marked 1 bills overdue', out.getvalue())
@@ -1,3 +1,51 @@
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import redirect
 
-# Create your views here.
+from accounts.roles import resolve_role
+from hospital.api import ReadOnlyApiViewSet
+
+from .models import Bill
+from .serializers import BillSerializer
+from .services import billing_summary
+
+
+@login_required(login_url='admin_login')
+def billing_summary_view(request):
+    """Return the billing status breakdown as JSON (for admins)."""
+    if not request.user.is_staff:
+        return redirect('home')
+    summary = billing_summary()
+    return JsonResponse({
+        'total_count': summary['total_count'],
+        'total_amount': f"{summary['total_amount']:.2f}",
+        'outstanding_amount': f"{summary['outstanding_amount']:.2f}",
+        'by_status': {
+            status: {
+                'label': item['label'],
+                'count': item['count'],
+                'amount': f"{item['amount']:.2f}",
+            }
+            for status, item in summary['by_status'].items()
+        },
+    })
+
+
+class BillViewSet(ReadOnlyApiViewSet):
+    """Bills, newest first: all for staff, a patient's own otherwise. Filter with ``?status=``."""
+    serializer_class = BillSerializer
+    # Not issue_date: a whole day's bills would tie on the cursor position.
+    ordering = ('-id',)
+    related_fields = {'patient': ['patient']}
+
+    def get_base_queryset(self):
+        user = self.request.user
+        queryset = Bill.objects.all()
+        if not user.is_staff:
+            if resolve_role(user) != 'patient':
+                return queryset.none()
+            queryset = queryset.filter(patient__user=user)
+        status = self.request.query_params.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset
@@ -3,6 +3,31 @@ from django.conf import settings
 
 User = settings.AUTH_USER_MODEL
 
+# Auth columns no doctor page shows. Doctor querysets never load them.
+UNUSED_USER_FIELDS = ('password', 'last_login', 'is_superuser', 'is_staff', 'is_active', 'date_joined')
+# What doctor listings show: the profile and the user's names and email.
+LISTING_FIELDS = ('specialization', 'experience', 'phone',
+                  'user__username', 'user__first_name', 'user__last_name', 'user__email')
+
+
+class DoctorQuerySet(models.QuerySet):
+
+    def listing(self):
+        """Load only the columns listings show (``LISTING_FIELDS``)."""
+        return self.only(*LISTING_FIELDS)
+
+
+class DoctorManager(models.Manager.from_queryset(DoctorQuerySet)):
+    """Always joins the user, which every page showing a doctor reads from.
+
+    A listing that forgets ``select_related('user')`` would otherwise run a
+    query per doctor. Use ``select_related(None)`` to drop the join.
+    """
+
+    def get_queryset(self):
+        return (super().get_queryset().select_related('user')
+                .defer(*(f'user__{field}' for field in UNUSED_USER_FIELDS)))
+
 
 class Doctor(models.Model):
 
@@ -11,5 +36,7 @@ class Doctor(models.Model):
     experience = models.IntegerField()
     phone = models.CharField(max_length=15)
 
+    objects = DoctorManager()
+
     def __str__(self):
-        return self.user.username
\ No newline at end of file
+        return self.user.username
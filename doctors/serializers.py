@@ -0,0 +1,26 @@
+from rest_framework import serializers
+
+from hospital.api import DynamicFieldsModelSerializer
+
+from .models import Doctor
+
+
+class DoctorSerializer(DynamicFieldsModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    email = serializers.EmailField(source='user.email', read_only=True)
+
+    class Meta:
+        model = Doctor
+        fields = ['id', 'username', 'first_name', 'last_name', 'email',
+                  'specialization', 'experience', 'phone']
+
+
+class DoctorSummarySerializer(serializers.ModelSerializer):
+    """Doctor as nested in other resources."""
+    name = serializers.CharField(source='user.get_full_name', read_only=True)
+
+    class Meta:
+        model = Doctor
+        fields = ['id', 'name', 'specialization']
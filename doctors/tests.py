@@ -1,3 +1,112 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from appointments.models import Appointment
+from patients.models import Patient
+
+from .models import Doctor
+
+User = get_user_model()
+
+
+class DoctorApiTests(TestCase):
+
+    def setUp(self):
+        self.patient = User.objects.create_user(username='pat', role='patient')
+        self.client.force_login(self.patient)
+
+    def add_doctors(self, count):
+        start = Doctor.objects.count()
+        for n in range(start, start + count):
+            Doctor.objects.create(
+                user=User.objects.create_user(username=f'doc{n}', first_name=f'Doc{n}',
+                                              email=f'doc{n}@example.com', role='doctor'),
+                specialization='ENT', experience=5, phone='555',
+            )
+
+    def list_doctors(self, params=''):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api-doctor-list') + params)
+        self.assertEqual(response.status_code, 200)
+        return ctx.captured_queries, response.json()['results']
+
+    def test_query_count_is_constant_per_page(self):
+        self.add_doctors(2)
+        small, rows = self.list_doctors()
+        self.add_doctors(10)
+        large, more_rows = self.list_doctors()
+        self.assertEqual((len(rows), len(more_rows)), (2, 12))
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(rows[0]['email'], 'doc0@example.com')
+
+    def test_retrieve(self):
+        self.add_doctors(1)
+        doctor = Doctor.objects.get()
+        response = self.client.get(reverse('api-doctor-detail', args=[doctor.pk]))
+        self.assertEqual(response.json()['username'], 'doc0')
+
+    def test_fields_without_user_columns_skip_the_join(self):
+        self.add_doctors(1)
+        queries, rows = self.list_doctors('?fields=id,specialization')
+        self.assertEqual(rows[0]['specialization'], 'ENT')
+        [doctor_query] = [q['sql'] for q in queries if 'doctors_doctor' in q['sql']]
+        self.assertNotIn('JOIN', doctor_query)
+
+
+@override_settings(DASHBOARD_CACHE_TIMEOUT=0)
+class DoctorListingQueryTests(TestCase):
+    """Pages listing doctors run the same queries however many they list."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='chairman', is_staff=True, role='admin')
+        patient_user = User.objects.create_user(username='pat', role='patient')
+        self.patient = Patient.objects.create(
+            user=patient_user, first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F', address='', city='',
+        )
+
+    def add_doctors(self, count):
+        start = Doctor.objects.count()
+        for n in range(start, start + count):
+            doctor = Doctor.objects.create(
+                user=User.objects.create_user(username=f'doc{n}', first_name=f'Doc{n}', role='doctor'),
+                specialization='ENT', experience=5, phone='555',
+            )
+            Appointment.objects.create(patient=self.patient, doctor=doctor, reason='Checkup',
+                                       appointment_date=timezone.now() + timedelta(hours=n))
+
+    def queries(self, user, url):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_independent_of_doctor_count(self):
+        pages = [
+            (self.admin, reverse('admin_doctors_list')),
+            (self.admin, reverse('admin_dashboard')),
+            (self.admin, reverse('dashboard')),
+            (self.patient.user, reverse('patient_dashboard')),
+            (self.admin, reverse('api-doctor-list')),
+        ]
+        self.add_doctors(2)
+        small = [self.queries(user, url) for user, url in pages]
+        self.add_doctors(10)
+        large = [self.queries(user, url) for user, url in pages]
+        self.assertEqual(small, large)
+
+    def test_manager_joins_user_without_auth_columns(self):
+        self.add_doctors(1)
+        with self.assertNumQueries(1):
+            doctor = Doctor.objects.get()
+            self.assertEqual(str(doctor), 'doc0')
+        self.assertTrue({'password', 'last_login'} <= doctor.user.get_deferred_fields())
+        self.assertEqual(Doctor.objects.listing().get().user.get_deferred_fields() & {'email', 'username'},
+                         set())
@@ -1,3 +1,16 @@
-from django.shortcuts import render
+from hospital.api import ReadOnlyApiViewSet
 
-# Create your views here.
+from .models import Doctor
+from .serializers import DoctorSerializer
+
+
+class DoctorViewSet(ReadOnlyApiViewSet):
+    """Doctor roster, visible to every signed-in user."""
+    serializer_class = DoctorSerializer
+    ordering = ('id',)
+    related_fields = {field: ['user'] for field in ('username', 'first_name', 'last_name', 'email')}
+
+    def get_base_queryset(self):
+        # Drop the manager's user join; get_queryset() adds it back when a
+        # requested field needs it.
+        return Doctor.objects.select_related(None)
@@ -0,0 +1,81 @@
+"""Shared building blocks for the read-only JSON API under ``/api/``.
+
+Each app's ``views.py`` defines its viewset on top of ``ReadOnlyApiViewSet``,
+which adds cursor pagination, ``?fields=`` selection and ETag conditional
+responses. ``hospital.urls`` registers the viewsets on one router.
+"""
+from django.conf import settings
+from django.utils.cache import get_conditional_response, set_response_etag
+from rest_framework import serializers, viewsets
+from rest_framework.pagination import CursorPagination
+
+
+def requested_fields(request):
+    """Return the set of names in ``?fields=``, or None when not given."""
+    raw = request.query_params.get('fields') if request is not None else None
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """Model serializer that keeps only the fields named in ``?fields=``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class ApiCursorPagination(CursorPagination):
+    page_size = getattr(settings, 'LIST_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'LIST_MAX_PAGE_SIZE', 500)
+
+
+class ReadOnlyApiViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only viewset with cursor pagination, ``?fields=`` and ETags.
+
+    DRF's cursor holds the position of the first ``ordering`` field only,
+    and walks rows that tie on it with an OFFSET. So that first field should
+    be unique or nearly so, e.g. ``-id`` or ``-created_at``.
+    ``related_fields`` maps a serializer field to the relations it reads;
+    only the relations of the requested fields are joined in. Set
+    ``queryset``, or override ``get_base_queryset()`` to scope it per user.
+    """
+    pagination_class = ApiCursorPagination
+    ordering = ('-id',)
+    related_fields = {}
+
+    def get_base_queryset(self):
+        return super().get_queryset()
+
+    def get_queryset(self):
+        queryset = self.get_base_queryset()
+        fields = requested_fields(self.request)
+        related = set()
+        for field, lookups in self.related_fields.items():
+            if fields is None or field in fields:
+                related.update(lookups)
+        if related:
+            queryset = queryset.select_related(*sorted(related))
+        return queryset
+
+    @property
+    def paginator(self):
+        paginator = super().paginator
+        if paginator is not None:
+            paginator.ordering = self.ordering
+        return paginator
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and response.status_code == 200:
+            # The tag is a hash of the body, so an unchanged page still costs
+            # its queries but not the transfer.
+            response.render()
+            set_response_etag(response)
+            return get_conditional_response(request, etag=response.headers['ETag'], response=response)
+        return response
@@ -3,6 +3,14 @@ ASGI config for hospital project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served this way (e.g. ``uvicorn hospital.asgi:application``) the login views
+run natively async and verify passwords in the bounded thread pool from
+``accounts.auth``, sized by AUTH_HASH_WORKERS, instead of pinning a worker
+for the length of each hash. The dashboards are routed to their async
+variants through ``hospital.asgi_urls``, which also serves the doctor
+dashboard's live appointment stream (Server-Sent Events, see
+``appointments.live``) at ``doctor-dashboard/stream/``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -12,5 +20,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital.settings')
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'hospital.asgi_urls')
 
 application = get_asgi_application()
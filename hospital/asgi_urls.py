@@ -0,0 +1,29 @@
+"""URLconf for ASGI deployments.
+
+Same routes as ``hospital.urls``, with the dashboards served by their
+async variants from ``accounts.async_views``, plus the doctor dashboard's
+live appointment stream. ``hospital.asgi`` selects it.
+"""
+from django.urls import path
+
+from accounts import async_views
+from appointments.views import appointment_stream_view
+
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    'patient_dashboard': async_views.patient_dashboard_view,
+    'doctor_dashboard': async_views.doctor_dashboard_view,
+    'admin_dashboard': async_views.admin_dashboard_view,
+    'dashboard': async_views.dashboard_view,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if getattr(pattern, 'name', None) in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+] + [
+    # Long-lived streams would each hold a thread under WSGI, so this route
+    # exists only here.
+    path('doctor-dashboard/stream/', appointment_stream_view, name='doctor_appointment_stream'),
+]
@@ -0,0 +1,206 @@
+"""Per-view query count and latency instrumentation.
+
+``InstrumentationMiddleware`` counts the SQL queries and DB time of every
+request, along with template render time (reported by
+``hospital.template_backends``) and total latency. Samples are kept in a
+rolling per-view window for the staff metrics endpoint, exposed as
+response headers when DEBUG is on, and logged when a view goes over its
+query or latency budget.
+"""
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+import whitenoise.middleware
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+logger = logging.getLogger('hospital.performance')
+
+_current = ContextVar('request_metrics', default=None)
+
+_windows = {}
+_windows_lock = threading.Lock()
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Used as a connection.execute_wrapper().
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+
+def _count_queries(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+@receiver(request_started, dispatch_uid='hospital.middleware.instrument_connections')
+def instrument_connections(**kwargs):
+    """Count queries on this thread's connections for whichever request is current.
+
+    Under ASGI the async ORM runs queries on the request's thread-sensitive
+    executor rather than the event loop; Django sends request_started to
+    sync receivers on that same thread, so the wrapper lands where the
+    queries actually run.
+    """
+    for connection in connections.all():
+        if _count_queries not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_count_queries)
+
+
+def record_template_time(seconds):
+    """Add template render time to the request being measured, if any."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.template_time += seconds
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def metrics_snapshot():
+    """Return per-view summaries of the rolling sample window in this process."""
+    with _windows_lock:
+        windows = {name: list(samples) for name, samples in _windows.items()}
+
+    snapshot = {}
+    for name, samples in sorted(windows.items()):
+        latencies = sorted(sample[0] for sample in samples)
+        queries = [sample[1] for sample in samples]
+        snapshot[name] = {
+            'samples': len(samples),
+            'latency_ms': {
+                'p50': round(_percentile(latencies, 0.50), 2),
+                'p95': round(_percentile(latencies, 0.95), 2),
+                'p99': round(_percentile(latencies, 0.99), 2),
+                'max': round(latencies[-1], 2),
+            },
+            'queries': {'mean': round(statistics.fmean(queries), 2), 'max': max(queries)},
+            'db_ms_mean': round(statistics.fmean(sample[2] for sample in samples), 2),
+            'template_ms_mean': round(statistics.fmean(sample[3] for sample in samples), 2),
+        }
+    return snapshot
+
+
+def _record(view_name, total_ms, metrics):
+    window_size = getattr(settings, 'METRICS_WINDOW_SIZE', 1000)
+    sample = (total_ms, metrics.queries, metrics.db_time * 1000, metrics.template_time * 1000)
+    with _windows_lock:
+        window = _windows.get(view_name)
+        if window is None:
+            window = _windows[view_name] = deque(maxlen=window_size)
+        window.append(sample)
+
+
+def _budget(view_name):
+    budget = {
+        'queries': getattr(settings, 'VIEW_QUERY_BUDGET', 30),
+        'latency_ms': getattr(settings, 'VIEW_LATENCY_BUDGET_MS', 500),
+    }
+    budget.update(getattr(settings, 'VIEW_BUDGETS', {}).get(view_name, {}))
+    return budget
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def finish(self, request, response, metrics, started):
+        total_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        # Unresolved paths share one bucket so 404 probes can't grow the table.
+        view_name = match.view_name if match else '<unresolved>'
+        _record(view_name, total_ms, metrics)
+
+        budget = _budget(view_name)
+        if metrics.queries > budget['queries'] or total_ms > budget['latency_ms']:
+            logger.warning(
+                "%s exceeded its budget: %d queries (budget %d), %.1f ms (budget %d ms)",
+                view_name, metrics.queries, budget['queries'], total_ms, budget['latency_ms'],
+            )
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(metrics.queries)
+            response['Server-Timing'] = (
+                f"db;dur={metrics.db_time * 1000:.1f}, "
+                f"tpl;dur={metrics.template_time * 1000:.1f}, "
+                f"total;dur={total_ms:.1f}"
+            )
+        return response
+
+
+class WhiteNoiseMiddleware(whitenoise.middleware.WhiteNoiseMiddleware):
+    """WhiteNoise middleware that can also run in an async middleware chain.
+
+    Upstream WhiteNoise is sync-only; in an ASGI deployment that would force
+    every request through a thread, pinning it while async views await.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -37,40 +37,78 @@ INSTALLED_APPS = [
     'patients',
     'appointments',
     'billing',
+    'stats',
 ]
 
 
 # MIDDLEWARE
 
 MIDDLEWARE = [
+    # Outermost, so every query and the full latency of a request is counted.
+    'hospital.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     # WhiteNoise middleware allows Django to serve its own static files in
-    # production. It should come right after SecurityMiddleware.
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # production. It should come right after SecurityMiddleware. This
+    # subclass also runs natively under ASGI.
+    'hospital.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.roles.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 
-ROOT_URLCONF = 'hospital.urls'
+# hospital.asgi switches this to hospital.asgi_urls (async dashboards).
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'hospital.urls')
+
+
+# INSTRUMENTATION
+
+# Budgets checked by hospital.middleware.InstrumentationMiddleware; a request
+# over either one logs a warning on the 'hospital.performance' logger.
+VIEW_QUERY_BUDGET = int(os.environ.get('VIEW_QUERY_BUDGET', 30))
+VIEW_LATENCY_BUDGET_MS = int(os.environ.get('VIEW_LATENCY_BUDGET_MS', 500))
+# Per-view overrides, keyed by URL name.
+VIEW_BUDGETS = {
+    'admin_dashboard': {'queries': 15},
+    'dashboard': {'queries': 15},
+    'doctor_dashboard': {'queries': 15},
+    'patient_dashboard': {'queries': 15},
+    # An Argon2 check (plus a rehash when the stored hash is upgraded) takes
+    # most of the default budget on its own.
+    'admin_login': {'latency_ms': 1500},
+    'doctor_login': {'latency_ms': 1500},
+    'patient_login': {'latency_ms': 1500},
+}
+# Samples kept per view for the rolling latency histogram.
+METRICS_WINDOW_SIZE = int(os.environ.get('METRICS_WINDOW_SIZE', 1000))
 
 
 # TEMPLATES
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, plus render timing for the instrumentation middleware.
+        'BACKEND': 'hospital.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templets'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Each template is read and compiled once per process, then
+            # rendered from memory. The dev server's autoreloader clears the
+            # cache when a template changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.role',
             ],
         },
     },
@@ -89,6 +127,70 @@ DATABASES = {
         conn_health_checks=True,
     )
 }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Take the write lock when a transaction starts, so concurrent writers
+    # (e.g. appointment bookings) wait their turn instead of failing with
+    # "database is locked" when a read lock can't be upgraded.
+    DATABASES['default'].setdefault('OPTIONS', {}).update(transaction_mode='IMMEDIATE', timeout=20)
+    # Tests run against a file rather than Django's default in-memory
+    # database, which fails concurrent writers instead of making them wait
+    # and so can't run the concurrent booking test.
+    DATABASES['default'].setdefault('TEST', {}).setdefault('NAME', str(BASE_DIR / 'test_db.sqlite3'))
+
+
+# CACHES
+
+# Rendered dashboards are cached per user (see accounts.dashboard_cache).
+# DASHBOARD_CACHE selects a backend that needs no extra service:
+# 'locmem' (per process), 'file' or 'db' (shared between workers; run
+# `python manage.py createcachetable` for 'db').
+DASHBOARD_CACHE = os.environ.get('DASHBOARD_CACHE', 'locmem')
+DASHBOARD_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboards',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DASHBOARD_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'dashboards')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'dashboard_cache',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboards': DASHBOARD_CACHE_BACKENDS[DASHBOARD_CACHE],
+}
+
+# Seconds a rendered dashboard may be served from cache; 0 disables caching.
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 300))
+
+
+# PASSWORD HASHING
+
+# Argon2 (argon2-cffi is in requirements.txt) with tunable costs; benchmark
+# candidates with `python manage.py benchmark_password_hashing`. Stored
+# hashes made with other parameters or the older hashers below are
+# upgraded transparently on the user's next login.
+PASSWORD_HASHERS = [
+    'accounts.hashers.TunableArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 102400))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 8))
+
+# Threads the async login views use for password verification.
+AUTH_HASH_WORKERS = int(os.environ.get('AUTH_HASH_WORKERS', os.cpu_count() or 4))
 
 
 # PASSWORD VALIDATION
@@ -124,10 +226,78 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-# During development the default storage is fine, but in production we
-# want compressed, cache‑friendly files. WhiteNoise provides a storage class
-# that creates a manifest and serves compressed versions.
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Page stylesheets and scripts, linked from the templates with {% static %}.
+STATICFILES_DIRS = [BASE_DIR / 'static']
+# In production collectstatic writes fingerprinted, pre-compressed copies
+# (e.g. css/home.3f2a9c1b.css) and WhiteNoise serves them with far-future
+# cache headers, so browsers fetch each asset once per deploy. DEBUG keeps
+# plain names so no collectstatic is needed while developing or testing.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# LIST PAGES
+
+# Rows per page on the admin doctor/patient lists; ``?page_size=`` may
+# override it up to LIST_MAX_PAGE_SIZE.
+LIST_PAGE_SIZE = int(os.environ.get('LIST_PAGE_SIZE', 50))
+LIST_MAX_PAGE_SIZE = int(os.environ.get('LIST_MAX_PAGE_SIZE', 500))
+# Ranked matches fetched for a patient search before ?city= / ?gender= are
+# applied; the list shows the first page of what remains.
+PATIENT_SEARCH_MAX_RESULTS = int(os.environ.get('PATIENT_SEARCH_MAX_RESULTS', 500))
+# Matches of a search that get ranked (newest first); broader queries rank
+# only these. See patients.search.
+PATIENT_SEARCH_RANK_CANDIDATES = int(os.environ.get('PATIENT_SEARCH_RANK_CANDIDATES', 2000))
+
+
+# APPOINTMENTS
+
+# Length of every appointment slot.
+APPOINTMENT_SLOT_MINUTES = int(os.environ.get('APPOINTMENT_SLOT_MINUTES', 30))
+# Weekday (0 = Monday) -> [(start, end)] for doctors without WorkingHours rows.
+DEFAULT_WORKING_HOURS = {weekday: [('09:00', '17:00')] for weekday in range(5)}
+# How far ahead the availability index looks for free slots, and how often
+# (seconds) each process rebuilds it to pick up other processes' bookings.
+AVAILABILITY_HORIZON_DAYS = int(os.environ.get('AVAILABILITY_HORIZON_DAYS', 90))
+AVAILABILITY_INDEX_TTL = int(os.environ.get('AVAILABILITY_INDEX_TTL', 300))
+# Most bookings accepted in one request to /api/bookings/.
+BOOKING_MAX_BATCH = int(os.environ.get('BOOKING_MAX_BATCH', 500))
+# Live appointment streams for the doctor dashboard (ASGI only; see
+# appointments.live): open streams per process, events buffered per stream
+# before it is told to resync, and seconds between keepalives. Set
+# APPOINTMENT_STREAM_POLL_SECONDS when running several workers so streams
+# also see writes made by other processes; 0 relies on signals alone.
+APPOINTMENT_STREAM_MAX_CONNECTIONS = int(os.environ.get('APPOINTMENT_STREAM_MAX_CONNECTIONS', 1000))
+APPOINTMENT_STREAM_QUEUE_SIZE = int(os.environ.get('APPOINTMENT_STREAM_QUEUE_SIZE', 100))
+APPOINTMENT_STREAM_HEARTBEAT_SECONDS = float(os.environ.get('APPOINTMENT_STREAM_HEARTBEAT_SECONDS', 15))
+APPOINTMENT_STREAM_POLL_SECONDS = float(os.environ.get('APPOINTMENT_STREAM_POLL_SECONDS', 0))
+
+
+# BILLING
+
+# Amount and payment terms of the bills generate_bills creates for
+# completed appointments.
+BILLING_CONSULTATION_FEE = os.environ.get('BILLING_CONSULTATION_FEE', '100.00')
+BILLING_DUE_DAYS = int(os.environ.get('BILLING_DUE_DAYS', 30))
+
+
+# REST API
+
+# Read-only JSON API under /api/ (see hospital.api). It pages with cursors
+# using the LIST_* sizes above. Session auth only: HTTP Basic would run a
+# full argon2 hash on every request.
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+}
 
 
 # DEFAULT PRIMARY KEY
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
 from accounts.views import (
     home_view, 
     patient_login_view,
@@ -14,13 +15,34 @@ from accounts.views import (
     logout_view,
     doctors_list_view,
     patients_list_view,
+    dashboard_cache_stats_view,
+    performance_metrics_view,
+    export_history_view,
 )
+from appointments.views import AppointmentViewSet, AvailabilityView, BookingView
+from billing.views import BillViewSet, billing_summary_view
+from doctors.views import DoctorViewSet
+from patients.views import PatientViewSet
+
+# Read-only JSON API for mobile clients.
+api_router = DefaultRouter()
+api_router.register('appointments', AppointmentViewSet, basename='api-appointment')
+api_router.register('bills', BillViewSet, basename='api-bill')
+api_router.register('doctors', DoctorViewSet, basename='api-doctor')
+api_router.register('patients', PatientViewSet, basename='api-patient')
 
 urlpatterns = [
     # custom admin list pages must appear before default admin route
     path('admin/doctors/', doctors_list_view, name='admin_doctors_list'),
     path('admin/patients/', patients_list_view, name='admin_patients_list'),
+    path('admin/billing/summary/', billing_summary_view, name='admin_billing_summary'),
+    path('admin/dashboard-cache/', dashboard_cache_stats_view, name='admin_dashboard_cache'),
+    path('admin/metrics/', performance_metrics_view, name='admin_metrics'),
+    path('admin/export/<str:dataset>/', export_history_view, name='admin_export'),
     path('admin/', admin.site.urls),
+    path('api/availability/', AvailabilityView.as_view(), name='api-availability'),
+    path('api/bookings/', BookingView.as_view(), name='api-bookings'),
+    path('api/', include(api_router.urls)),
     path('', home_view, name='home'),
     path('patient-login/', patient_login_view, name='patient_login'),
     path('patient-register/', patient_register_view, name='patient_register'),
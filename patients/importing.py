@@ -0,0 +1,173 @@
+"""Validate and insert patient records from a CSV file in chunks.
+
+``validate_chunk`` is pure Python and never touches the database, so the
+``import_patients`` command can run it in worker processes. ``import_chunk``
+then dedupes the valid rows against the database with one lookup per chunk
+and inserts them with ``bulk_create`` in a single transaction.
+"""
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from accounts.dashboard_cache import GLOBAL_SCOPE, PATIENTS_SCOPE, invalidate
+from stats.models import HospitalStats
+
+from .models import Patient
+from .search import get_search_backend
+
+REQUIRED_COLUMNS = ('first_name', 'last_name', 'email', 'phone', 'date_of_birth', 'gender')
+OPTIONAL_COLUMNS = ('address', 'city', 'medical_history', 'allergies', 'username')
+GENDERS = {'m': 'M', 'male': 'M', 'f': 'F', 'female': 'F', 'o': 'O', 'other': 'O'}
+MAX_LENGTHS = {
+    field.name: field.max_length
+    for field in Patient._meta.get_fields()
+    # gender is checked against GENDERS, which accepts 'female' for 'F'.
+    if getattr(field, 'max_length', None) and field.name != 'gender'
+}
+MAX_LENGTHS['username'] = get_user_model()._meta.get_field('username').max_length
+
+
+def missing_columns(header):
+    return [column for column in REQUIRED_COLUMNS if column not in (header or ())]
+
+
+def validate_row(row, today=None):
+    """Return ``(cleaned, None)`` for a valid CSV row, else ``(None, error)``.
+
+    ``cleaned`` maps Patient field names (plus ``username``) to values.
+    Emails are lower-cased so duplicates are found regardless of case.
+    """
+    today = today or date.today()
+    values = {column: (row.get(column) or '').strip() for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+
+    empty = [column for column in REQUIRED_COLUMNS if not values[column]]
+    if empty:
+        return None, f"Missing {', '.join(empty)}."
+    too_long = [column for column, value in values.items() if len(value) > MAX_LENGTHS.get(column, len(value))]
+    if too_long:
+        return None, f"Too long: {', '.join(too_long)}."
+
+    values['email'] = values['email'].lower()
+    try:
+        validate_email(values['email'])
+    except ValidationError:
+        return None, f"Invalid email {values['email']!r}."
+
+    try:
+        values['date_of_birth'] = date.fromisoformat(values['date_of_birth'])
+    except ValueError:
+        return None, f"Invalid date_of_birth {values['date_of_birth']!r}; use YYYY-MM-DD."
+    if not date(1900, 1, 1) <= values['date_of_birth'] <= today:
+        return None, f"date_of_birth {values['date_of_birth']} is out of range."
+
+    gender = GENDERS.get(values['gender'].lower())
+    if gender is None:
+        return None, f"Invalid gender {values['gender']!r}; use M, F or O."
+    values['gender'] = gender
+
+    for column in ('medical_history', 'allergies'):
+        values[column] = values[column] or None
+    return values, None
+
+
+def validate_chunk(rows):
+    """Validate ``[(line, row), ...]``; return ``(valid, rejects)``.
+
+    ``valid`` is ``[(line, cleaned), ...]`` and ``rejects`` is
+    ``[(line, error), ...]``, both in input order.
+    """
+    today = date.today()
+    valid, rejects = [], []
+    for line, row in rows:
+        cleaned, error = validate_row(row, today)
+        if error:
+            rejects.append((line, error))
+        else:
+            valid.append((line, cleaned))
+    return valid, rejects
+
+
+def import_chunk(valid, seen_emails, create_users=False):
+    """Insert the validated rows that aren't duplicates; return ``(created, rejects)``.
+
+    Rows whose email is already in ``seen_emails`` (earlier in the file) or
+    on a patient in the database are rejected, as are rows whose username
+    or email is already taken by a user when ``create_users`` is set, or
+    is taken by someone else before the rows are inserted.
+    ``seen_emails`` is updated with every email accepted. ``rejects`` is
+    ``[(line, error), ...]`` like ``validate_chunk``'s.
+    """
+    User = get_user_model()
+    emails = {cleaned['email'] for _, cleaned in valid}
+    existing = set(Patient.objects.annotate(email_lower=Lower('email'))
+                   .filter(email_lower__in=emails).values_list('email_lower', flat=True))
+    taken_usernames, taken_user_emails = set(), set()
+    if create_users:
+        usernames = {cleaned['username'] for _, cleaned in valid if cleaned['username']}
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        taken_user_emails = set(User.objects.annotate(email_lower=Lower('email'))
+                                .filter(email_lower__in=emails).values_list('email_lower', flat=True))
+
+    accepted, rejects, usernames = [], [], set()
+    for line, cleaned in valid:
+        email, username = cleaned['email'], cleaned['username']
+        if email in seen_emails:
+            rejects.append((line, 'Duplicate email in this file.'))
+        elif email in existing:
+            rejects.append((line, 'A patient with this email already exists.'))
+        elif create_users and username and (username in taken_usernames or username in usernames):
+            rejects.append((line, f'Username {username!r} is taken.'))
+        elif create_users and username and email in taken_user_emails:
+            rejects.append((line, 'A user with this email already exists.'))
+        else:
+            seen_emails.add(email)
+            usernames.add(username)
+            accepted.append((line, cleaned))
+
+    if not accepted:
+        return 0, rejects
+    try:
+        created = _insert([cleaned for _, cleaned in accepted], create_users)
+    except IntegrityError:
+        # Someone registered one of these usernames or emails after the
+        # lookup above; insert row by row so only the clashing rows are rejected.
+        created = 0
+        for line, cleaned in accepted:
+            try:
+                created += _insert([cleaned], create_users)
+            except IntegrityError:
+                rejects.append((line, 'Username or email was taken during the import.'))
+    return created, rejects
+
+
+def _insert(accepted, create_users):
+    """Insert the cleaned rows in one transaction; return how many patients were created."""
+    User = get_user_model()
+    with transaction.atomic():
+        user_ids = {}
+        if create_users:
+            users = User.objects.bulk_create([
+                # Imported accounts get no usable password; patients set one
+                # through a password reset.
+                User(username=cleaned['username'], email=cleaned['email'], role='patient',
+                     first_name=cleaned['first_name'], last_name=cleaned['last_name'],
+                     password=make_password(None))
+                for cleaned in accepted if cleaned['username']
+            ])
+            user_ids = {user.username: user.pk for user in users}
+        patients = Patient.objects.bulk_create([
+            Patient(user_id=user_ids.get(cleaned['username']),
+                    **{field: value for field, value in cleaned.items() if field != 'username'})
+            for cleaned in accepted
+        ])
+        # bulk_create sends no signals: keep the search index, stats row and
+        # dashboards current here.
+        get_search_backend().reindex([patient.pk for patient in patients])
+        HospitalStats.apply(patients=len(patients))
+        transaction.on_commit(lambda: invalidate(GLOBAL_SCOPE, PATIENTS_SCOPE))
+    return len(patients)
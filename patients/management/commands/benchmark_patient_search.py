@@ -0,0 +1,118 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from datetime import date, timedelta
+import random
+import statistics
+import time
+
+from patients.models import Patient
+from patients.search import BasicSearchBackend, get_search_backend
+
+SYLLABLES = ['an', 'bel', 'car', 'da', 'el', 'fin', 'gar', 'han', 'is', 'jo', 'ka', 'li',
+             'mar', 'no', 'or', 'pe', 'quin', 'ros', 'sa', 'tor', 'ul', 'vi', 'wen', 'yor', 'zel']
+CONDITIONS = ['asthma', 'diabetes', 'hypertension', 'migraine', 'arthritis', 'eczema',
+              'anemia', 'bronchitis', 'gastritis', 'insomnia', 'scoliosis', 'tinnitus']
+ALLERGENS = ['penicillin', 'peanuts', 'latex', 'pollen', 'shellfish', 'aspirin']
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic patients (default: up to 1,000,000) and time patient '
+        'search on the configured database against a 50 ms target. Run it '
+        'against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=1_000_000,
+                            help='Patients to have in the database (default: 1,000,000).')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--queries', type=int, default=50,
+                            help='Queries per kind; median, p95 and max are reported.')
+        parser.add_argument('--limit', type=int, default=20, help='Results per query.')
+        parser.add_argument('--target-ms', type=float, default=50.0)
+        parser.add_argument('--baseline', action='store_true',
+                            help='Also time the icontains fallback (slow at this size).')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        first_names, last_names, cities = self.vocabulary(rng)
+        backend = get_search_backend()
+        self.stdout.write(f"Database vendor: {connection.vendor}, backend: {type(backend).__name__}")
+
+        missing = options['patients'] - Patient.objects.count()
+        if missing > 0:
+            self.seed(rng, missing, options['batch_size'], backend, first_names, last_names, cities)
+        self.stdout.write(f"Rows: {Patient.objects.count():,} patients")
+
+        kinds = {
+            'last name': lambda: rng.choice(last_names),
+            'name prefixes': lambda: f'{rng.choice(first_names)[:2]} {rng.choice(last_names)[:3]}',
+            'full name': lambda: f'{rng.choice(first_names)} {rng.choice(last_names)}',
+            'email prefix': lambda: f'{rng.choice(first_names)}.{rng.choice(last_names)[:2]}',
+            'city + condition': lambda: f'{rng.choice(cities)} {rng.choice(CONDITIONS)[:4]}',
+            'phone': lambda: f'555{rng.randrange(10000):04d}',
+        }
+        queries = {kind: [make() for _ in range(options['queries'])] for kind, make in kinds.items()}
+
+        self.stdout.write(f"\n== {type(backend).__name__} (ms, limit {options['limit']})")
+        slowest = self.report(backend, queries, options['limit'])
+        if options['baseline']:
+            self.stdout.write(f"\n== BasicSearchBackend (icontains, ms, limit {options['limit']})")
+            self.report(BasicSearchBackend(), {kind: values[:5] for kind, values in queries.items()},
+                        options['limit'])
+
+        verdict = 'within' if slowest <= options['target_ms'] else 'OVER'
+        style = self.style.SUCCESS if slowest <= options['target_ms'] else self.style.WARNING
+        self.stdout.write(style(
+            f"\nSlowest p95: {slowest:.2f} ms, {verdict} the {options['target_ms']:.0f} ms target"
+        ))
+
+    def vocabulary(self, rng):
+        def word(parts):
+            return ''.join(rng.choice(SYLLABLES) for _ in range(parts))
+
+        first_names = sorted({word(2) for _ in range(400)})
+        last_names = sorted({word(3) for _ in range(5000)})
+        cities = sorted({word(2) + 'ville' for _ in range(200)})
+        return first_names, last_names, cities
+
+    def seed(self, rng, count, batch_size, backend, first_names, last_names, cities):
+        self.stdout.write(f"Seeding {count:,} patients...")
+        started = time.perf_counter()
+        offset = Patient.objects.count()
+        for start in range(0, count, batch_size):
+            batch = []
+            for i in range(offset + start, offset + min(start + batch_size, count)):
+                first, last = rng.choice(first_names), rng.choice(last_names)
+                batch.append(Patient(
+                    first_name=first.title(), last_name=last.title(),
+                    email=f'{first}.{last}{i}@example.com', phone=f'555{rng.randrange(10_000_000):07d}',
+                    date_of_birth=date(1940, 1, 1) + timedelta(days=rng.randrange(30_000)),
+                    gender=rng.choice('MFO'), address='', city=rng.choice(cities).title(),
+                    medical_history=' '.join(rng.sample(CONDITIONS, rng.randint(0, 3))) or None,
+                    allergies=rng.choice(ALLERGENS) if rng.random() < 0.2 else None,
+                ))
+            with transaction.atomic():
+                created = Patient.objects.bulk_create(batch, batch_size=batch_size)
+                backend.reindex([patient.pk for patient in created])
+        self.stdout.write(f"  seeded and indexed in {time.perf_counter() - started:.1f}s")
+
+    def report(self, backend, queries, limit):
+        """Print timings per kind of query and return the slowest p95."""
+        self.stdout.write(f"  {'query':<18} {'median':>8} {'p95':>8} {'max':>8} {'hits':>6}")
+        slowest = 0.0
+        for kind, values in queries.items():
+            timings, hits = [], 0
+            for value in values:
+                started = time.perf_counter()
+                hits += len(backend.search(value, limit))
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            slowest = max(slowest, p95)
+            self.stdout.write(
+                f"  {kind:<18} {statistics.median(timings):>8.2f} {p95:>8.2f} "
+                f"{timings[-1]:>8.2f} {hits / len(values):>6.1f}"
+            )
+        return slowest
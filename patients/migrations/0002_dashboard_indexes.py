@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_at', 'id'], name='patient_created_idx'),
+        ),
+    ]
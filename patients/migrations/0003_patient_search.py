@@ -0,0 +1,66 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:00
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# Frozen copies of patients.search as of this migration; later changes to
+# that module must not change what this migration does.
+GIN_INDEX_NAME = 'patient_search_gin'
+FTS_TABLE = 'patients_patient_search'
+SEARCH_FIELDS = ('first_name', 'last_name', 'email', 'phone', 'city', 'medical_history', 'allergies')
+
+
+def search_vector():
+    return (
+        SearchVector('first_name', 'last_name', weight='A', config='simple')
+        + SearchVector('email', 'phone', weight='B', config='simple')
+        + SearchVector('city', weight='C', config='simple')
+        + SearchVector('medical_history', 'allergies', weight='D', config='simple')
+    )
+
+
+def sqlite_has_fts5(cursor):
+    cursor.execute('PRAGMA compile_options')
+    return any(option == 'ENABLE_FTS5' for option, in cursor.fetchall())
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        Patient = apps.get_model('patients', 'Patient')
+        schema_editor.add_index(Patient, GinIndex(search_vector(), name=GIN_INDEX_NAME))
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            if not sqlite_has_fts5(cursor):
+                return
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"{', '.join(SEARCH_FIELDS)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            values = ', '.join(f"COALESCE({field}, '')" for field in SEARCH_FIELDS)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(SEARCH_FIELDS)}) "
+                f"SELECT id, {values} FROM patients_patient"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        Patient = apps.get_model('patients', 'Patient')
+        schema_editor.remove_index(Patient, GinIndex(search_vector(), name=GIN_INDEX_NAME))
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0002_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,6 +1,17 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
+# What patient listings show. The address and clinical notes are only read
+# on a patient's own pages and in the API.
+LISTING_FIELDS = ('first_name', 'last_name', 'email', 'phone', 'gender', 'city', 'created_at')
+
+
+class PatientQuerySet(models.QuerySet):
+
+    def listing(self):
+        """Load only the columns listings show (``LISTING_FIELDS``)."""
+        return self.only(*LISTING_FIELDS)
+
 
 class Patient(models.Model):
     GENDER_CHOICES = [
@@ -23,8 +34,20 @@ class Patient(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PatientQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # Keep the search index update made by the post_save handler in the
+        # same transaction as this write.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Default ordering for patient listings.
+            models.Index(fields=['created_at', 'id'], name='patient_created_idx'),
+        ]
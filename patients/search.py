@@ -0,0 +1,197 @@
+"""Full-text search over patients' names, contact details and medical notes.
+
+One backend is picked per database vendor:
+- PostgreSQL matches a ``SearchVector`` over the fields against a prefix
+  ``tsquery``. A GIN expression index on the same vector (migration 0003)
+  keeps this fast, and PostgreSQL maintains that index itself.
+- SQLite uses an FTS5 table, ``patients_patient_search``, keyed by patient
+  id. ``patients.signals`` keeps it in sync with saves and deletes. Code
+  that writes patients with bulk_create must call ``reindex()`` itself.
+- Other databases, or SQLite builds without FTS5, fall back to
+  ``icontains`` filters with no ranking.
+
+Every word of the query must match the start of a word in some field, so
+``jo smi`` finds John Smith. Results are ranked, with names weighted above
+contact details and contact details above medical notes. Ranking every
+match of a broad query such as ``a`` would take far longer than finding
+them, so only the newest PATIENT_SEARCH_RANK_CANDIDATES matches are ranked.
+"""
+import re
+from functools import lru_cache
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Patient
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email', 'phone', 'city', 'medical_history', 'allergies')
+FTS_TABLE = 'patients_patient_search'
+
+
+def search_terms(query):
+    """Split a query into lower-case words (letters and digits only)."""
+    return re.findall(r'[^\W_]+', query.lower())
+
+
+def search_vector():
+    # Must stay identical to the copy in migration 0003, or PostgreSQL won't
+    # use the GIN index built from it.
+    return (
+        SearchVector('first_name', 'last_name', weight='A', config='simple')
+        + SearchVector('email', 'phone', weight='B', config='simple')
+        + SearchVector('city', weight='C', config='simple')
+        + SearchVector('medical_history', 'allergies', weight='D', config='simple')
+    )
+
+
+class BasicSearchBackend:
+    """``icontains`` on every field; for databases without full-text search."""
+
+    def filter(self, queryset, query):
+        """Restrict ``queryset`` to patients matching every word of ``query``."""
+        for term in search_terms(query):
+            condition = Q()
+            for field in SEARCH_FIELDS:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def search(self, query, limit=20):
+        """Return the ids of the best ``limit`` matches, best first."""
+        if not search_terms(query):
+            return []
+        return list(self.filter(Patient.objects.all(), query)
+                    .order_by('last_name', 'first_name', 'id').values_list('id', flat=True)[:limit])
+
+    def index(self, patient):
+        pass
+
+    def remove(self, patient_id):
+        pass
+
+    def reindex(self, patient_ids=None):
+        pass
+
+
+class PostgresSearchBackend(BasicSearchBackend):
+
+    def _query(self, query):
+        terms = search_terms(query)
+        if not terms:
+            return None
+        return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='simple')
+
+    def filter(self, queryset, query):
+        search_query = self._query(query)
+        if search_query is None:
+            return queryset
+        return queryset.annotate(search=search_vector()).filter(search=search_query)
+
+    def search(self, query, limit=20):
+        search_query = self._query(query)
+        if search_query is None:
+            return []
+        candidates = (Patient.objects.annotate(search=search_vector()).filter(search=search_query)
+                      .order_by('-id').values('id')[:settings.PATIENT_SEARCH_RANK_CANDIDATES])
+        return list(
+            Patient.objects.filter(pk__in=candidates)
+            .annotate(rank=SearchRank(search_vector(), search_query))
+            .order_by('-rank', '-id').values_list('id', flat=True)[:limit]
+        )
+
+
+class SQLiteSearchBackend(BasicSearchBackend):
+    # bm25() weights, in SEARCH_FIELDS order.
+    WEIGHTS = (10.0, 10.0, 5.0, 5.0, 2.0, 1.0, 1.0)
+
+    def _match(self, query):
+        terms = search_terms(query)
+        return ' '.join(f'"{term}"*' for term in terms) if terms else None
+
+    def filter(self, queryset, query):
+        match = self._match(query)
+        if match is None:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+
+    def search(self, query, limit=20):
+        match = self._match(query)
+        if match is None:
+            return []
+        weights = ', '.join(str(weight) for weight in self.WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM ('
+                f'  SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE}'
+                f'  WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s'
+                f') ORDER BY score, rowid DESC LIMIT %s',
+                [match, settings.PATIENT_SEARCH_RANK_CANDIDATES, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index(self, patient):
+        columns = ', '.join(SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [patient.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (%s, {", ".join(["%s"] * len(SEARCH_FIELDS))})',
+                [patient.pk, *(getattr(patient, field) or '' for field in SEARCH_FIELDS)],
+            )
+
+    def remove(self, patient_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [patient_id])
+
+    def reindex(self, patient_ids=None):
+        """Copy patients into the FTS table: the given ids, or all of them."""
+        with connection.cursor() as cursor:
+            if patient_ids is None:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+                populate_fts_table(cursor)
+                return
+            patient_ids = list(patient_ids)
+            # Stay under SQLite's limit on query parameters.
+            for start in range(0, len(patient_ids), 500):
+                chunk = patient_ids[start:start + 500]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', chunk)
+                populate_fts_table(cursor, f'WHERE id IN ({placeholders})', chunk)
+
+
+def populate_fts_table(cursor, where='', params=()):
+    columns = ', '.join(SEARCH_FIELDS)
+    values = ', '.join(f"COALESCE({field}, '')" for field in SEARCH_FIELDS)
+    cursor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, {columns}) '
+        f'SELECT id, {values} FROM {Patient._meta.db_table} {where}',
+        list(params),
+    )
+
+
+@lru_cache(maxsize=None)
+def _backend_for(vendor, has_fts_table):
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if vendor == 'sqlite' and has_fts_table:
+        return SQLiteSearchBackend()
+    return BasicSearchBackend()
+
+
+@lru_cache(maxsize=None)
+def _sqlite_fts_table_exists(database_name):
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def get_search_backend():
+    """Return the search backend for the default database."""
+    has_fts_table = (connection.vendor == 'sqlite'
+                     and _sqlite_fts_table_exists(connection.settings_dict['NAME']))
+    return _backend_for(connection.vendor, has_fts_table)
+
+
+def search_patients(query, limit=20):
+    """Return the ids of the patients that best match ``query``, best first."""
+    return get_search_backend().search(query, limit)
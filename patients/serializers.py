@@ -0,0 +1,21 @@
+from rest_framework import serializers
+
+from hospital.api import DynamicFieldsModelSerializer
+
+from .models import Patient
+
+
+class PatientSerializer(DynamicFieldsModelSerializer):
+
+    class Meta:
+        model = Patient
+        fields = ['id', 'first_name', 'last_name', 'email', 'phone', 'date_of_birth',
+                  'gender', 'address', 'city', 'medical_history', 'allergies', 'created_at']
+
+
+class PatientSummarySerializer(serializers.ModelSerializer):
+    """Patient as nested in other resources."""
+
+    class Meta:
+        model = Patient
+        fields = ['id', 'first_name', 'last_name']
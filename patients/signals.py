@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Patient
+from .search import get_search_backend
+
+# The search index lives in the same database. Patient.save() and delete()
+# are atomic, so it is updated inside the same transaction as the patient row.
+
+
+@receiver(post_save, sender=Patient)
+def index_patient(sender, instance, **kwargs):
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Patient)
+def unindex_patient(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
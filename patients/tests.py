@@ -1,3 +1,301 @@
-from django.test import TestCase
+import csv
+import os
+import tempfile
+from datetime import date
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from appointments.models import Appointment
+from doctors.models import Doctor
+from stats.models import HospitalStats
+
+from .importing import validate_row
+from .models import Patient
+from .search import BasicSearchBackend, get_search_backend, search_patients
+
+User = get_user_model()
+
+
+class PatientApiTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='chairman', is_staff=True, role='admin')
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create_user(username='doc', role='doctor'),
+            specialization='ENT', experience=5, phone='555',
+        )
+
+    def add_patients(self, count):
+        start = Patient.objects.count()
+        return [
+            Patient.objects.create(
+                first_name=f'Pat{n}', last_name='Ient', email=f'pat{n}@example.com',
+                phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+                address='', city='Springfield',
+            )
+            for n in range(start, start + count)
+        ]
+
+    def list_patients(self, user, params=''):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api-patient-list') + params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()['results']
+
+    def test_query_count_is_constant_per_page(self):
+        self.add_patients(2)
+        small, rows = self.list_patients(self.admin)
+        self.add_patients(12)
+        large, more_rows = self.list_patients(self.admin)
+        self.assertEqual((len(rows), len(more_rows)), (2, 14))
+        self.assertEqual(small, large)
+
+    def test_doctor_sees_only_their_patients(self):
+        seen, unseen = self.add_patients(2)
+        for _ in range(2):
+            Appointment.objects.create(patient=seen, doctor=self.doctor,
+                                       appointment_date=timezone.now(), reason='Checkup')
+        _, rows = self.list_patients(self.doctor.user)
+        self.assertEqual([row['id'] for row in rows], [seen.id])
+
+    def test_fields_selection(self):
+        self.add_patients(1)
+        _, rows = self.list_patients(self.admin, '?fields=id,city')
+        self.assertEqual(rows[0], {'id': rows[0]['id'], 'city': 'Springfield'})
+
+
+@override_settings(DASHBOARD_CACHE_TIMEOUT=0)
+class PatientListingTests(TestCase):
+    """Pages listing patients don't fetch their address or clinical notes."""
+
+    def test_listings_skip_bulky_columns(self):
+        admin = User.objects.create_user(username='chairman', is_staff=True, role='admin')
+        doctor = Doctor.objects.create(
+            user=User.objects.create_user(username='doc', role='doctor'),
+            specialization='ENT', experience=5, phone='555',
+        )
+        patient = Patient.objects.create(
+            first_name='Pat', last_name='Ient', email='pat@example.com', phone='555',
+            date_of_birth=date(1990, 1, 1), gender='F', address='1 Main St', city='Springfield',
+            medical_history='Asthma', allergies='Penicillin',
+        )
+        Appointment.objects.create(patient=patient, doctor=doctor, appointment_date=timezone.now(),
+                                   reason='Checkup')
+        pages = [(admin, 'admin_patients_list'), (admin, 'dashboard'), (admin, 'admin_dashboard'),
+                 (doctor.user, 'doctor_dashboard')]
+        for user, name in pages:
+            self.client.force_login(user)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse(name))
+            self.assertContains(response, 'Ient')
+            for query in ctx.captured_queries:
+                for column in ('address', 'medical_history', 'allergies'):
+                    self.assertNotIn(f'"{column}"', query['sql'], name)
+
+
+class PatientSearchTests(TestCase):
+
+    def add_patient(self, first_name, last_name, **fields):
+        defaults = {'email': f'{first_name}.{last_name}@example.com'.lower(), 'phone': '555',
+                    'date_of_birth': date(1990, 1, 1), 'gender': 'F', 'address': '', 'city': 'Springfield'}
+        return Patient.objects.create(first_name=first_name, last_name=last_name, **{**defaults, **fields})
+
+    def test_every_word_matches_a_prefix(self):
+        john = self.add_patient('John', 'Smith', medical_history='Asthma since childhood')
+        self.add_patient('Joan', 'Smithers', city='Shelbyville')
+        self.add_patient('Mary', 'Jones')
+        self.assertEqual(sorted(search_patients('jo smith')), [john.pk, john.pk + 1])
+        self.assertEqual(search_patients('JOHN asth'), [john.pk])
+        self.assertEqual(search_patients('shelby'), [john.pk + 1])
+        self.assertEqual(search_patients('john.smith@'), [john.pk])
+        self.assertEqual(search_patients('"*'), [])
+        self.assertEqual(search_patients('nobody'), [])
+
+    def test_names_rank_above_medical_notes(self):
+        noted = self.add_patient('Ann', 'Lee', medical_history='Referred by Dr Reed')
+        named = self.add_patient('Bob', 'Reed')
+        self.assertEqual(search_patients('reed'), [named.pk, noted.pk])
+
+    @override_settings(PATIENT_SEARCH_RANK_CANDIDATES=1)
+    def test_broad_queries_rank_the_newest_matches(self):
+        self.add_patient('Ann', 'Reed')
+        newest = self.add_patient('Ann', 'Lee', medical_history='Reed')
+        self.assertEqual(search_patients('reed'), [newest.pk])
+
+    def test_failed_index_update_rolls_back_the_save(self):
+        patient = self.add_patient('John', 'Smith')
+        patient.last_name = 'Carter'
+        with mock.patch.object(type(get_search_backend()), 'index', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                patient.save()
+        patient.refresh_from_db()
+        self.assertEqual(patient.last_name, 'Smith')
+
+    def test_index_follows_saves_and_deletes(self):
+        patient = self.add_patient('John', 'Smith', email='jsmith@example.com')
+        patient.last_name = 'Carter'
+        patient.save()
+        self.assertEqual(search_patients('smith'), [])
+        self.assertEqual(search_patients('carter'), [patient.pk])
+        patient.delete()
+        self.assertEqual(search_patients('carter'), [])
+
+    def test_reindex_picks_up_bulk_created_patients(self):
+        [patient] = Patient.objects.bulk_create([Patient(
+            first_name='Bulk', last_name='Loaded', email='bulk@example.com', phone='555',
+            date_of_birth=date(1990, 1, 1), gender='M', address='', city='',
+        )])
+        get_search_backend().reindex([patient.pk])
+        self.assertEqual(search_patients('bulk'), [patient.pk])
+
+    def test_filter_combines_with_other_filters(self):
+        self.add_patient('John', 'Smith')
+        other = self.add_patient('John', 'Smithers', city='Shelbyville')
+        queryset = get_search_backend().filter(Patient.objects.filter(city='Shelbyville'), 'john')
+        self.assertEqual(list(queryset), [other])
+
+    def test_basic_backend(self):
+        john = self.add_patient('John', 'Smith')
+        self.add_patient('Mary', 'Smith')
+        self.assertEqual(BasicSearchBackend().search('jo smi'), [john.pk])
+        self.assertEqual(BasicSearchBackend().filter(Patient.objects.all(), 'smith').count(), 2)
+
+    def test_admin_list_shows_ranked_matches(self):
+        admin = User.objects.create_user(username='chairman', is_staff=True, role='admin')
+        self.client.force_login(admin)
+        self.add_patient('Ann', 'Lee', medical_history='Reed')
+        named = self.add_patient('Bob', 'Reed', gender='M')
+        response = self.client.get(reverse('admin_patients_list'), {'q': 'reed'})
+        self.assertEqual([p.last_name for p in response.context['patients']], ['Reed', 'Lee'])
+        self.assertIsNone(response.context['next_cursor'])
+        response = self.client.get(reverse('admin_patients_list'), {'q': 'reed', 'gender': 'F'})
+        self.assertEqual([p.last_name for p in response.context['patients']], ['Lee'])
+        response = self.client.get(reverse('admin_patients_list'), {'q': 'bob', 'export': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn(named.email, lines[1])
+
+
+class PatientImportTests(TestCase):
+    HEADER = ['first_name', 'last_name', 'email', 'phone', 'date_of_birth', 'gender', 'city', 'username']
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'patients.csv')
+
+    def write_csv(self, rows, header=HEADER):
+        with open(self.path, 'w', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    def run_import(self, *args):
+        out = StringIO()
+        call_command('import_patients', self.path, *args, stdout=out)
+        return out.getvalue()
+
+    def read_rejects(self):
+        with open(f'{self.path}.rejects.csv', newline='') as handle:
+            return [(int(row['line']), row['error'], row['email']) for row in csv.DictReader(handle)]
+
+    def test_validate_row(self):
+        row = {'first_name': 'Ann', 'last_name': 'Lee', 'email': ' Ann@Example.com', 'phone': '555',
+               'date_of_birth': '1990-02-03', 'gender': 'female'}
+        cleaned, error = validate_row(row)
+        self.assertIsNone(error)
+        self.assertEqual((cleaned['email'], cleaned['date_of_birth'], cleaned['gender']),
+                         ('ann@example.com', date(1990, 2, 3), 'F'))
+        for change, message in [({'email': 'nope'}, 'Invalid email'),
+                                ({'date_of_birth': '03/02/1990'}, 'Invalid date_of_birth'),
+                                ({'date_of_birth': '2990-01-01'}, 'out of range'),
+                                ({'gender': 'x'}, 'Invalid gender'),
+                                ({'phone': '5' * 16}, 'Too long: phone'),
+                                ({'last_name': ''}, 'Missing last_name')]:
+            self.assertIn(message, validate_row({**row, **change})[1])
+
+    def test_imports_valid_rows_and_writes_rejects(self):
+        existing = Patient.objects.create(first_name='Old', last_name='Timer', email='old@example.com',
+                                          phone='555', date_of_birth=date(1950, 1, 1), gender='M',
+                                          address='', city='')
+        HospitalStats.current()
+        self.write_csv([
+            ['Ann', 'Lee', 'ann@example.com', '555', '1990-01-01', 'F', 'Springfield', ''],
+            ['Bob', 'Reed', 'bob@example', '555', '1990-01-01', 'M', '', ''],
+            ['Ann', 'Lee', 'ANN@example.com', '555', '1990-01-01', 'F', '', ''],
+            ['Old', 'Timer', 'OLD@example.com', '555', '1950-01-01', 'M', '', ''],
+            ['Cy', 'Zed', 'cy@example.com', '555', '1985-05-05', 'o', '', ''],
+        ])
+        output = self.run_import('--batch-size', '2')
+        self.assertIn('Imported 2 of 5 patients', output)
+        self.assertEqual(self.read_rejects(), [
+            (3, "Invalid email 'bob@example'.", 'bob@example'),
+            (4, 'Duplicate email in this file.', 'ANN@example.com'),
+            (5, 'A patient with this email already exists.', 'OLD@example.com'),
+        ])
+        ann = Patient.objects.get(email='ann@example.com')
+        self.assertEqual((ann.city, ann.user), ('Springfield', None))
+        self.assertEqual(HospitalStats.current().patients, 3)
+        self.assertEqual(sorted(search_patients('ann')), [ann.pk])
+        self.assertEqual(Patient.objects.exclude(pk=existing.pk).count(), 2)
+
+        # A rerun imports nothing new.
+        self.assertIn('Imported 0 of 5 patients', self.run_import())
+        self.assertEqual(Patient.objects.count(), 3)
+
+    def test_create_users(self):
+        User.objects.create_user(username='taken', role='patient')
+        self.write_csv([
+            ['Ann', 'Lee', 'ann@example.com', '555', '1990-01-01', 'F', '', 'ann'],
+            ['Bob', 'Reed', 'bob@example.com', '555', '1990-01-01', 'M', '', 'taken'],
+            ['Cy', 'Zed', 'cy@example.com', '555', '1990-01-01', 'M', '', ''],
+        ])
+        self.run_import('--create-users')
+        ann = Patient.objects.get(email='ann@example.com')
+        self.assertEqual((ann.user.username, ann.user.role), ('ann', 'patient'))
+        self.assertFalse(ann.user.has_usable_password())
+        self.assertIsNone(Patient.objects.get(email='cy@example.com').user)
+        self.assertEqual(self.read_rejects(), [(3, "Username 'taken' is taken.", 'bob@example.com')])
+
+    def test_rejects_rows_taken_during_the_import(self):
+        self.write_csv([
+            ['Ann', 'Lee', 'ann@example.com', '555', '1990-01-01', 'F', '', 'ann'],
+            ['Cy', 'Zed', 'cy@example.com', '555', '1990-01-01', 'M', '', 'cy'],
+        ])
+        bulk_create = User.objects.bulk_create
+
+        def register_then_insert(users):
+            # Someone registers as 'ann' after the import checked the username.
+            if not User.objects.filter(username='ann').exists():
+                User.objects.create_user(username='ann', role='patient')
+            return bulk_create(users)
+
+        with mock.patch.object(User.objects, 'bulk_create', register_then_insert):
+            output = self.run_import('--create-users')
+        self.assertIn('Imported 1 of 2 patients', output)
+        self.assertEqual(self.read_rejects(), [(2, 'Username or email was taken during the import.',
+                                                'ann@example.com')])
+        self.assertEqual(Patient.objects.get().user.username, 'cy')
+        self.assertEqual(HospitalStats.current().patients, 1)
+
+    def test_workers(self):
+        self.write_csv([
+            [f'Pat{n}', 'Ient', f'pat{n}@example.com', '555', '1990-01-01', 'F', '', '']
+            for n in range(25)
+        ] + [['Bad', 'Row', 'bad', '555', '1990-01-01', 'F', '', '']])
+        self.assertIn('Imported 25 of 26 patients', self.run_import('--workers', '2', '--batch-size', '4'))
+        self.assertEqual(self.read_rejects(), [(27, "Invalid email 'bad'.", 'bad')])
+
+    def test_missing_columns(self):
+        self.write_csv([['Ann', 'ann@example.com']], header=['first_name', 'email'])
+        with self.assertRaisesMessage(CommandError, 'last_name'):
+            self.run_import()
@@ -1,3 +1,22 @@
-from django.shortcuts import render
+from accounts.roles import resolve_role
+from hospital.api import ReadOnlyApiViewSet
 
-# Create your views here.
+from .models import Patient
+from .serializers import PatientSerializer
+
+
+class PatientViewSet(ReadOnlyApiViewSet):
+    """Patients: all of them for staff, a doctor's own patients, or the patient themselves."""
+    serializer_class = PatientSerializer
+    ordering = ('-created_at', '-id')
+
+    def get_base_queryset(self):
+        user = self.request.user
+        if user.is_staff:
+            return Patient.objects.all()
+        role = resolve_role(user)
+        if role == 'doctor':
+            return Patient.objects.filter(appointments__doctor__user=user).distinct()
+        if role == 'patient':
+            return Patient.objects.filter(user=user)
+        return Patient.objects.none()
@@ -0,0 +1,76 @@
+// Appointment Status Pie Chart
+const ctx = document.getElementById('appointmentChart').getContext('2d');
+
+// Counts rendered by the template onto the canvas.
+const appointmentData = {
+    scheduled: Number(ctx.canvas.dataset.scheduled),
+    completed: Number(ctx.canvas.dataset.completed),
+    cancelled: Number(ctx.canvas.dataset.cancelled)
+};
+
+const appointmentChart = new Chart(ctx, {
+    type: 'doughnut',
+    data: {
+        labels: [
+            `Scheduled (${appointmentData.scheduled})`,
+            `Completed (${appointmentData.completed})`,
+            `Cancelled (${appointmentData.cancelled})`
+        ],
+        datasets: [{
+            data: [
+                appointmentData.scheduled,
+                appointmentData.completed,
+                appointmentData.cancelled
+            ],
+            backgroundColor: [
+                '#00A8CC',
+                '#05D564',
+                '#FF6B9D'
+            ],
+            borderColor: [
+                'rgba(0, 168, 204, 0.3)',
+                'rgba(5, 213, 100, 0.3)',
+                'rgba(255, 107, 157, 0.3)'
+            ],
+            borderWidth: 2,
+            hoverOffset: 10
+        }]
+    },
+    options: {
+        responsive: true,
+        maintainAspectRatio: true,
+        plugins: {
+            legend: {
+                position: 'bottom',
+                labels: {
+                    color: '#E9E9E9',
+                    font: {
+                        size: 14,
+                        weight: 'bold'
+                    },
+                    padding: 20,
+                    usePointStyle: true
+                }
+            },
+            tooltip: {
+                backgroundColor: 'rgba(0, 0, 0, 0.8)',
+                titleColor: '#FFB703',
+                bodyColor: '#E9E9E9',
+                borderColor: '#FFB703',
+                borderWidth: 1,
+                padding: 12,
+                titleFont: {
+                    size: 14,
+                    weight: 'bold'
+                },
+                callbacks: {
+                    label: function(context) {
+                        const total = context.dataset.data.reduce((a, b) => a + b, 0);
+                        const percentage = ((context.parsed / total) * 100).toFixed(1);
+                        return `${context.label.split('(')[0]}: ${percentage}%`;
+                    }
+                }
+            }
+        }
+    }
+});
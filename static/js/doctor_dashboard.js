@@ -0,0 +1,67 @@
+// Live updates to the appointment table, pushed by the server as
+// Server-Sent Events (see appointments.live). The stream is only routed
+// under ASGI; without it the section has no data-stream-url.
+const queue = document.querySelector('[data-stream-url]');
+
+function badgeClass(status) {
+    return status === 'completed' || status === 'scheduled' ? status : 'cancelled';
+}
+
+function fillRow(row, appointment) {
+    const [patient, date, reason, status, notes] = row.cells;
+
+    patient.replaceChildren();
+    const name = document.createElement('strong');
+    name.textContent = appointment.patient;
+    const phone = document.createElement('small');
+    phone.textContent = appointment.phone;
+    patient.append(name, document.createElement('br'), phone);
+
+    date.textContent = appointment.date;
+    reason.textContent = appointment.reason;
+
+    const badge = document.createElement('span');
+    badge.className = `status-badge ${badgeClass(appointment.status)}`;
+    badge.textContent = appointment.status;
+    status.replaceChildren(badge);
+
+    if (appointment.notes) {
+        notes.textContent = appointment.notes;
+    } else {
+        const none = document.createElement('small');
+        none.style.color = '#ccc';
+        none.textContent = 'No notes';
+        notes.replaceChildren(none);
+    }
+}
+
+if (queue && window.EventSource) {
+    const rows = queue.querySelector('tbody');
+    const source = new EventSource(queue.dataset.streamUrl);
+
+    source.addEventListener('appointment', (event) => {
+        const appointment = JSON.parse(event.data);
+        if (!rows) {
+            // The page showed "no appointments"; render the table afresh.
+            window.location.reload();
+            return;
+        }
+        let row = rows.querySelector(`tr[data-appointment-id="${appointment.id}"]`);
+        if (!row) {
+            row = rows.insertRow(0);
+            row.dataset.appointmentId = appointment.id;
+            for (let i = 0; i < 5; i++) {
+                row.insertCell();
+            }
+        }
+        fillRow(row, appointment);
+    });
+
+    source.addEventListener('deleted', (event) => {
+        const { id } = JSON.parse(event.data);
+        rows?.querySelector(`tr[data-appointment-id="${id}"]`)?.remove();
+    });
+
+    // The server dropped events this page missed; reload to catch up.
+    source.addEventListener('resync', () => window.location.reload());
+}
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.dashboard_cache import DOCTORS_SCOPE, GLOBAL_SCOPE, PATIENTS_SCOPE, invalidate
+from stats.models import HospitalStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the HospitalStats row from the base tables and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report drift; exit with an error if any is found.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stats, drift = HospitalStats.rebuild()
+            if options['check']:
+                transaction.set_rollback(True)
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("✓ HospitalStats matches the base tables."))
+            return
+
+        for field, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"  {field}: stored {stored}, actual {actual}")
+        if options['check']:
+            raise CommandError(f"HospitalStats has drifted in {len(drift)} field(s).")
+
+        invalidate(GLOBAL_SCOPE, DOCTORS_SCOPE, PATIENTS_SCOPE)
+        self.stdout.write(self.style.SUCCESS(f"✓ Rebuilt HospitalStats ({len(drift)} field(s) corrected)."))
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HospitalStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doctors', models.IntegerField(default=0)),
+                ('patients', models.IntegerField(default=0)),
+                ('appointments', models.IntegerField(default=0)),
+                ('appointments_scheduled', models.IntegerField(default=0)),
+                ('appointments_completed', models.IntegerField(default=0)),
+                ('appointments_cancelled', models.IntegerField(default=0)),
+                ('bills', models.IntegerField(default=0)),
+                ('bills_pending', models.IntegerField(default=0)),
+                ('bills_paid', models.IntegerField(default=0)),
+                ('bills_overdue', models.IntegerField(default=0)),
+                ('billed_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('billed_pending', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('billed_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('billed_overdue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'hospital stats',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:00
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def populate_hospital_stats(apps, schema_editor):
+    Appointment = apps.get_model('appointments', 'Appointment')
+    Bill = apps.get_model('billing', 'Bill')
+    Doctor = apps.get_model('doctors', 'Doctor')
+    Patient = apps.get_model('patients', 'Patient')
+    HospitalStats = apps.get_model('stats', 'HospitalStats')
+
+    values = {
+        'doctors': Doctor.objects.count(),
+        'patients': Patient.objects.count(),
+    }
+    values.update(Appointment.objects.aggregate(
+        appointments=Count('id'),
+        appointments_scheduled=Count('id', filter=Q(status='scheduled')),
+        appointments_completed=Count('id', filter=Q(status='completed')),
+        appointments_cancelled=Count('id', filter=Q(status='cancelled')),
+    ))
+    values.update(Bill.objects.aggregate(
+        bills=Count('id'),
+        bills_pending=Count('id', filter=Q(status='pending')),
+        bills_paid=Count('id', filter=Q(status='paid')),
+        bills_overdue=Count('id', filter=Q(status='overdue')),
+        billed_total=Sum('amount', default=0),
+        billed_pending=Sum('amount', filter=Q(status='pending'), default=0),
+        billed_paid=Sum('amount', filter=Q(status='paid'), default=0),
+        billed_overdue=Sum('amount', filter=Q(status='overdue'), default=0),
+    ))
+    HospitalStats.objects.update_or_create(pk=1, defaults=values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_dashboard_indexes'),
+        ('billing', '0002_dashboard_indexes'),
+        ('doctors', '0001_initial'),
+        ('patients', '0002_dashboard_indexes'),
+        ('stats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_hospital_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,127 @@
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import models, transaction
+from django.db.models import F
+
+
+# Field names kept for each appointment / bill status.
+APPOINTMENT_STATUS_FIELDS = {
+    'scheduled': 'appointments_scheduled',
+    'completed': 'appointments_completed',
+    'cancelled': 'appointments_cancelled',
+}
+BILL_COUNT_FIELDS = {
+    'pending': 'bills_pending',
+    'paid': 'bills_paid',
+    'overdue': 'bills_overdue',
+}
+BILL_AMOUNT_FIELDS = {
+    'pending': 'billed_pending',
+    'paid': 'billed_paid',
+    'overdue': 'billed_overdue',
+}
+
+
+class HospitalStats(models.Model):
+    """Single row of hospital-wide totals, kept current as records change.
+
+    ``stats.signals`` applies deltas in the same transaction as each write;
+    the ``rebuild_stats`` command recomputes the row from the base tables.
+    """
+
+    SINGLETON_ID = 1
+
+    doctors = models.IntegerField(default=0)
+    patients = models.IntegerField(default=0)
+    appointments = models.IntegerField(default=0)
+    appointments_scheduled = models.IntegerField(default=0)
+    appointments_completed = models.IntegerField(default=0)
+    appointments_cancelled = models.IntegerField(default=0)
+    bills = models.IntegerField(default=0)
+    bills_pending = models.IntegerField(default=0)
+    bills_paid = models.IntegerField(default=0)
+    bills_overdue = models.IntegerField(default=0)
+    billed_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    billed_pending = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    billed_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    billed_overdue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'hospital stats'
+
+    def __str__(self):
+        return f"Hospital stats as of {self.updated_at}"
+
+    @classmethod
+    def current(cls):
+        """Return the stats row, building it from the base tables if missing."""
+        stats = cls.objects.filter(pk=cls.SINGLETON_ID).first()
+        return stats if stats is not None else cls.rebuild()[0]
+
+    @classmethod
+    async def acurrent(cls):
+        stats = await cls.objects.filter(pk=cls.SINGLETON_ID).afirst()
+        if stats is None:
+            stats, _ = await sync_to_async(cls.rebuild)()
+        return stats
+
+    @classmethod
+    def apply(cls, **deltas):
+        """Add ``deltas`` (field name -> change) to the stats row."""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated:
+            # No row yet: computing it from scratch already includes this change.
+            cls.rebuild()
+
+    @classmethod
+    def compute(cls):
+        """Return the current totals computed from the base tables."""
+        from appointments.models import Appointment
+        from billing.services import billing_summary
+        from doctors.models import Doctor
+        from patients.models import Patient
+
+        appointment_counts = Appointment.objects.status_counts()
+        billing = billing_summary()
+        values = {
+            'doctors': Doctor.objects.count(),
+            'patients': Patient.objects.count(),
+            'appointments': appointment_counts['total'],
+            'bills': billing['total_count'],
+            'billed_total': billing['total_amount'],
+        }
+        for status, field in APPOINTMENT_STATUS_FIELDS.items():
+            values[field] = appointment_counts[status]
+        for status, field in BILL_COUNT_FIELDS.items():
+            values[field] = billing['by_status'][status]['count']
+        for status, field in BILL_AMOUNT_FIELDS.items():
+            values[field] = billing['by_status'][status]['amount']
+        return values
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute the row; return ``(stats, drift)``.
+
+        ``drift`` maps each field whose stored value was wrong to a
+        ``(stored, actual)`` pair.
+        """
+        with transaction.atomic():
+            stats, _ = cls.objects.select_for_update().get_or_create(pk=cls.SINGLETON_ID)
+            drift = {}
+            for field, actual in cls.compute().items():
+                stored = getattr(stats, field)
+                if field.startswith('billed_'):
+                    stored = Decimal(stored).quantize(Decimal('0.01'))
+                    actual = Decimal(actual).quantize(Decimal('0.01'))
+                if stored != actual:
+                    drift[field] = (stored, actual)
+                setattr(stats, field, actual)
+            stats.save()
+        return stats, drift
@@ -0,0 +1,108 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from appointments.models import Appointment
+from billing.models import Bill
+from doctors.models import Doctor
+from patients.models import Patient
+
+from .models import (
+    APPOINTMENT_STATUS_FIELDS, BILL_AMOUNT_FIELDS, BILL_COUNT_FIELDS, HospitalStats,
+)
+
+# Appointment.save() and Bill.save() run inside transaction.atomic(), so the
+# post_save handlers below update the stats row in the same transaction as
+# the write itself. Deletes (including cascades) are already atomic.
+
+
+def _appointment_deltas(status, sign):
+    return {'appointments': sign, APPOINTMENT_STATUS_FIELDS[status]: sign}
+
+
+def _bill_deltas(status, amount, sign):
+    amount = Decimal(amount)
+    return {
+        'bills': sign,
+        'billed_total': sign * amount,
+        BILL_COUNT_FIELDS[status]: sign,
+        BILL_AMOUNT_FIELDS[status]: sign * amount,
+    }
+
+
+def _merge(*deltas):
+    merged = Counter()
+    for delta in deltas:
+        merged.update(delta)
+    return merged
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_status(sender, instance, **kwargs):
+    instance._stats_previous = (
+        sender.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Appointment)
+def count_saved_appointment(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stats_previous', None)
+    if created or previous is None:
+        HospitalStats.apply(**_appointment_deltas(instance.status, 1))
+    elif previous != instance.status:
+        HospitalStats.apply(**_merge(
+            _appointment_deltas(previous, -1), _appointment_deltas(instance.status, 1)
+        ))
+
+
+@receiver(post_delete, sender=Appointment)
+def count_deleted_appointment(sender, instance, **kwargs):
+    HospitalStats.apply(**_appointment_deltas(instance.status, -1))
+
+
+@receiver(pre_save, sender=Bill)
+def remember_bill_status(sender, instance, **kwargs):
+    instance._stats_previous = (
+        sender.objects.filter(pk=instance.pk).values_list('status', 'amount').first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Bill)
+def count_saved_bill(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stats_previous', None)
+    current = _bill_deltas(instance.status, instance.amount, 1)
+    if created or previous is None:
+        HospitalStats.apply(**current)
+    elif previous != (instance.status, instance.amount):
+        HospitalStats.apply(**_merge(_bill_deltas(*previous, -1), current))
+
+
+@receiver(post_delete, sender=Bill)
+def count_deleted_bill(sender, instance, **kwargs):
+    HospitalStats.apply(**_bill_deltas(instance.status, instance.amount, -1))
+
+
+@receiver(post_save, sender=Doctor)
+def count_saved_doctor(sender, instance, created, **kwargs):
+    if created:
+        HospitalStats.apply(doctors=1)
+
+
+@receiver(post_delete, sender=Doctor)
+def count_deleted_doctor(sender, instance, **kwargs):
+    HospitalStats.apply(doctors=-1)
+
+
+@receiver(post_save, sender=Patient)
+def count_saved_patient(sender, instance, created, **kwargs):
+    if created:
+        HospitalStats.apply(patients=1)
+
+
+@receiver(post_delete, sender=Patient)
+def count_deleted_patient(sender, instance, **kwargs):
+    HospitalStats.apply(patients=-1)
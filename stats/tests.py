@@ -0,0 +1,91 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from appointments.models import Appointment
+from billing.models import Bill
+from doctors.models import Doctor
+from patients.models import Patient
+
+from .models import HospitalStats
+
+User = get_user_model()
+
+
+class HospitalStatsTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            first_name='Pat', last_name='Ient', email='pat@example.com',
+            phone='555', date_of_birth=date(1990, 1, 1), gender='F',
+            address='', city='',
+        )
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create_user(username='doc'),
+            specialization='ENT', experience=5, phone='555',
+        )
+
+    def assertStatsMatchBaseTables(self):
+        stats = HospitalStats.objects.get()
+        for field, actual in HospitalStats.compute().items():
+            self.assertEqual(getattr(stats, field), actual, field)
+
+    def make_appointment(self, status='scheduled'):
+        return Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, appointment_date=timezone.now(),
+            reason='Checkup', status=status,
+        )
+
+    def make_bill(self, amount='100.00', status='pending'):
+        return Bill.objects.create(
+            patient=self.patient, amount=Decimal(amount), description='Visit',
+            status=status, due_date=date(2030, 1, 1),
+        )
+
+    def test_inserts_updates_and_deletes_are_counted(self):
+        appointment = self.make_appointment()
+        self.make_appointment('completed')
+        bill = self.make_bill('100.00')
+        self.make_bill('20.50', 'paid')
+        self.assertStatsMatchBaseTables()
+
+        appointment.status = 'cancelled'
+        appointment.save()
+        bill.status = 'paid'
+        bill.amount = Decimal('90.00')
+        bill.save()
+        self.assertStatsMatchBaseTables()
+
+        appointment.delete()
+        bill.delete()
+        self.assertStatsMatchBaseTables()
+        self.assertEqual(HospitalStats.objects.get().billed_paid, Decimal('20.50'))
+
+    def test_cascading_delete_is_counted(self):
+        self.make_appointment()
+        self.make_bill()
+        self.patient.delete()
+        self.assertStatsMatchBaseTables()
+        self.assertEqual(HospitalStats.objects.get().appointments, 0)
+
+    def test_current_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(HospitalStats.current().doctors, 1)
+
+    def test_rebuild_stats_reports_and_fixes_drift(self):
+        self.make_bill()
+        HospitalStats.objects.update(bills=7)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_stats', '--check', stdout=StringIO())
+        self.assertEqual(HospitalStats.objects.get().bills, 7)
+
+        out = StringIO()
+        call_command('rebuild_stats', stdout=out)
+        self.assertIn('bills: stored 7, actual 1', out.getvalue())
+        self.assertStatsMatchBaseTables()